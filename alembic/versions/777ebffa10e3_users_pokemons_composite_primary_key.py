@@ -0,0 +1,77 @@
+"""users_pokemons_composite_primary_key
+
+Revision ID: 777ebffa10e3
+Revises: 7aafa43c7631
+Create Date: 2025-04-10 11:03:26.518204
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "777ebffa10e3"
+down_revision: str | None = "7aafa43c7631"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Online: the new indexes are built without blocking writes, the table is then only locked
+    # for catalog changes (no rewrite, no scan: the key columns are NOT NULL and dropping a column
+    # only hides it). A leftover invalid index of an interrupted run is dropped first.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS users_pokemons_user_id_pokemon_id_key"
+        )
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY users_pokemons_user_id_pokemon_id_key "
+            "ON users_pokemons (user_id, pokemon_id)"
+        )
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_users_pokemons_user_id_created_at_pokemon_id"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_users_pokemons_user_id_created_at_pokemon_id "
+            "ON users_pokemons (user_id, created_at, pokemon_id)"
+        )
+
+    # Fail fast instead of queueing behind long transactions (and blocking everyone queued after us)
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.drop_constraint("users_pokemons_pkey", "users_pokemons", type_="primary")
+    op.execute(
+        "ALTER TABLE users_pokemons ADD CONSTRAINT users_pokemons_pkey "
+        "PRIMARY KEY USING INDEX users_pokemons_user_id_pokemon_id_key"
+    )
+    op.drop_constraint("uix_user_pokemon_unique", "users_pokemons", type_="unique")
+    op.drop_index(
+        "ix_users_pokemons_user_id_created_at_id", table_name="users_pokemons"
+    )
+    op.drop_column("users_pokemons", "id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column(
+        "users_pokemons", sa.Column("id", sa.Uuid(as_uuid=False), nullable=True)
+    )
+    op.execute("UPDATE users_pokemons SET id = gen_random_uuid()")
+    op.alter_column("users_pokemons", "id", nullable=False)
+    op.drop_constraint("users_pokemons_pkey", "users_pokemons", type_="primary")
+    op.create_primary_key("users_pokemons_pkey", "users_pokemons", ["id"])
+    op.create_unique_constraint(
+        "uix_user_pokemon_unique", "users_pokemons", ["user_id", "pokemon_id"]
+    )
+    op.create_index(
+        "ix_users_pokemons_user_id_created_at_id",
+        "users_pokemons",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+    op.drop_index(
+        "ix_users_pokemons_user_id_created_at_pokemon_id", table_name="users_pokemons"
+    )
@@ -0,0 +1,35 @@
+"""add_users_pokemons_unique_constraint
+
+Revision ID: 9a4d7c2e1f03
+Revises: 5b2e8f61c4a9
+Create Date: 2025-04-05 09:41:17.220871
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9a4d7c2e1f03"
+down_revision: str | None = "5b2e8f61c4a9"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The constraint is declared on the model but was never created, drop duplicates first
+    op.execute("""
+    DELETE FROM users_pokemons a
+    USING users_pokemons b
+    WHERE a.user_id = b.user_id AND a.pokemon_id = b.pokemon_id AND a.id > b.id
+    """)
+    op.create_unique_constraint(
+        "uix_user_pokemon_unique", "users_pokemons", ["user_id", "pokemon_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("uix_user_pokemon_unique", "users_pokemons", type_="unique")
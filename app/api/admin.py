@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.core.catalog_cache import catalog_cache
+from app.core.catalog_import import ImportFormat, import_catalog
+from app.core.config import get_settings
+from app.core.db import get_db
+from app.core.dependencies import get_admin_user
+from app.core.responses import NDJSON_MEDIA_TYPE
+from app.schemas.pokemon import PokemonImportReport
+from app.schemas.user import UserSnapshot
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+IMPORT_MEDIA_TYPES = {
+    "text/csv": ImportFormat.CSV,
+    NDJSON_MEDIA_TYPE: ImportFormat.NDJSON,
+}
+
+
+@router.post(
+    "/pokemons/import",
+    response_model=PokemonImportReport,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "string"}}
+                for media_type in IMPORT_MEDIA_TYPES
+            },
+        }
+    },
+)
+async def import_pokemons(
+    request: Request,
+    rebuild_indexes: bool = False,
+    session: AsyncSession = Depends(get_db),
+    _: UserSnapshot = Depends(get_admin_user),
+) -> PokemonImportReport:
+    """
+    Bulk loads Pokemon from a CSV (with a header row) or NDJSON body, upserting them by name.
+    Invalid records are skipped and reported. `rebuild_indexes` speeds up large loads, but locks the catalog
+    until the import is done.
+    """
+    media_type = (
+        request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    )
+    import_format = IMPORT_MEDIA_TYPES.get(media_type)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of {', '.join(IMPORT_MEDIA_TYPES)}",
+        )
+
+    report = await import_catalog(
+        session,
+        request.stream(),
+        import_format,
+        get_settings().IMPORT_BATCH_SIZE,
+        rebuild_indexes=rebuild_indexes,
+    )
+    await session.commit()
+    if catalog_cache.loaded:
+        await catalog_cache.revalidate(session)
+    return PokemonImportReport(**report.as_dict())
@@ -1,36 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.core import db
-from app.core.security import verify_password, create_jwt_token, get_hashed_password
+from app.core.config import get_settings
+from app.core.rate_limit import RateLimit, get_rate_limiter
+from app.core.refresh_tokens import issue_refresh_token, rotate_refresh_token
+from app.core.security import (
+    DUMMY_PASSWORD_HASH,
+    create_jwt_token,
+    get_hashed_password_async,
+    verify_password_async,
+)
 from app.models.user import User
-from app.schemas.auth import AccessTokenResponse
+from app.schemas.auth import AccessTokenResponse, RefreshTokenRequest
 from app.schemas.user import UserResponse, UserCreateRequest
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+def client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers --forwarded-allow-ips so this is the real client
+    return request.client.host if request.client else "unknown"
+
+
 @router.post("/login", response_model=AccessTokenResponse)
 async def login(
+        request: Request,
         session: AsyncSession = Depends(db.get_db),
         data: OAuth2PasswordRequestForm = Depends(),
 ) -> AccessTokenResponse:
+    # Throttled before any bcrypt work, so a burst of attempts can't saturate the CPU
+    settings = get_settings()
+    await get_rate_limiter().enforce(
+        (RateLimit("login_ip", settings.LOGIN_IP_RATE_BURST, settings.LOGIN_IP_RATE_PER_MINUTE), client_ip(request)),
+        (
+            RateLimit("login_email", settings.LOGIN_EMAIL_RATE_BURST, settings.LOGIN_EMAIL_RATE_PER_MINUTE),
+            data.username.strip().lower(),
+        ),
+    )
+
     user = await session.scalar(select(User).where(User.email == data.username))
 
-    if not verify_password(user.hashed_password, data.password):
+    # Unknown emails get the same bcrypt check, against a dummy hash
+    hashed_password = user.hashed_password if user is not None else DUMMY_PASSWORD_HASH
+    if not await verify_password_async(hashed_password, data.password) or user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid username or password",
         )
 
+    refresh_token, refresh_expires_at = await issue_refresh_token(session, user.user_id)
+    await session.commit()
+    db.record_write(user.user_id)
     jwt_token = create_jwt_token(user_id=user.user_id)
 
     return AccessTokenResponse(
         access_token=jwt_token.access_token,
         expires_at=jwt_token.payload.exp,
+        refresh_token=refresh_token,
+        refresh_expires_at=int(refresh_expires_at.timestamp()),
+    )
+
+
+@router.post("/refresh", response_model=AccessTokenResponse)
+async def refresh(
+        data: RefreshTokenRequest,
+        session: AsyncSession = Depends(db.get_db),
+) -> AccessTokenResponse:
+    """New access token for a refresh token, without the password. The refresh token is rotated."""
+    rotated = await rotate_refresh_token(session, data.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+    await session.commit()
+    user_id, refresh_token, refresh_expires_at = rotated
+    jwt_token = create_jwt_token(user_id=user_id)
+
+    return AccessTokenResponse(
+        access_token=jwt_token.access_token,
+        expires_at=jwt_token.payload.exp,
+        refresh_token=refresh_token,
+        refresh_expires_at=int(refresh_expires_at.timestamp()),
     )
 
 
@@ -40,9 +95,22 @@ async def login(
     status_code=status.HTTP_201_CREATED,
 )
 async def register(
+        request: Request,
         user_in: UserCreateRequest,
         session: AsyncSession = Depends(db.get_db),
 ) -> User:
+    settings = get_settings()
+    await get_rate_limiter().enforce(
+        (
+            RateLimit("register_ip", settings.REGISTER_IP_RATE_BURST, settings.REGISTER_IP_RATE_PER_MINUTE),
+            client_ip(request),
+        ),
+        (
+            RateLimit("register_email", settings.REGISTER_EMAIL_RATE_BURST, settings.REGISTER_EMAIL_RATE_PER_MINUTE),
+            user_in.email.lower(),
+        ),
+    )
+
     user = await session.scalar(select(User).where(User.email == user_in.email))
     if user is not None:
         raise HTTPException(
@@ -52,8 +120,10 @@ async def register(
 
     user = User(
         email=user_in.email,
-        hashed_password=get_hashed_password(user_in.password),
+        hashed_password=await get_hashed_password_async(user_in.password),
     )
     session.add(user)
     await session.commit()
+    # The replica may not have the user yet when it makes its first authenticated requests
+    db.record_write(user.user_id)
     return user
@@ -1,15 +1,46 @@
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi_pagination import Params, resolve_params
+from sqlalchemy import (
+    ARRAY,
+    Select,
+    Uuid,
+    any_,
+    bindparam,
+    func,
+    literal,
+    or_,
+    select,
+    union,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
-from app.core.dependencies import get_current_user
-from app.models import Pokemon
-from app.schemas.base import CustomPage
-from app.schemas.pokemon import PokemonResponse, PokemonDetailsResponse
+from app.core import db
+from app.core.catalog_cache import catalog_cache
+from app.core.config import get_settings
+from app.core.dependencies import get_current_user, get_read_db
+from app.core.etag import make_etag, not_modified
+from app.core.pagination import paginate_keyset
+from app.core.responses import (
+    NDJSON_MEDIA_TYPE,
+    POKEMON_RESPONSE_COLUMNS,
+    ndjson_response,
+    paginate_items,
+    paginate_rows,
+)
+from app.models import Pokemon, PokemonPopularity
+from app.schemas.base import CursorPage, CursorParams, CustomPage
+from app.schemas.pokemon import (
+    PokemonBatchGetResponse,
+    PokemonDetailsResponse,
+    PokemonFilters,
+    PokemonResponse,
+    PokemonSearchResult,
+    PopularPokemonResponse,
+)
 
 router = APIRouter(
     prefix="/pokemons",
@@ -18,15 +49,202 @@ router = APIRouter(
 )
 
 
+POKEMON_DETAILS_FIELDS = tuple(PokemonDetailsResponse.model_fields)
+POKEMON_DETAILS_COLUMNS = tuple(getattr(Pokemon, field) for field in POKEMON_DETAILS_FIELDS)
+
+STAT_COLUMNS = {"hp": Pokemon.hp, "attack": Pokemon.attack, "defense": Pokemon.defense, "speed": Pokemon.speed}
+SORT_COLUMNS = {"name": Pokemon.name, "created_at": Pokemon.created_at, **STAT_COLUMNS}
+
+
+def filter_pokemons(query: Select, filters: PokemonFilters) -> Select:
+    """
+    Applies the catalog listing filters and sort to `query`. Every filter and sort key is backed by an
+    index (see the `ix_pokemons_*` indexes). Explicit sorts end with pokemon_id, so pages are stable.
+    """
+    if filters.type is not None:
+        query = query.where(Pokemon.type == filters.type)
+    if filters.rarity is not None:
+        query = query.where(Pokemon.rarity == filters.rarity)
+    for stat, column in STAT_COLUMNS.items():
+        if (minimum := getattr(filters, f"min_{stat}")) is not None:
+            query = query.where(column >= minimum)
+        if (maximum := getattr(filters, f"max_{stat}")) is not None:
+            query = query.where(column <= maximum)
+
+    if not filters.sort:
+        return query.order_by(Pokemon.created_at, Pokemon.pokemon_id)
+    order_by = []
+    for key in filters.sort:
+        column = SORT_COLUMNS[key.value.removeprefix("-")]
+        order_by.append(column.desc() if key.value.startswith("-") else column)
+    # Same direction as the first key, so a single key sort is one (backward) index scan
+    order_by.append(Pokemon.pokemon_id.desc() if filters.sort[0].value.startswith("-") else Pokemon.pokemon_id)
+    return query.order_by(*order_by)
+
+
 @router.get("/", response_model=CustomPage[PokemonResponse])
-async def get_all_pokemons(session: AsyncSession = Depends(get_db)):
-    query = select(Pokemon).order_by(Pokemon.created_at)
-    return await paginate(session, query)
+async def get_all_pokemons(
+        request: Request,
+        filters: Annotated[PokemonFilters, Query()],
+        session: AsyncSession = Depends(get_read_db),
+):
+    params: Params = resolve_params()
+    from_cache = catalog_cache.loaded and filters == PokemonFilters()
+    # The version of the data served: answered without touching the database when the page comes from the
+    # cache, else the database one, read before the page
+    etag = make_etag(
+        "catalog",
+        catalog_cache.version if from_cache else await catalog_cache.probe(session),
+        params.page,
+        params.size,
+        filters.model_dump_json(exclude_defaults=True),
+    )
+    if (response := not_modified(request, "catalog", etag)) is not None:
+        return response
+
+    if from_cache:
+        response = paginate_items(catalog_cache.items())
+    else:
+        query = filter_pokemons(select(*POKEMON_RESPONSE_COLUMNS), filters)
+        response = await paginate_rows(session, query)
+    response.headers["ETag"] = etag
+    return response
+
+
+@router.get("/cursor", response_model=CursorPage[PokemonResponse])
+async def get_all_pokemons_cursor(
+        params: Annotated[CursorParams, Query()],
+        session: AsyncSession = Depends(get_read_db),
+):
+    if catalog_cache.loaded:
+        return catalog_cache.paginate_keyset(params)
+    return await paginate_keyset(session, select(Pokemon), [Pokemon.created_at, Pokemon.pokemon_id], params)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}, "description": "One PokemonResponse per line"}},
+)
+async def export_pokemons():
+    query = select(*POKEMON_RESPONSE_COLUMNS).order_by(Pokemon.created_at, Pokemon.pokemon_id)
+    return ndjson_response(db.read_session_factory(None), query)
+
+
+@router.post("/batch-get", response_model=PokemonBatchGetResponse)
+async def batch_get_pokemons(
+        pokemon_ids: list[UUID],
+        session: AsyncSession = Depends(get_read_db),
+) -> ORJSONResponse:
+    max_ids = get_settings().POKEMON_BATCH_GET_MAX_IDS
+    if len(pokemon_ids) > max_ids:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"At most {max_ids} Pokemon can be fetched at once")
+
+    # Deduplicate, keeping the request order
+    requested_ids = list(dict.fromkeys(str(pokemon_id) for pokemon_id in pokemon_ids))
+
+    # Details of many Pokemon in one round trip, returned in request order, unknown ids listed in `missing`
+    found = {}
+    if catalog_cache.loaded:
+        found = {
+            pokemon_id: {field: item[field] for field in POKEMON_DETAILS_FIELDS}
+            for pokemon_id, item in catalog_cache.get_many(requested_ids).items()
+        }
+    # Not cached (cache disabled, or added since the last refresh), bound as one array parameter
+    if uncached_ids := [pokemon_id for pokemon_id in requested_ids if pokemon_id not in found]:
+        ids = bindparam("pokemon_ids", uncached_ids, type_=ARRAY(Uuid(as_uuid=False)))
+        rows = await session.execute(select(*POKEMON_DETAILS_COLUMNS).where(Pokemon.pokemon_id == any_(ids)))
+        found.update((row.pokemon_id, dict(zip(POKEMON_DETAILS_FIELDS, row))) for row in rows)
+
+    return ORJSONResponse({
+        "items": [found[pokemon_id] for pokemon_id in requested_ids if pokemon_id in found],
+        "missing": [pokemon_id for pokemon_id in requested_ids if pokemon_id not in found],
+    })
+
+
+def search_pokemons_statement(phrase: str, limit: int, max_candidates: int) -> Select:
+    """
+    Pokemon whose name is similar to or contains `phrase` (trigram GIN index on name), or whose
+    description matches it as a web search query (GIN index on the generated `search_vector`).
+    Only the `max_candidates` best name matches and the `max_candidates` best description matches
+    are ranked, which bounds the cost of broad queries without dropping the best matches of either.
+    """
+    query = func.websearch_to_tsquery("english", phrase)
+    pattern = "%" + phrase.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    name_candidates = (
+        select(Pokemon.pokemon_id)
+        .where(or_(Pokemon.name.op("%")(literal(phrase)), Pokemon.name.ilike(pattern, escape="\\")))
+        .order_by(func.similarity(Pokemon.name, phrase).desc())
+        .limit(max_candidates)
+    )
+    description_candidates = (
+        select(Pokemon.pokemon_id)
+        .where(Pokemon.search_vector.op("@@")(query))
+        .order_by(func.ts_rank_cd(Pokemon.search_vector, query).desc())
+        .limit(max_candidates)
+    )
+    candidates = union(name_candidates, description_candidates).subquery("candidates")
+    rank = (func.similarity(Pokemon.name, phrase) + func.ts_rank_cd(Pokemon.search_vector, query)).label("rank")
+    return (
+        select(*POKEMON_RESPONSE_COLUMNS, rank)
+        .join(candidates, candidates.c.pokemon_id == Pokemon.pokemon_id)
+        .order_by(rank.desc(), Pokemon.name)
+        .limit(limit)
+    )
+
+
+@router.get("/search", response_model=list[PokemonSearchResult])
+async def search_pokemons(
+        q: str = Query(min_length=3, max_length=100),
+        limit: int = Query(20, ge=1, le=100),
+        session: AsyncSession = Depends(get_read_db),
+):
+    statement = search_pokemons_statement(q, limit, get_settings().SEARCH_MAX_CANDIDATES)
+    return (await session.execute(statement)).mappings().all()
+
+
+def popular_pokemons_statement(limit: int) -> Select:
+    """
+    The `limit` most favourited Pokemon, read backwards from the (favourite_count, pokemon_id) index of the
+    `pokemon_popularity` counters, which triggers keep up to date, so nothing is counted per request.
+    """
+    return (
+        select(*POKEMON_RESPONSE_COLUMNS, PokemonPopularity.favourite_count)
+        .join(PokemonPopularity, PokemonPopularity.pokemon_id == Pokemon.pokemon_id)
+        .where(PokemonPopularity.favourite_count > 0)
+        .order_by(PokemonPopularity.favourite_count.desc(), PokemonPopularity.pokemon_id.desc())
+        .limit(limit)
+    )
+
+
+@router.get("/popular", response_model=list[PopularPokemonResponse])
+async def get_popular_pokemons(
+        limit: int = Query(10, ge=1, le=100),
+        session: AsyncSession = Depends(get_read_db),
+):
+    return (await session.execute(popular_pokemons_statement(limit))).mappings().all()
 
 
 @router.get("/{pokemon_id}", response_model=PokemonDetailsResponse)
-async def get_pokemon_with_details(pokemon_id: UUID, session: AsyncSession = Depends(get_db)):
+async def get_pokemon_with_details(
+        pokemon_id: UUID,
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(get_read_db),
+):
+    if catalog_cache.loaded and (cached_pokemon := catalog_cache.get(str(pokemon_id))) is not None:
+        etag = make_etag("pokemon", catalog_cache.version, cached_pokemon["pokemon_id"])
+        if (not_modified_response := not_modified(request, "pokemon", etag)) is not None:
+            return not_modified_response
+        response.headers["ETag"] = etag
+        return cached_pokemon
+    # Not cached (cache disabled, or added since the last refresh)
     db_pokemon = await session.scalar(select(Pokemon).where(Pokemon.pokemon_id == pokemon_id))
     if db_pokemon is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pokemon not found")
+    etag = make_etag("pokemon", db_pokemon.pokemon_id, db_pokemon.updated_at)
+    if (not_modified_response := not_modified(request, "pokemon", etag)) is not None:
+        return not_modified_response
+    response.headers["ETag"] = etag
     return db_pokemon
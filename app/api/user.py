@@ -1,49 +1,59 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy import delete
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from app.core import db
 from app.core.db import get_db
-from app.core.dependencies import get_current_user
-from app.core.security import get_hashed_password
+from app.core.dependencies import get_current_user, invalidate_cached_user
+from app.core.refresh_tokens import revoke_refresh_tokens
+from app.core.security import get_hashed_password_async
 from app.models import User
-from app.schemas.user import UserResponse, UserUpdateRequest
+from app.schemas.user import UserResponse, UserSnapshot, UserUpdateRequest
 
 router = APIRouter(prefix="/user", tags=["User"])
 
 
 @router.get("/account", response_model=UserResponse)
 async def get_account(
-        current_user: User = Depends(get_current_user),
-) -> User:
+        current_user: UserSnapshot = Depends(get_current_user),
+) -> UserSnapshot:
     return current_user
 
 
 @router.delete("/account", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_account(
-        current_user: User = Depends(get_current_user),
+        current_user: UserSnapshot = Depends(get_current_user),
         session: AsyncSession = Depends(get_db),
 ) -> None:
+    await revoke_refresh_tokens(session, current_user.user_id)
     await session.execute(delete(User).where(User.user_id == current_user.user_id))
     await session.commit()
+    invalidate_cached_user(current_user.user_id)
 
 
 @router.put("/account", status_code=status.HTTP_201_CREATED, response_model=UserResponse)
 async def update_account(
         user_in: UserUpdateRequest,
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user),
+        current_user: UserSnapshot = Depends(get_current_user),
 ) -> User:
     update_data = user_in.model_dump(exclude_unset=True)  # Only include provided fields
 
     if "password" in update_data:
-        update_data["hashed_password"] = get_hashed_password(update_data.pop("password"))
+        update_data["hashed_password"] = await get_hashed_password_async(update_data.pop("password"))
+        # Sessions started with the old password must log in again
+        await revoke_refresh_tokens(session, current_user.user_id)
 
+    # current_user is a read-only snapshot, update the row itself
+    user = await session.scalar(select(User).where(User.user_id == current_user.user_id))
     for key, value in update_data.items():
-        setattr(current_user, key, value)
+        setattr(user, key, value)
 
-    session.add(current_user)
+    session.add(user)
     await session.commit()
-    await session.refresh(current_user)
+    await session.refresh(user)
+    invalidate_cached_user(current_user.user_id)
+    db.record_write(current_user.user_id)
 
-    return current_user
+    return user
@@ -1,84 +1,171 @@
-from typing import List
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi_pagination import Params, resolve_params
+from sqlalchemy import ARRAY, Select, Uuid, any_, bindparam, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import db
+from app.core.config import get_settings
 from app.core.db import get_db
-from app.core.dependencies import get_current_user
-from app.models import Pokemon, UserPokemon, User
-from app.schemas.base import CustomPage
-from app.schemas.pokemon import PokemonResponse
+from app.core.dependencies import get_current_user, get_read_db
+from app.core.etag import make_etag, not_modified
+from app.core.pagination import paginate_keyset
+from app.core.responses import (
+    NDJSON_MEDIA_TYPE,
+    POKEMON_RESPONSE_COLUMNS,
+    ndjson_response,
+    paginate_rows,
+    pokemon_items,
+)
+from app.models import Pokemon, UserPokemon
+from app.schemas.base import CursorPage, CursorParams, CustomPage
+from app.schemas.pokemon import FavoritePokemonsBulkResponse, PokemonResponse
+from app.schemas.user import UserSnapshot
 
 router = APIRouter(prefix="/user/pokemons", tags=["User favourite pokemons"])
 
 
-@router.post("/bulk", response_model=List[PokemonResponse])
-async def add_favorite_pokemons_bulk(
-        pokemon_ids: List[UUID],
-        session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user)  # Get current user
-) -> List[Pokemon]:
-    # Fetch all pokemons in the provided pokemon_ids
-    result = await session.execute(select(Pokemon).filter(Pokemon.pokemon_id.in_(pokemon_ids)))
-    pokemons = result.scalars().all()
-
-    # Check if any Pokémon in the list doesn't exist
-    if len(pokemons) != len(pokemon_ids):
-        missing_pokemon_ids = set(pokemon_ids) - {pokemon.pokemon_id for pokemon in pokemons}
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=f"Pokemons not found: {', '.join(map(str, missing_pokemon_ids))}")
-
-    # Fetch existing favorite relations to avoid duplicates
-    stmt = select(UserPokemon.pokemon_id).filter(
-        UserPokemon.user_id == current_user.user_id,
-        UserPokemon.pokemon_id.in_(pokemon_ids)
+def add_favorite_pokemons_statement(user_id: str, pokemon_ids: list[str]) -> Select:
+    """
+    Single statement adding the favourites: the requested Pokemon that exist are inserted with
+    ON CONFLICT DO NOTHING, and every existing one is returned (`POKEMON_RESPONSE_COLUMNS`)
+    with an `added` flag.
+    Ids are bound as one array parameter, so the statement doesn't grow with the payload.
+    """
+    ids = bindparam("pokemon_ids", pokemon_ids, type_=ARRAY(Uuid(as_uuid=False)))
+    found = select(Pokemon.pokemon_id).where(Pokemon.pokemon_id == any_(ids)).cte("found")
+    inserted = (
+        insert(UserPokemon)
+        .from_select(
+            ["user_id", "pokemon_id"],
+            select(literal(user_id, Uuid(as_uuid=False)), found.c.pokemon_id),
+        )
+        .on_conflict_do_nothing(index_elements=[UserPokemon.user_id, UserPokemon.pokemon_id])
+        .returning(UserPokemon.pokemon_id)
+        .cte("inserted")
+    )
+    return (
+        select(*POKEMON_RESPONSE_COLUMNS, inserted.c.pokemon_id.is_not(None).label("added"))
+        .join(found, found.c.pokemon_id == Pokemon.pokemon_id)
+        .outerjoin(inserted, inserted.c.pokemon_id == Pokemon.pokemon_id)
     )
-    result = await session.execute(stmt)
-    existing_fav_ids = {fav for fav in result.scalars()}
 
-    # Filter out already favorited Pokémon
-    pokemon_ids_to_add = [str(pokemon_id) for pokemon_id in pokemon_ids if str(pokemon_id) not in existing_fav_ids]
 
-    # If no new favorites are left, return the existing ones
-    if not pokemon_ids_to_add:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="All Pokémon are already assigned as favorites")
+def favorites_version_statement(user_id: str) -> Select:
+    """
+    Cheap version of a user's favourites list. Adding one raises max(created_at), removing one
+    lowers the count, and editing a listed Pokemon raises max(updated_at).
+    """
+    return (
+        select(func.count(), func.max(UserPokemon.created_at), func.max(Pokemon.updated_at))
+        .select_from(UserPokemon)
+        .join(Pokemon, Pokemon.pokemon_id == UserPokemon.pokemon_id)
+        .where(UserPokemon.user_id == user_id)
+    )
 
-    # Create new relations for the remaining Pokémon
-    user_pokemons_to_add = [
-        UserPokemon(user_id=current_user.user_id, pokemon_id=pokemon_id)
-        for pokemon_id in pokemon_ids_to_add
-    ]
 
-    # Add all new favorites in bulk
-    session.add_all(user_pokemons_to_add)
+@router.post("/bulk", response_model=FavoritePokemonsBulkResponse)
+async def add_favorite_pokemons_bulk(
+        pokemon_ids: list[UUID],
+        session: AsyncSession = Depends(get_db),
+        current_user: UserSnapshot = Depends(get_current_user)  # Get current user
+) -> ORJSONResponse:
+    max_ids = get_settings().FAVORITES_BULK_MAX_IDS
+    if len(pokemon_ids) > max_ids:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"At most {max_ids} Pokemon can be added at once")
+
+    # Deduplicate, keeping the request order
+    requested_ids = list(dict.fromkeys(str(pokemon_id) for pokemon_id in pokemon_ids))
+
+    result = await session.execute(add_favorite_pokemons_statement(current_user.user_id, requested_ids))
+    rows = result.all()
     await session.commit()
-
-    # Return only the Pokémon that were successfully added
-    return [pokemon for pokemon in pokemons if pokemon.pokemon_id in pokemon_ids_to_add]
+    db.record_write(current_user.user_id)
+
+    found = {row.pokemon_id: row for row in rows}
+    added, already_favorite, missing = [], [], []
+    for pokemon_id in requested_ids:  # Report in request order
+        row = found.get(pokemon_id)
+        if row is None:
+            missing.append(pokemon_id)
+        elif row.added:
+            added.append(row[:-1])
+        else:
+            already_favorite.append(pokemon_id)
+    return ORJSONResponse({
+        "added": pokemon_items(added),
+        "already_favorite": already_favorite,
+        "missing": missing,
+    })
 
 
 @router.get("/", response_model=CustomPage[PokemonResponse])
 async def get_user_pokemons(
-        session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user)  # Get current user
-) -> CustomPage[PokemonResponse]:
+        request: Request,
+        session: AsyncSession = Depends(get_read_db),
+        current_user: UserSnapshot = Depends(get_current_user)  # Get current user
+) -> ORJSONResponse:
+    params: Params = resolve_params()
+    version = (await session.execute(favorites_version_statement(current_user.user_id))).one()
+    etag = make_etag("favorites", current_user.user_id, tuple(version), params.page, params.size)
+    if (response := not_modified(request, "favorites", etag)) is not None:
+        return response
+
+    # In the order they were added, straight from the (user_id, created_at, pokemon_id) index
+    query = (
+        select(*POKEMON_RESPONSE_COLUMNS)
+        .join(UserPokemon, UserPokemon.pokemon_id == Pokemon.pokemon_id)
+        .filter(UserPokemon.user_id == current_user.user_id)
+        .order_by(UserPokemon.created_at, UserPokemon.pokemon_id)
+    )
+    response = await paginate_rows(session, query)
+    response.headers["ETag"] = etag
+    return response
+
+
+@router.get("/cursor", response_model=CursorPage[PokemonResponse])
+async def get_user_pokemons_cursor(
+        params: Annotated[CursorParams, Query()],
+        session: AsyncSession = Depends(get_read_db),
+        current_user: UserSnapshot = Depends(get_current_user)  # Get current user
+) -> CursorPage[PokemonResponse]:
+    # Favourites are listed in the order they were added
     query = (
         select(Pokemon)
         .join(UserPokemon, UserPokemon.pokemon_id == Pokemon.pokemon_id)
         .filter(UserPokemon.user_id == current_user.user_id)
     )
-    return await paginate(session, query)
+    return await paginate_keyset(session, query, [UserPokemon.created_at, UserPokemon.pokemon_id], params)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}, "description": "One PokemonResponse per line"}},
+)
+async def export_user_pokemons(
+        current_user: UserSnapshot = Depends(get_current_user)  # Get current user
+) -> StreamingResponse:
+    # Favourites are exported in the order they were added
+    query = (
+        select(*POKEMON_RESPONSE_COLUMNS)
+        .join(UserPokemon, UserPokemon.pokemon_id == Pokemon.pokemon_id)
+        .filter(UserPokemon.user_id == current_user.user_id)
+        .order_by(UserPokemon.created_at, UserPokemon.pokemon_id)
+    )
+    return ndjson_response(db.read_session_factory(current_user.user_id), query)
 
 
 @router.delete("/{pokemon_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_favorite_pokemon(
         pokemon_id: UUID,
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user)  # Get current user
+        current_user: UserSnapshot = Depends(get_current_user)  # Get current user
 ) -> None:
     # Fetch the UserPokemon relationship by pokemon_id and current_user.user_id
     user_pokemon = await session.scalar(
@@ -95,3 +182,4 @@ async def remove_favorite_pokemon(
     # Delete the relationship
     await session.delete(user_pokemon)
     await session.commit()
+    db.record_write(current_user.user_id)
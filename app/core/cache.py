@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from typing import Generic, TypeVar
+
+from app.core.metrics import registry
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+cache_lookups = registry.counter(
+    "cache_lookups_total", "In-process cache lookups", ["cache", "result"]
+)
+cache_evictions = registry.counter(
+    "cache_evictions_total", "Entries evicted because a cache was full", ["cache"]
+)
+cache_size = registry.gauge(
+    "cache_size", "Entries held by an in-process cache", ["cache"]
+)
+cache_hit_ratio = registry.gauge(
+    "cache_hit_ratio", "Hits / lookups of an in-process cache since start", ["cache"]
+)
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded in-process cache: entries expire after `ttl` seconds and the least recently used
+    entry is evicted once `max_size` is reached. A `max_size` of 0 disables the cache.
+    Not shared between worker processes, so invalidation only affects the current process.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        cache_size.set_function(lambda: len(self._entries), cache=name)
+        cache_hit_ratio.set_function(self.hit_ratio, cache=name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_ratio(self) -> float:
+        hits = cache_lookups.value(cache=self.name, result="hit")
+        total = hits + cache_lookups.value(cache=self.name, result="miss")
+        return hits / total if total else 0.0
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            cache_lookups.inc(cache=self.name, result="miss")
+            return None
+
+        self._entries.move_to_end(key)
+        cache_lookups.inc(cache=self.name, result="hit")
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Stores `value` for `ttl` seconds (defaults to the cache TTL)."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.max_size <= 0 or ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            cache_evictions.inc(cache=self.name)
+
+    def pop(self, key: K) -> V | None:
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        self._entries.clear()
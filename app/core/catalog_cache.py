@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from bisect import bisect_right
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import registry
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models import CatalogVersion, Pokemon
+from app.schemas.base import CursorPage, CursorParams
+
+logger = logging.getLogger(__name__)
+
+CATALOG_COLUMNS = (
+    Pokemon.pokemon_id,
+    Pokemon.name,
+    Pokemon.description,
+    Pokemon.hp,
+    Pokemon.attack,
+    Pokemon.defense,
+    Pokemon.speed,
+    Pokemon.type,
+    Pokemon.rarity,
+    Pokemon.created_at,
+)
+CATALOG_KEYS = (Pokemon.created_at, Pokemon.pokemon_id)
+
+lookups = registry.counter(
+    "catalog_cache_lookups_total", "Catalog cache lookups", ["result"]
+)
+refreshes = registry.counter(
+    "catalog_cache_refreshes_total", "Catalog cache (re)loads from the database"
+)
+revalidations = registry.counter(
+    "catalog_cache_revalidations_total", "Catalog cache version probes"
+)
+cache_size = registry.gauge("catalog_cache_size", "Pokemon held in the catalog cache")
+
+
+class CatalogCache:
+    """
+    In-memory copy of the `pokemons` table, kept in (created_at, pokemon_id) order.
+    The catalog is a seeded reference dataset, so it is loaded once at startup and then only
+    revalidated by a cheap version probe (the trigger maintained `catalog_version` row) from a background task.
+    Rows are stored as plain dicts, ready to be returned from the endpoints.
+    """
+
+    def __init__(self) -> None:
+        self.version: int | None = None
+        self._items: list[dict[str, Any]] = []
+        self._keys: list[tuple[datetime, str]] = []
+        self._by_id: dict[str, dict[str, Any]] = {}
+        cache_size.set_function(lambda: len(self._items))
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def clear(self) -> None:
+        self.version = None
+        self._items, self._keys, self._by_id = [], [], {}
+
+    @staticmethod
+    async def probe(session: AsyncSession) -> int:
+        """Version of the catalog in the database, a primary key lookup. Changes with every write to `pokemons`."""
+        return await session.scalar(
+            select(CatalogVersion.version).where(CatalogVersion.id == 1)
+        )
+
+    async def load(self, session: AsyncSession) -> None:
+        version = await self.probe(session)
+        rows = (
+            (await session.execute(select(*CATALOG_COLUMNS).order_by(*CATALOG_KEYS)))
+            .mappings()
+            .all()
+        )
+
+        items = [dict(row) for row in rows]
+        self._items = items
+        self._keys = [(item["created_at"], item["pokemon_id"]) for item in items]
+        self._by_id = {item["pokemon_id"]: item for item in items}
+        self.version = version
+        refreshes.inc()
+        logger.info("Loaded %s Pokemon into the catalog cache", len(items))
+
+    async def revalidate(self, session: AsyncSession) -> bool:
+        """Reloads the cache if the catalog changed since it was loaded. Returns True if it did."""
+        revalidations.inc()
+        if self.loaded and await self.probe(session) == self.version:
+            return False
+        await self.load(session)
+        return True
+
+    async def run_refresher(
+        self, session_factory: Callable[[], AsyncSession], interval: float
+    ) -> None:
+        """Background task revalidating the cache every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as session:
+                    await self.revalidate(session)
+            except Exception:
+                logger.exception("Catalog cache revalidation failed")
+
+    def get(self, pokemon_id: str) -> dict[str, Any] | None:
+        item = self._by_id.get(pokemon_id)
+        lookups.inc(result="hit" if item is not None else "miss")
+        return item
+
+    def get_many(self, pokemon_ids: list[str]) -> dict[str, dict[str, Any]]:
+        """Cached Pokemon among `pokemon_ids`, by id."""
+        found = {
+            pokemon_id: item
+            for pokemon_id in pokemon_ids
+            if (item := self._by_id.get(pokemon_id)) is not None
+        }
+        lookups.inc(len(found), result="hit")
+        lookups.inc(len(pokemon_ids) - len(found), result="miss")
+        return found
+
+    def items(self) -> list[dict[str, Any]]:
+        lookups.inc(result="hit")
+        return self._items
+
+    def paginate_keyset(self, params: CursorParams) -> CursorPage:
+        """Same pages as `app.core.pagination.paginate_keyset` over the catalog, served from memory."""
+        lookups.inc(result="hit")
+        start = 0
+        if params.cursor is not None:
+            start = bisect_right(
+                self._keys, tuple(decode_cursor(params.cursor, CATALOG_KEYS))
+            )
+        end = start + params.size
+
+        return CursorPage(
+            items=self._items[start:end],
+            size=params.size,
+            next_cursor=encode_cursor(self._keys[end - 1])
+            if end < len(self._items)
+            else None,
+            estimated_total=len(self._items) if params.include_estimate else None,
+        )
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,291 @@
+import csv
+import logging
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from typing import Any
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import registry
+from app.utils import PokemonRarity, PokemonType
+
+logger = logging.getLogger(__name__)
+
+IMPORT_COLUMNS = (
+    "name",
+    "description",
+    "hp",
+    "attack",
+    "defense",
+    "speed",
+    "type",
+    "rarity",
+)
+STAT_COLUMNS = ("hp", "attack", "defense", "speed")
+MAX_NAME_LENGTH = 100
+MAX_DESCRIPTION_LENGTH = 500
+MAX_STAT = 2**31 - 1  # integer columns
+MAX_REPORTED_ERRORS = 100
+
+imported_records = registry.counter(
+    "catalog_import_records_total",
+    "Records read by catalog imports, staged or rejected",
+    ["result"],
+)
+
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+@dataclass
+class ImportReport:
+    received: int = 0
+    staged: int = 0
+    rejected: int = 0
+    inserted: int = 0
+    updated: int = 0
+    errors: list[str] = field(
+        default_factory=list
+    )  # The first MAX_REPORTED_ERRORS ones
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _enum_lookup(enum: type[Enum]) -> dict[str, str]:
+    """Accepts values ("Fire") and names ("FIRE") in any case, maps them to the names stored in the DB."""
+    lookup = {member.value.lower(): member.name for member in enum}
+    lookup.update({member.name.lower(): member.name for member in enum})
+    return lookup
+
+
+TYPES = _enum_lookup(PokemonType)
+RARITIES = _enum_lookup(PokemonRarity)
+
+# Existing Pokemon keep their id, rows identical to the current ones are not rewritten
+UPSERT_SQL = """
+WITH latest AS (
+    SELECT DISTINCT ON (name) name, description, hp, attack, defense, speed, type, rarity
+    FROM pokemon_import
+    ORDER BY name, record DESC
+), upserted AS (
+    INSERT INTO pokemons (pokemon_id, name, description, hp, attack, defense, speed, type, rarity)
+    SELECT gen_random_uuid(), name, description, hp, attack, defense, speed, type, rarity FROM latest
+    ON CONFLICT (name) DO UPDATE SET
+        description = EXCLUDED.description,
+        hp = EXCLUDED.hp,
+        attack = EXCLUDED.attack,
+        defense = EXCLUDED.defense,
+        speed = EXCLUDED.speed,
+        type = EXCLUDED.type,
+        rarity = EXCLUDED.rarity,
+        updated_at = now()
+    WHERE (pokemons.description, pokemons.hp, pokemons.attack, pokemons.defense, pokemons.speed,
+           pokemons.type, pokemons.rarity)
+        IS DISTINCT FROM (EXCLUDED.description, EXCLUDED.hp, EXCLUDED.attack, EXCLUDED.defense, EXCLUDED.speed,
+                          EXCLUDED.type, EXCLUDED.rarity)
+    RETURNING xmax = 0 AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+"""
+
+# Secondary indexes, the primary key and the unique name one are needed by the upsert itself
+SECONDARY_INDEXES_SQL = """
+SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+FROM pg_index
+WHERE indrelid = 'pokemons'::regclass AND NOT indisunique
+"""
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Lines (without line endings) of a byte stream, whatever the chunk boundaries.
+    Not decoded yet, so that a line that isn't valid UTF-8 only rejects its own record.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if pending.strip():
+        yield pending.rstrip(b"\r")
+
+
+async def iter_records(
+    chunks: AsyncIterable[bytes], import_format: ImportFormat
+) -> AsyncIterator[Any]:
+    """Raw records of a CSV (with a header row) or NDJSON stream. Unparsable ones are returned as errors."""
+    if import_format == ImportFormat.NDJSON:
+        async for line in iter_lines(chunks):
+            if line.strip():
+                try:
+                    yield orjson.loads(line)  # Also rejects invalid UTF-8
+                except orjson.JSONDecodeError as error:
+                    yield ValueError(f"invalid JSON: {error}")
+        return
+
+    header: list[str] | None = None
+    record = b""
+    async for line in iter_lines(chunks):
+        # Quoted fields may contain newlines, a record ends once its quotes are balanced.
+        # Counted on the bytes: a quote byte is never part of a multi-byte UTF-8 character
+        record = record + b"\n" + line if record else line
+        if record.count(b'"') % 2:
+            continue
+        complete, record = record, b""
+        try:
+            values = next(csv.reader([complete.decode("utf-8")]))
+        except UnicodeDecodeError as error:
+            yield ValueError(f"invalid UTF-8: {error}")
+            continue
+        if header is None:
+            header = [name.strip().lower() for name in values]
+        elif values:
+            yield (
+                dict(zip(header, values))
+                if len(values) == len(header)
+                else ValueError(f"expected {len(header)} fields, got {len(values)}")
+            )
+
+
+def validate_record(raw: Any) -> tuple:
+    """Staging table row for a raw record, ValueError if it isn't a valid Pokemon."""
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError("not an object")
+
+    name = str(raw.get("name") or "").strip()
+    if not name or len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f"name is required, at most {MAX_NAME_LENGTH} characters")
+    description = raw.get("description") or None
+    if description is not None and not isinstance(description, str):
+        raise ValueError("description is not a string")
+    if description is not None and len(description) > MAX_DESCRIPTION_LENGTH:
+        raise ValueError(
+            f"description is longer than {MAX_DESCRIPTION_LENGTH} characters"
+        )
+
+    stats = []
+    for stat in STAT_COLUMNS:
+        value = raw.get(stat)
+        try:
+            value = 100 if value in (None, "") else int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{stat} is not an integer: {value!r}") from None
+        if value < 0:
+            raise ValueError(f"{stat} is negative")
+        if value > MAX_STAT:
+            raise ValueError(f"{stat} is larger than {MAX_STAT}")
+        stats.append(value)
+
+    pokemon_type = TYPES.get(str(raw.get("type") or "").strip().lower())
+    if pokemon_type is None:
+        raise ValueError(f"unknown type {raw.get('type')!r}")
+    rarity = RARITIES.get(
+        str(raw.get("rarity") or PokemonRarity.COMMON.value).strip().lower()
+    )
+    if rarity is None:
+        raise ValueError(f"unknown rarity {raw.get('rarity')!r}")
+
+    return name, description, *stats, pokemon_type, rarity
+
+
+async def import_catalog(  # noqa: PLR0913
+    session: AsyncSession,
+    chunks: AsyncIterable[bytes],
+    import_format: ImportFormat,
+    batch_size: int,
+    on_progress: Callable[[ImportReport], None] | None = None,
+    rebuild_indexes: bool = False,
+) -> ImportReport:
+    """
+    Loads Pokemon records into the catalog, upserting them on `name`.
+    Records are validated in batches and COPY'd into a temporary staging table, which is then merged
+    into `pokemons` with a single INSERT ... ON CONFLICT. The caller commits the session.
+    With `rebuild_indexes` the secondary indexes are dropped before the merge and built again after it,
+    much faster when loading a lot of rows, but `pokemons` is locked until the transaction ends.
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+
+    # Through the session first, so the COPYs below run in its transaction
+    await session.execute(
+        text("""
+        CREATE TEMPORARY TABLE pokemon_import (
+            record bigint NOT NULL,
+            name varchar(100) NOT NULL,
+            description varchar(500),
+            hp integer NOT NULL,
+            attack integer NOT NULL,
+            defense integer NOT NULL,
+            speed integer NOT NULL,
+            type pokemontype NOT NULL,
+            rarity pokemonrarity NOT NULL
+        ) ON COMMIT DROP
+    """)
+    )
+    raw_connection = await (await session.connection()).get_raw_connection()
+    copy_connection = raw_connection.driver_connection
+
+    async def stage(batch: list[tuple[int, Any]]) -> None:
+        rows = []
+        for record_number, raw in batch:
+            try:
+                rows.append((record_number, *validate_record(raw)))
+            except ValueError as error:
+                report.rejected += 1
+                if len(report.errors) < MAX_REPORTED_ERRORS:
+                    report.errors.append(f"record {record_number}: {error}")
+        if rows:
+            await copy_connection.copy_records_to_table(
+                "pokemon_import", records=rows, columns=("record", *IMPORT_COLUMNS)
+            )
+        report.staged += len(rows)
+        imported_records.inc(len(rows), result="staged")
+        imported_records.inc(len(batch) - len(rows), result="rejected")
+        report.seconds = time.perf_counter() - start
+        if on_progress is not None:
+            on_progress(report)
+
+    batch: list[tuple[int, Any]] = []
+    async for raw in iter_records(chunks, import_format):
+        report.received += 1
+        batch.append((report.received, raw))
+        if len(batch) >= batch_size:
+            await stage(batch)
+            batch = []
+    if batch:
+        await stage(batch)
+
+    logger.info("Merging %s staged records into the catalog", report.staged)
+    # Temporary tables aren't analyzed by autovacuum
+    await session.execute(text("ANALYZE pokemon_import"))
+    indexes = (
+        (await session.execute(text(SECONDARY_INDEXES_SQL))).all()
+        if rebuild_indexes
+        else []
+    )
+    for index_name, _ in indexes:
+        await session.execute(text(f"DROP INDEX {index_name}"))
+    report.inserted, report.updated = (await session.execute(text(UPSERT_SQL))).one()
+    for _, index_definition in indexes:
+        await session.execute(text(index_definition))
+    report.seconds = time.perf_counter() - start
+    logger.info(
+        "Imported %s Pokemon records in %.1fs: %s inserted, %s updated, %s rejected",
+        report.received,
+        report.seconds,
+        report.inserted,
+        report.updated,
+        report.rejected,
+    )
+    return report
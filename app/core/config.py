@@ -1,5 +1,6 @@
 import logging
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings
@@ -13,12 +14,102 @@ class Settings(BaseSettings):
     DB_PASSWORD: SecretStr
     DB_DB: str
 
+    DB_POOL_SIZE: int = 10
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 5  # Max wait for a free connection
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_WARMUP: int = 5  # Connections opened on startup
+    DB_STATEMENT_CACHE_SIZE: int = (
+        100  # asyncpg prepared statements per connection, 0 with pgbouncer
+    )
+    DB_CONNECT_TIMEOUT_SECONDS: float = 10
+
+    # Read replica, unset values fall back to the primary ones. Without DB_READ_HOST reads go to the primary
+    DB_READ_HOST: str | None = None
+    DB_READ_PORT: int | None = None
+    DB_READ_DB: str | None = None
+    # Reads of a user go to the primary for this long after its write, the client carries it in a cookie
+    DB_READ_YOUR_WRITES_SECONDS: float = 5
+
     LOG_LEVEL: int = logging.INFO  # TODO move it to .env
 
+    # `python -m app.serve`. Each worker has its own DB pool, size DB_POOL_SIZE accordingly
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0 for one per available CPU
+    SERVER_BACKLOG: int = 2048  # Pending connections queued by the kernel
+    SERVER_KEEP_ALIVE_SECONDS: int = (
+        5  # Idle keep-alive connections are closed after this
+    )
+    SERVER_MAX_REQUESTS: int = (
+        0  # A worker is replaced after serving this many requests, 0 never
+    )
+    SERVER_MAX_REQUESTS_JITTER: int = (
+        0  # Random extra requests per worker, so they aren't all replaced at once
+    )
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = (
+        30  # On SIGTERM, in-flight requests get this long to finish
+    )
+
     JWT_ALGORITHM: str = "HS256"
     JWT_KEY: SecretStr
     JWT_EXPIRES_SECONDS: int = 3600
     JWT_ISSUER: str = ""
+    JWT_CACHE_MAX_SIZE: int = (
+        10_000  # Verified tokens kept until they expire, 0 disables the cache
+    )
+    REFRESH_TOKEN_EXPIRES_SECONDS: int = (
+        30 * 24 * 3600
+    )  # Each refresh rotates the token and restarts this
+
+    PASSWORD_HASHER_WORKERS: int = 2  # 0 runs bcrypt inline on the event loop
+    PASSWORD_HASHER_MAX_QUEUE: int = 64
+
+    # Token buckets in front of /auth/login and /auth/register, per email and per client IP. A burst of 0 disables one
+    RATE_LIMIT_BACKEND: Literal["memory", "postgres"] = (
+        "memory"  # "memory" is per process, "postgres" is shared
+    )
+    RATE_LIMIT_MAX_KEYS: int = 100_000  # Buckets kept by the memory backend
+    LOGIN_EMAIL_RATE_BURST: int = 5
+    LOGIN_EMAIL_RATE_PER_MINUTE: float = 5
+    LOGIN_IP_RATE_BURST: int = 20
+    LOGIN_IP_RATE_PER_MINUTE: float = 30
+    REGISTER_EMAIL_RATE_BURST: int = 3
+    REGISTER_EMAIL_RATE_PER_MINUTE: float = 1
+    REGISTER_IP_RATE_BURST: int = 5
+    REGISTER_IP_RATE_PER_MINUTE: float = 5
+
+    CATALOG_CACHE_ENABLED: bool = True
+    CATALOG_CACHE_REFRESH_SECONDS: float = 30
+
+    USER_CACHE_MAX_SIZE: int = 10_000  # 0 disables the cache
+    USER_CACHE_TTL_SECONDS: float = 5  # Per worker, other workers may authenticate a changed / deleted user this long
+
+    FAVORITES_BULK_MAX_IDS: int = 20_000
+    POKEMON_BATCH_GET_MAX_IDS: int = 5_000
+
+    EXPORT_YIELD_PER: int = (
+        1000  # Rows fetched from the server-side cursor at a time by the NDJSON exports
+    )
+
+    IMPORT_BATCH_SIZE: int = (
+        10_000  # Records validated and COPY'd at a time by the catalog import
+    )
+
+    ADMIN_EMAILS: list[str] = []  # Users allowed to use the /admin endpoints
+
+    SEARCH_MAX_CANDIDATES: int = (
+        1000  # Matches ranked per search, bounds the cost of broad queries
+    )
+
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller responses are sent uncompressed
+    COMPRESSION_LEVELS: dict[
+        str, int
+    ] = {}  # Per encoding (gzip, br, zstd), e.g. {"gzip": 6}
+    COMPRESSION_ROUTE_LEVELS: dict[
+        str, dict[str, int]
+    ] = {}  # e.g. {"/pokemons/": {"zstd": 1}}, 0 disables
 
     @property
     def DB_URI(self) -> URL:
@@ -31,6 +122,16 @@ class Settings(BaseSettings):
             database=self.DB_DB,
         )
 
+    @property
+    def DB_READ_URI(self) -> URL | None:
+        if self.DB_READ_HOST is None:
+            return None
+        return self.DB_URI.set(
+            host=self.DB_READ_HOST,
+            port=self.DB_READ_PORT or self.DB_PORT,
+            database=self.DB_READ_DB or self.DB_DB,
+        )
+
     class Config:
         env_file = ".env"
 
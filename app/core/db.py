@@ -1,23 +1,267 @@
+import asyncio
 import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
 
+from sqlalchemy import URL, event, text
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.core.metrics import registry
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
-
-engine = create_async_engine(get_settings().DB_URI)
 
+# Created by `init_engine`, from the app lifespan (or lazily on first use)
+engine: AsyncEngine | None = None
 # Async session factory
-SessionLocal = async_sessionmaker(
-    bind=engine, expire_on_commit=False, class_=AsyncSession
+SessionLocal: async_sessionmaker[AsyncSession] | None = None
+# Read replica engine and session factory, the primary ones if no replica is configured
+read_engine: AsyncEngine | None = None
+ReadSessionLocal: async_sessionmaker[AsyncSession] | None = None
+
+pool_acquire_seconds = registry.histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a connection from the pool",
+    buckets=(
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+    ),
+)
+pool_size = registry.gauge(
+    "db_pool_size", "Configured number of persistent connections"
+)
+pool_checked_out = registry.gauge("db_pool_checked_out", "Connections currently in use")
+pool_idle = registry.gauge("db_pool_idle", "Connections open and waiting in the pool")
+pool_overflow = registry.gauge(
+    "db_pool_overflow", "Connections open beyond the pool size"
+)
+
+
+query_duration_seconds = registry.histogram(
+    "db_query_duration_seconds",
+    "Duration of SQL statements, measured around cursor execution",
+    buckets=(
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+    ),
+)
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Statements executed on behalf of the current request, set by the metrics middleware
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
 )
 
 
+# "<user id>:<unix time>" of the client's last write, sent back by the client with its next requests
+LAST_WRITE_COOKIE = "last_write"
+
+
+@dataclass
+class LastWrite:
+    user_id: str | None = None
+    at: float = 0.0
+    recorded: bool = (
+        False  # Written during the current request, the response updates the cookie
+    )
+
+
+# Last write of the current request's client, set from its cookie by the read-your-writes middleware
+current_last_write: ContextVar[LastWrite | None] = ContextVar(
+    "current_last_write", default=None
+)
+
+
+def _before_cursor_execute(conn, *_) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, *_) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    query_duration_seconds.observe(elapsed)
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+
+def instrument_engine(db_engine: AsyncEngine) -> AsyncEngine:
+    """Attributes the statements executed on `db_engine` to the current request."""
+    sync_engine = db_engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    return db_engine
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_acquire_seconds.observe(time.perf_counter() - start)
+
+
+def _pool_stat(stat: str) -> float:
+    pool = engine.pool if engine is not None else None
+    return getattr(pool, stat)() if hasattr(pool, stat) else 0
+
+
+pool_size.set_function(lambda: _pool_stat("size"))
+pool_checked_out.set_function(lambda: _pool_stat("checkedout"))
+pool_idle.set_function(lambda: _pool_stat("checkedin"))
+pool_overflow.set_function(lambda: max(_pool_stat("overflow"), 0))
+
+
+def create_engine(settings: Settings, url: URL | None = None) -> AsyncEngine:
+    db_engine = create_async_engine(
+        url or settings.DB_URI,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "timeout": settings.DB_CONNECT_TIMEOUT_SECONDS,
+        },
+    )
+    return instrument_engine(db_engine)
+
+
+def init_engine() -> AsyncEngine:
+    """Creates the engines and session factories of this process, if not done yet."""
+    global engine, SessionLocal, read_engine, ReadSessionLocal  # noqa: PLW0603
+    if engine is None:
+        settings = get_settings()
+        engine = create_engine(settings)
+        SessionLocal = async_sessionmaker(
+            bind=engine, expire_on_commit=False, class_=AsyncSession
+        )
+        if settings.DB_READ_URI is not None:
+            read_engine = create_engine(settings, settings.DB_READ_URI)
+            ReadSessionLocal = async_sessionmaker(
+                bind=read_engine, expire_on_commit=False, class_=AsyncSession
+            )
+        else:
+            read_engine, ReadSessionLocal = engine, SessionLocal
+    return engine
+
+
+def record_write(user_id: str) -> None:
+    """
+    Call after committing a write on behalf of `user_id`, to route its next reads to the primary.
+    The response tells the client about the write (`LAST_WRITE_COOKIE`), so whichever worker serves
+    the next requests knows it too.
+    """
+    last_write = current_last_write.get()
+    if last_write is not None:
+        last_write.user_id, last_write.at = str(user_id), time.time()
+        last_write.recorded = True
+
+
+def wrote_recently(user_id: str) -> bool:
+    """Whether the client of the current request wrote on behalf of `user_id` within the read-your-writes window."""
+    last_write = current_last_write.get()
+    return (
+        last_write is not None
+        and last_write.user_id == str(user_id)
+        and 0
+        <= time.time() - last_write.at
+        < get_settings().DB_READ_YOUR_WRITES_SECONDS
+    )
+
+
+def read_session_factory(user_id: str | None) -> async_sessionmaker[AsyncSession]:
+    """Session factory for read-only work on behalf of `user_id`."""
+    if SessionLocal is None:
+        init_engine()
+    if ReadSessionLocal is None or (user_id is not None and wrote_recently(user_id)):
+        return SessionLocal
+    return ReadSessionLocal
+
+
+async def warm_up_pool(db_engine: AsyncEngine, connections: int) -> None:
+    """Opens `connections` connections upfront, so the first requests don't pay for connecting."""
+    if connections <= 0:
+        return
+    start = time.perf_counter()
+    opened = await asyncio.gather(*(db_engine.connect() for _ in range(connections)))
+    await asyncio.gather(
+        *(connection.execute(text("SELECT 1")) for connection in opened)
+    )
+    await asyncio.gather(*(connection.close() for connection in opened))
+    logger.info(
+        "Warmed up %s DB connections in %.3fs", connections, time.perf_counter() - start
+    )
+
+
+def reset_after_fork() -> None:
+    """
+    In a forked worker: forgets the engines inherited from the parent process, without closing their
+    connections, which still belong to the parent. The worker lifespan then creates its own.
+    """
+    global engine, SessionLocal, read_engine, ReadSessionLocal  # noqa: PLW0603
+    for inherited in {engine, read_engine} - {None}:
+        inherited.sync_engine.dispose(close=False)
+    engine, SessionLocal, read_engine, ReadSessionLocal = None, None, None, None
+
+
+async def dispose_engine() -> None:
+    global engine, SessionLocal, read_engine, ReadSessionLocal  # noqa: PLW0603
+    if read_engine is not None and read_engine is not engine:
+        await read_engine.dispose()
+    if engine is not None:
+        await engine.dispose()
+    engine, SessionLocal, read_engine, ReadSessionLocal = None, None, None, None
+
+
 async def get_db():
     """Dependency to provide an async database session for FastAPI endpoints."""
+    if SessionLocal is None:
+        init_engine()
     async with SessionLocal() as session:
         try:
             yield session
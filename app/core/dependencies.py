@@ -1,23 +1,64 @@
+from collections.abc import AsyncGenerator
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends, HTTPException
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.core.db import get_db
+from app.core import db
+from app.core.cache import TTLCache
+from app.core.config import get_settings
 from app.core.security import verify_jwt_token
 from app.models import User
+from app.schemas.auth import JWTTokenPayload
+from app.schemas.user import UserSnapshot
 
 oauth2_scheme = HTTPBearer()
 
 
-async def get_current_user(
+@lru_cache
+def get_user_cache() -> TTLCache[str, UserSnapshot]:
+    """Users by id, so authenticated requests don't have to query the users table."""
+    settings = get_settings()
+    return TTLCache("users", max_size=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    """
+    Must be called whenever a user is changed or deleted. Only clears this worker's cache, the other workers
+    keep the user until it expires (USER_CACHE_TTL_SECONDS).
+    """
+    get_user_cache().pop(str(user_id))
+
+
+async def get_token_payload(
         token: Annotated[HTTPAuthorizationCredentials, Depends(oauth2_scheme)],
-        session: AsyncSession = Depends(get_db),
-) -> User:
-    token_payload = verify_jwt_token(token.credentials)
+) -> JWTTokenPayload:
+    return verify_jwt_token(token.credentials)
+
+
+async def get_read_db(
+        token_payload: JWTTokenPayload = Depends(get_token_payload),
+) -> AsyncGenerator[AsyncSession]:
+    """
+    Dependency to provide a session on the read replica, for GET endpoints.
+    Shortly after the user's own write (`db.record_write`) its reads go to the primary instead.
+    """
+    async with db.read_session_factory(token_payload.sub)() as session:
+        yield session
+
+
+async def get_current_user(
+        token_payload: JWTTokenPayload = Depends(get_token_payload),
+        session: AsyncSession = Depends(get_read_db),
+) -> UserSnapshot:
+    user_cache = get_user_cache()
+    current_user = user_cache.get(token_payload.sub)
+    if current_user is not None:
+        return current_user
 
     user = await session.scalar(select(User).where(User.user_id == token_payload.sub))
 
@@ -26,4 +67,19 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Unauthorized",
         )
-    return user
+
+    # Read-only copy, not attached to the session, that can be shared between requests
+    current_user = UserSnapshot.model_validate(user)
+    user_cache.set(token_payload.sub, current_user)
+    return current_user
+
+
+async def get_admin_user(
+        current_user: UserSnapshot = Depends(get_current_user),
+) -> UserSnapshot:
+    if current_user.email not in get_settings().ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Forbidden",
+        )
+    return current_user
@@ -0,0 +1,66 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response, status
+
+from app.core.metrics import registry
+
+RESOURCES = ("catalog", "pokemon", "favorites")
+
+conditional_requests = registry.counter(
+    "etag_requests_total",
+    "Requests to ETag enabled endpoints, hit = answered with 304",
+    ["resource", "result"],
+)
+etag_hit_ratio = registry.gauge(
+    "etag_hit_ratio",
+    "Share of requests to ETag enabled endpoints answered with 304 since start",
+    ["resource"],
+)
+
+
+def hit_ratio(resource: str) -> float:
+    hits = conditional_requests.value(resource=resource, result="hit")
+    total = hits + conditional_requests.value(resource=resource, result="miss")
+    return hits / total if total else 0.0
+
+
+for _resource in RESOURCES:
+    etag_hit_ratio.set_function(
+        lambda resource=_resource: hit_ratio(resource), resource=_resource
+    )
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag derived from a version signal, e.g. (resource, version, page, size)."""
+    return (
+        '"'
+        + hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+        + '"'
+    )
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """`If-None-Match` check, with the weak comparison RFC 9110 prescribes for it."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in header.split(",")
+    )
+
+
+def not_modified(request: Request, resource: str, etag: str) -> Response | None:
+    """
+    A `304 Not Modified` response if the client already has the `etag` representation, None otherwise.
+    Endpoints call it as soon as they know the version, before querying or serializing anything else.
+    """
+    if etag_matches(request, etag):
+        conditional_requests.inc(resource=resource, result="hit")
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    conditional_requests.inc(resource=resource, result="miss")
+    return None
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import TypeVar
+
+from app.core.config import get_settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+queue_depth = registry.gauge(
+    "password_hasher_queue_depth",
+    "Password hashing jobs submitted and not finished yet",
+)
+job_duration = registry.histogram(
+    "password_hasher_duration_seconds",
+    "Time from submitting a password hashing job until its result is available",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0),
+)
+rejected_jobs = registry.counter(
+    "password_hasher_rejected_total",
+    "Password hashing jobs rejected because the queue was full",
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full and the job was not accepted."""
+
+
+class PasswordHasher:
+    """
+    Runs CPU bound bcrypt calls in a process pool, so they never block the event loop.
+    At most `max_queue` jobs are accepted at a time, further ones are rejected with `PasswordHasherBusy`.
+    With `workers=0` jobs run inline on the event loop (no pool), which is only useful for debugging.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        queue_depth.set_function(lambda: self._pending)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self) -> None:
+        """Start the worker processes upfront instead of on the first job."""
+        if self.workers and self._executor is None:
+            # "spawn" so workers don't inherit the event loop or open DB connections of the parent
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(
+                "Started password hasher with %s worker processes", self.workers
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, operation: str, func: Callable[..., T], *args: object) -> T:
+        if self._pending >= self.max_queue:
+            rejected_jobs.inc()
+            raise PasswordHasherBusy(
+                f"{self._pending} password hashing jobs already queued"
+            )
+
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            if not self.workers:
+                return func(*args)
+            self.start()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            job_duration.observe(time.perf_counter() - start, operation=operation)
+
+
+@lru_cache
+def get_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(
+        workers=settings.PASSWORD_HASHER_WORKERS,
+        max_queue=settings.PASSWORD_HASHER_MAX_QUEUE,
+    )
@@ -0,0 +1,338 @@
+import math
+import time
+import zlib
+from collections.abc import Callable, Iterable, Mapping
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.db import (
+    LAST_WRITE_COOKIE,
+    LastWrite,
+    QueryStats,
+    current_last_write,
+    current_query_stats,
+)
+from app.core.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # Optional, install the "compression" extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional, install the "compression" extra
+    zstandard = None
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+requests_total = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"],
+)
+request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the response is sent",
+    ["method", "route"],
+)
+request_db_queries = registry.histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+request_db_seconds = registry.histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL statements per HTTP request",
+    ["method", "route"],
+)
+
+
+class MetricsMiddleware:
+    """
+    Records per-route latency, status codes, and the number and duration of the SQL statements
+    each request ran (collected by the engine hooks in `app.core.db`).
+    Routes are labelled by their path template, so the label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        query_stats = QueryStats()
+        token = current_query_stats.set(query_stats)
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_query_stats.reset(token)
+
+            # Set on the scope by the router once the request matched a route
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": getattr(route, "path", UNMATCHED_ROUTE),
+            }
+            requests_total.inc(status=str(status_code), **labels)
+            request_duration_seconds.observe(elapsed, **labels)
+            request_db_queries.observe(query_stats.queries, **labels)
+            request_db_seconds.observe(query_stats.seconds, **labels)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Carries the client's last write (`db.record_write`) between its requests in a cookie, so its reads
+    go to the primary for `DB_READ_YOUR_WRITES_SECONDS` after it, whichever worker serves them.
+    A forged cookie can only send the client's own reads to the primary.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        last_write = parse_last_write(
+            HTTPConnection(scope).cookies.get(LAST_WRITE_COOKIE, "")
+        )
+        token = current_last_write.set(last_write)
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and last_write.recorded:
+                window = get_settings().DB_READ_YOUR_WRITES_SECONDS
+                cookie = (
+                    f"{LAST_WRITE_COOKIE}={last_write.user_id}:{last_write.at:.3f}; "
+                    f"Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=lax"
+                )
+                MutableHeaders(scope=message).append("set-cookie", cookie)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            current_last_write.reset(token)
+
+
+def parse_last_write(cookie: str) -> LastWrite:
+    user_id, _, at = cookie.rpartition(":")
+    try:
+        return LastWrite(user_id=user_id or None, at=float(at))
+    except ValueError:
+        return LastWrite()
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes:
+        """Compresses `data` and flushes it, so the client can decode everything sent so far."""
+
+    def finish(self) -> bytes: ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Content-Encoding -> compressor, in server preference order, optional codecs only when installed
+COMPRESSORS: dict[str, Callable[[int], Compressor]] = {}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+COMPRESSORS["gzip"] = GzipCompressor
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> str | None:
+    """Best available encoding for an `Accept-Encoding` header, by client q-value then server preference."""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the best encoding the client accepts (zstd, br or gzip).
+    Responses smaller than `min_size` are sent as is. Streaming responses are compressed chunk by
+    chunk and flushed after every chunk, so the client receives each one as soon as it is produced.
+    `route_levels` maps route paths to per-encoding levels overriding `levels`, a level of 0 disables
+    compression for the route.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_size: int = 1024,
+        levels: Mapping[str, int] | None = None,
+        route_levels: Mapping[str, Mapping[str, int]] | None = None,
+    ) -> None:
+        self.app = app
+        self.min_size = min_size
+        self.levels = {"gzip": 6, "br": 4, "zstd": 3, **(levels or {})}
+        self.route_levels = route_levels or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""), COMPRESSORS)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compressor: Compressor | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                response_headers = Headers(raw=message["headers"])
+                content_type = response_headers.get("content-type", "")
+                if (
+                    "content-encoding" in response_headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Wait for the first body chunk to decide
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                level = self.level_for(scope, encoding)
+                response_headers = MutableHeaders(raw=start_message["headers"])
+                content_length = response_headers.get("content-length")
+                too_small = (
+                    len(body) < self.min_size
+                    if not more_body
+                    else content_length is not None
+                    and int(content_length) < self.min_size
+                )
+                if level == 0 or too_small:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = COMPRESSORS[encoding](level)
+                response_headers["Content-Encoding"] = encoding
+                response_headers.add_vary_header("Accept-Encoding")
+                # The compressed representation is a different one, keep If-None-Match working (weak match)
+                if (etag := response_headers.get("etag")) and not etag.startswith("W/"):
+                    response_headers["ETag"] = f"W/{etag}"
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    response_headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del response_headers["Content-Length"]
+                await send(start_message)
+
+            compressed = compressor.compress(body) if body else b""
+            if not more_body:
+                compressed += compressor.finish()
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": compressed,
+                    "more_body": more_body,
+                }
+            )
+
+        await self.app(scope, receive, send_compressed)
+
+    def level_for(self, scope: Scope, encoding: str) -> int:
+        # Set on the scope by the router once the request matched a route
+        route = scope.get("route")
+        route_levels = self.route_levels.get(getattr(route, "path", None), {})
+        return route_levels.get(encoding, self.levels[encoding])
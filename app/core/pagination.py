@@ -0,0 +1,103 @@
+import base64
+import binascii
+import json
+import uuid
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, Uuid, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.schemas.base import CursorPage, CursorParams
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encodes the sort key of the last row of a page into an opaque cursor."""
+    raw = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime) else str(value)
+            for value in values
+        ]
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_value(key: InstrumentedAttribute, value: Any) -> Any:
+    """A value of a cursor, checked and typed like `key`, so bad input never reaches the database."""
+    if not isinstance(value, str):
+        raise TypeError("Cursor values are strings")
+    if isinstance(key.type, Uuid):
+        parsed = uuid.UUID(value)
+        return parsed if key.type.as_uuid else str(parsed)
+    if key.type.python_type is datetime:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            raise ValueError("Cursor datetimes are timezone aware")
+        return parsed
+    return key.type.python_type(value)
+
+
+def decode_cursor(cursor: str, keys: Sequence[InstrumentedAttribute]) -> list[Any]:
+    """Decodes a cursor created by `encode_cursor` back into values typed like `keys`."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("Cursor does not match the sort key")
+        return [decode_value(key, value) for key, value in zip(keys, values)]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+async def estimate_count(session: AsyncSession, query: Select) -> int:
+    """Row count of `query` as estimated by the Postgres planner, without running it."""
+    connection = await session.connection()
+    compiled = query.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    # Sent as is, text() would take colons in the literals for bind parameters
+    plan = (
+        await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def paginate_keyset(
+    session: AsyncSession,
+    query: Select,
+    keys: Sequence[InstrumentedAttribute],
+    params: CursorParams,
+) -> CursorPage:
+    """
+    Keyset pagination of `query` (selecting a single entity) ordered by `keys`.
+    The last key must be unique, so that the order is total. Every page costs the same,
+    no matter how deep, as long as an index on `keys` backs the query, and no COUNT is run.
+    """
+    page_query = query
+    if params.cursor is not None:
+        values = decode_cursor(params.cursor, keys)
+        page_query = page_query.where(
+            tuple_(*keys)
+            > tuple_(*(literal(value, key.type) for key, value in zip(keys, values)))
+        )
+    page_query = page_query.add_columns(*keys).order_by(*keys).limit(params.size + 1)
+
+    rows = (await session.execute(page_query)).all()
+    has_next = len(rows) > params.size
+    rows = rows[: params.size]
+
+    return CursorPage(
+        items=[row[0] for row in rows],
+        size=params.size,
+        next_cursor=encode_cursor(rows[-1][1:]) if has_next else None,
+        estimated_total=await estimate_count(session, query)
+        if params.include_estimate
+        else None,
+    )
@@ -0,0 +1,71 @@
+import logging
+
+from sqlalchemy import ARRAY, Uuid, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+reconciled = registry.counter(
+    "pokemon_popularity_reconciled_total",
+    "Favourite counters found out of date and repaired by reconciliation",
+)
+
+# Counters differing from the favourites they count, including favourited Pokemon without one
+DRIFTED_SQL = """
+SELECT pokemon_id
+FROM (SELECT pokemon_id, count(*) AS favourite_count FROM users_pokemons GROUP BY pokemon_id) AS actual
+FULL JOIN pokemon_popularity AS popularity USING (pokemon_id)
+WHERE popularity.favourite_count IS DISTINCT FROM coalesce(actual.favourite_count, 0)
+"""
+
+# Locked in the same order as the users_pokemons triggers update them. Counters created here aren't visible
+# to the SELECT, they are uncommitted inserts of this transaction, which block the triggers just as well
+LOCK_SQL = """
+WITH created AS (
+    INSERT INTO pokemon_popularity (pokemon_id, favourite_count)
+    SELECT pokemon_id, 0 FROM pokemons WHERE pokemon_id = ANY(:pokemon_ids) ORDER BY pokemon_id
+    ON CONFLICT (pokemon_id) DO NOTHING
+)
+SELECT pokemon_id FROM pokemon_popularity WHERE pokemon_id = ANY(:pokemon_ids) ORDER BY pokemon_id FOR UPDATE
+"""
+
+REPAIR_SQL = """
+UPDATE pokemon_popularity AS popularity
+SET favourite_count = coalesce(actual.favourite_count, 0), updated_at = now()
+FROM unnest(CAST(:pokemon_ids AS uuid[])) AS drifted (pokemon_id)
+LEFT JOIN (
+    SELECT pokemon_id, count(*) AS favourite_count
+    FROM users_pokemons
+    WHERE pokemon_id = ANY(:pokemon_ids)
+    GROUP BY pokemon_id
+) AS actual USING (pokemon_id)
+WHERE popularity.pokemon_id = drifted.pokemon_id
+    AND popularity.favourite_count IS DISTINCT FROM coalesce(actual.favourite_count, 0)
+"""
+
+
+async def reconcile_popularity(session: AsyncSession) -> int:
+    """
+    Recounts the favourites of every Pokemon whose `pokemon_popularity` counter drifted (e.g. rows
+    changed with the triggers disabled), returns how many were repaired. The caller commits the session.
+    Drift is found without locking anything, then the drifted counters are locked, so favourites being
+    added or removed concurrently wait for the commit, and only then recounted: each counter ends up
+    exact, whatever commits before or after.
+    """
+    drifted = (await session.scalars(text(DRIFTED_SQL))).all()
+    if not drifted:
+        return 0
+
+    ids = bindparam(
+        "pokemon_ids",
+        [str(pokemon_id) for pokemon_id in drifted],
+        type_=ARRAY(Uuid(as_uuid=False)),
+    )
+    await session.execute(text(LOCK_SQL).bindparams(ids))
+    # A statement of its own, so it counts the favourites committed while it waited for the locks
+    repaired = (await session.execute(text(REPAIR_SQL).bindparams(ids))).rowcount
+    reconciled.inc(repaired)
+    logger.info("Repaired %s of %s drifted favourite counters", repaired, len(drifted))
+    return repaired
@@ -0,0 +1,133 @@
+import math
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Protocol
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+
+from app.core import db
+from app.core.config import get_settings
+from app.core.metrics import registry
+
+rate_limit_checks = registry.counter(
+    "rate_limit_checks_total", "Rate limit checks by result", ["limit", "result"]
+)
+
+# Refilled with `rate` tokens per second up to `capacity`, each request takes one token if there is one.
+# A denied request changes nothing, the refill is computed from the last update
+REFILLED = (
+    "least(CAST(:capacity AS float8), "
+    "bucket.tokens + CAST(extract(epoch FROM now() - bucket.updated_at) AS float8) * CAST(:rate AS float8))"
+)
+CONSUME_SQL = f"""
+INSERT INTO rate_limit_buckets AS bucket (key, tokens, created_at, updated_at)
+VALUES (:key, CAST(:capacity AS float8) - 1, now(), now())
+ON CONFLICT (key) DO UPDATE SET tokens = {REFILLED} - 1, updated_at = now()
+WHERE {REFILLED} >= 1
+RETURNING tokens
+"""
+RETRY_AFTER_SQL = f"SELECT (1 - {REFILLED}) / CAST(:rate AS float8) FROM rate_limit_buckets AS bucket WHERE key = :key"
+PRUNE_SQL = "DELETE FROM rate_limit_buckets WHERE updated_at < now() - interval '1 day'"
+PRUNE_PROBABILITY = 0.001
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    name: str
+    burst: int  # Requests allowed at once, 0 disables the limit
+    per_minute: float  # Sustained rate
+
+
+class RateLimitBackend(Protocol):
+    async def consume(self, key: str, capacity: float, rate: float) -> float:
+        """Takes a token from the `key` bucket. Returns 0 if there was one, else the seconds until there is."""
+
+
+class InMemoryBackend:
+    """Buckets of the current process only, the least recently used ones are dropped beyond `max_keys`."""
+
+    def __init__(
+        self, max_keys: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = (
+            OrderedDict()
+        )  # key -> (tokens, updated)
+
+    async def consume(self, key: str, capacity: float, rate: float) -> float:
+        now = self.clock()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return 0.0
+
+
+class PostgresBackend:
+    """Buckets in the `rate_limit_buckets` table, shared by all workers. One statement per allowed request."""
+
+    async def consume(self, key: str, capacity: float, rate: float) -> float:
+        if db.SessionLocal is None:
+            db.init_engine()
+        params = {"key": key, "capacity": capacity, "rate": rate}
+        async with db.SessionLocal() as session:
+            allowed = (
+                await session.execute(text(CONSUME_SQL), params)
+            ).first() is not None
+            retry_after = (
+                0.0
+                if allowed
+                else (await session.scalar(text(RETRY_AFTER_SQL), params))
+            )
+            if random.random() < PRUNE_PROBABILITY:
+                await session.execute(text(PRUNE_SQL))
+            await session.commit()
+        return max(float(retry_after), 0.0)
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+
+    async def check(self, limit: RateLimit, value: str) -> float:
+        """Counts a request of `value` (an email, an IP...) against `limit`, returns the seconds to wait if denied."""
+        if limit.burst <= 0:
+            return 0.0
+        retry_after = await self.backend.consume(
+            f"{limit.name}:{value}", limit.burst, limit.per_minute / 60
+        )
+        rate_limit_checks.inc(
+            limit=limit.name, result="denied" if retry_after else "allowed"
+        )
+        return retry_after
+
+    async def enforce(self, *checks: tuple[RateLimit, str]) -> None:
+        """Raises 429 with `Retry-After` if any of the `(limit, value)` checks is denied."""
+        retry_after = 0.0
+        for limit, value in checks:
+            retry_after = max(retry_after, await self.check(limit, value))
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+
+@lru_cache
+def get_rate_limiter() -> RateLimiter:
+    settings = get_settings()
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        return RateLimiter(PostgresBackend())
+    return RateLimiter(InMemoryBackend(settings.RATE_LIMIT_MAX_KEYS))
@@ -0,0 +1,78 @@
+import hashlib
+import secrets
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import RefreshToken
+
+
+def hash_refresh_token(token: str) -> str:
+    # Tokens are 256 random bits, a fast unsalted hash is enough to make a leaked table useless
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _new_token() -> tuple[str, str, datetime]:
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.now(UTC) + timedelta(
+        seconds=get_settings().REFRESH_TOKEN_EXPIRES_SECONDS
+    )
+    return token, hash_refresh_token(token), expires_at
+
+
+async def issue_refresh_token(
+    session: AsyncSession, user_id: str
+) -> tuple[str, datetime]:
+    """New refresh token for `user_id`, also dropping its expired ones. The caller commits."""
+    token, token_hash, expires_at = _new_token()
+    await session.execute(
+        delete(RefreshToken).where(
+            RefreshToken.user_id == user_id, RefreshToken.expires_at <= func.now()
+        )
+    )
+    session.add(
+        RefreshToken(token_hash=token_hash, user_id=user_id, expires_at=expires_at)
+    )
+    return token, expires_at
+
+
+async def rotate_refresh_token(
+    session: AsyncSession, token: str
+) -> tuple[str, str, datetime] | None:
+    """
+    Exchanges a valid refresh token for a new one, in a single statement: the used token is deleted
+    by primary key and its replacement inserted. Returns (user_id, new token, expiry), None if the
+    token is unknown, expired, already used or revoked. The caller commits.
+    """
+    new_token, new_token_hash, expires_at = _new_token()
+    used = (
+        delete(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(token),
+            RefreshToken.expires_at > func.now(),
+        )
+        .returning(RefreshToken.user_id)
+        .cte("used")
+    )
+    user_id = await session.scalar(
+        insert(RefreshToken)
+        .from_select(
+            ["token_hash", "user_id", "expires_at"],
+            select(
+                literal(new_token_hash),
+                used.c.user_id,
+                literal(expires_at, RefreshToken.expires_at.type),
+            ),
+        )
+        .returning(RefreshToken.user_id)
+    )
+    if user_id is None:
+        return None
+    return user_id, new_token, expires_at
+
+
+async def revoke_refresh_tokens(session: AsyncSession, user_id: str) -> None:
+    """Invalidates all the refresh tokens of `user_id`. The caller commits."""
+    await session.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id))
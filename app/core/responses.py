@@ -0,0 +1,97 @@
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping, Sequence
+from math import ceil
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi_pagination import Params, resolve_params
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Pokemon
+from app.schemas.pokemon import PokemonResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Exactly the fields of `PokemonResponse`, in the same order
+POKEMON_RESPONSE_FIELDS = tuple(PokemonResponse.model_fields)
+POKEMON_RESPONSE_COLUMNS = tuple(
+    getattr(Pokemon, field) for field in POKEMON_RESPONSE_FIELDS
+)
+
+
+def pokemon_items(rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+    """`PokemonResponse` shaped dicts from rows selected with `POKEMON_RESPONSE_COLUMNS`."""
+    return [dict(zip(POKEMON_RESPONSE_FIELDS, row)) for row in rows]
+
+
+def project_pokemon_items(items: Iterable[Mapping[str, Any]]) -> list[dict[str, Any]]:
+    """`PokemonResponse` shaped dicts from wider Pokemon dicts (e.g. catalog cache entries)."""
+    return [{field: item[field] for field in POKEMON_RESPONSE_FIELDS} for item in items]
+
+
+def page_response(
+    items: list[dict[str, Any]], total: int, params: Params
+) -> ORJSONResponse:
+    """
+    Same body as `CustomPage`, encoded with orjson. Returning a response from an endpoint skips
+    its `response_model` validation, so callers must only pass items already matching the model.
+    """
+    return ORJSONResponse(
+        {
+            "items": items,
+            "total": total,
+            "page": params.page,
+            "size": params.size,
+            "pages": ceil(total / params.size),
+        }
+    )
+
+
+def count_query(query: Select) -> Select:
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+async def paginate_rows(session: AsyncSession, query: Select) -> ORJSONResponse:
+    """LIMIT/OFFSET + COUNT pagination of a `POKEMON_RESPONSE_COLUMNS` query, see `page_response`."""
+    params: Params = (
+        resolve_params()
+    )  # Set by the `CustomPage` dependency of the endpoint
+    limit_offset = params.to_raw_params().as_limit_offset()
+    total = await session.scalar(count_query(query))
+    rows = await session.execute(
+        query.limit(limit_offset.limit).offset(limit_offset.offset)
+    )
+    return page_response(pokemon_items(rows), total, params)
+
+
+def paginate_items(items: Sequence[Mapping[str, Any]]) -> ORJSONResponse:
+    """In-memory counterpart of `paginate_rows`."""
+    params: Params = resolve_params()
+    limit_offset = params.to_raw_params().as_limit_offset()
+    page = items[limit_offset.offset : limit_offset.offset + limit_offset.limit]
+    return page_response(project_pokemon_items(page), len(items), params)
+
+
+def ndjson_response(
+    session_factory: Callable[[], AsyncSession], query: Select
+) -> StreamingResponse:
+    """
+    Streams a `POKEMON_RESPONSE_COLUMNS` query as newline delimited JSON, one Pokemon per line.
+    Rows come from a server-side cursor, `EXPORT_YIELD_PER` at a time, and the next batch is only
+    fetched once the previous one was sent, so memory stays constant and slow clients slow the query
+    down instead of buffering the result. The stream owns its session, request scoped ones are
+    closed before the body is sent.
+    """
+    yield_per = get_settings().EXPORT_YIELD_PER
+
+    async def lines() -> AsyncIterator[bytes]:
+        async with session_factory() as session:
+            result = await session.stream(query.execution_options(yield_per=yield_per))
+            async for rows in result.partitions():
+                yield b"".join(
+                    orjson.dumps(item) + b"\n" for item in pokemon_items(rows)
+                )
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
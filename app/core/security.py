@@ -1,14 +1,22 @@
+import hashlib
 import time
+from functools import lru_cache
 
 import bcrypt
 import jwt
 from fastapi import HTTPException, status
 
+from app.core.cache import TTLCache
 from app.core.config import get_settings
+from app.core.hashing import PasswordHasherBusy, get_password_hasher
 from app.schemas.auth import JWTToken, JWTTokenPayload
 
 ### PASSWORD ###
 
+# Hash of a random password, with the same bcrypt cost as the real ones. Logins of unknown emails are checked
+# against it, so they cost as much as the others and don't reveal which emails are registered
+DUMMY_PASSWORD_HASH = "$2b$12$fFXIlIP3Ygcoyg7UoLOhcujQlot5CBekD5WdcNV4tFmXxYvmTcgfy"
+
 
 def verify_password(hashed_password: str, password: str) -> bool:
     """
@@ -28,6 +36,31 @@ def get_hashed_password(password: str) -> str:
     return hashed.decode("utf-8")
 
 
+async def verify_password_async(hashed_password: str, password: str) -> bool:
+    """
+    Same as `verify_password`, but runs in the password hasher worker pool.
+    """
+    return await _run_password_job("verify", verify_password, hashed_password, password)
+
+
+async def get_hashed_password_async(password: str) -> str:
+    """
+    Same as `get_hashed_password`, but runs in the password hasher worker pool.
+    """
+    return await _run_password_job("hash", get_hashed_password, password)
+
+
+async def _run_password_job(operation, func, *args):
+    try:
+        return await get_password_hasher().run(operation, func, *args)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+
 ### JWT ###
 
 
@@ -52,8 +85,32 @@ def create_jwt_token(user_id: str) -> JWTToken:
     return JWTToken(payload=token_payload, access_token=access_token)
 
 
+@lru_cache(maxsize=1)
+def key_digest(key: str) -> bytes:
+    """Stands for the signing key in the JWT cache keys, so the entries don't hold copies of the secret."""
+    return hashlib.sha256(key.encode("utf-8")).digest()
+
+
+@lru_cache
+def get_jwt_cache() -> TTLCache[tuple[bytes, str, str, bytes], JWTTokenPayload]:
+    """Verified token payloads, kept until the token expires."""
+    return TTLCache("jwt", max_size=get_settings().JWT_CACHE_MAX_SIZE, ttl=float("inf"))
+
+
 def verify_jwt_token(token: str) -> JWTTokenPayload:
     settings = get_settings()
+    # The key includes the verification settings, so changing them never serves a stale result
+    cache_key = (
+        hashlib.sha256(token.encode("utf-8")).digest(),
+        settings.JWT_ALGORITHM,
+        settings.JWT_ISSUER,
+        key_digest(settings.JWT_KEY.get_secret_value()),
+    )
+    jwt_cache = get_jwt_cache()
+    token_payload = jwt_cache.get(cache_key)
+    if token_payload is not None:
+        return token_payload
+
     try:
         payload = jwt.decode(
             token,
@@ -68,4 +125,6 @@ def verify_jwt_token(token: str) -> JWTTokenPayload:
             detail=f"Token invalid: {e}",
         )
 
-    return JWTTokenPayload(**payload)
+    token_payload = JWTTokenPayload(**payload)
+    jwt_cache.set(cache_key, token_payload, ttl=token_payload.exp - time.time())
+    return token_payload
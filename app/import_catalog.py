@@ -0,0 +1,91 @@
+"""
+Bulk loads Pokemon into the catalog from a CSV (with a header row) or NDJSON file, upserting them by name.
+
+    python -m app.import_catalog pokemons.csv
+    python -m app.import_catalog pokemons.ndjson --batch-size 50000 --rebuild-indexes
+
+Progress is reported on stderr after every batch, the final report is printed as JSON on stdout.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import orjson
+
+from app.core import db
+from app.core.catalog_import import ImportFormat, ImportReport, import_catalog
+from app.core.config import get_settings
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := file.read(READ_CHUNK_SIZE):
+            yield chunk
+
+
+def print_progress(report: ImportReport) -> None:
+    rate = report.received / report.seconds if report.seconds else 0
+    print(
+        f"{report.received} records read, {report.staged} staged, {report.rejected} rejected ({rate:,.0f}/s)",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("path", type=Path)
+    parser.add_argument(
+        "--format",
+        type=ImportFormat,
+        choices=list(ImportFormat),
+        help="By default from the file extension",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=get_settings().IMPORT_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--rebuild-indexes",
+        action="store_true",
+        help="Drop the secondary indexes and build them again after the merge, for large loads. Locks the catalog",
+    )
+    args = parser.parse_args()
+
+    import_format = args.format
+    if import_format is None:
+        extension = args.path.suffix.lower().lstrip(".")
+        import_format = (
+            ImportFormat.NDJSON
+            if extension in ("ndjson", "jsonl")
+            else ImportFormat.CSV
+        )
+
+    # On stderr with the progress, stdout only gets the report
+    logging.basicConfig(level=get_settings().LOG_LEVEL)
+    db.init_engine()
+    try:
+        async with db.SessionLocal() as session:
+            report = await import_catalog(
+                session,
+                read_chunks(args.path),
+                import_format,
+                args.batch_size,
+                on_progress=print_progress,
+                rebuild_indexes=args.rebuild_indexes,
+            )
+            await session.commit()
+    finally:
+        await db.dispose_engine()
+    print(orjson.dumps(report.as_dict(), option=orjson.OPT_INDENT_2).decode())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,79 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi_pagination import add_pagination
 from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp
 
-from app.api import auth, pokemons, user, user_pokemons
+from app.api import admin, auth, metrics, pokemons, user, user_pokemons
+from app.core import db
+from app.core.catalog_cache import catalog_cache
+from app.core.config import get_settings
+from app.core.hashing import get_password_hasher
 from app.core.logging_config import setup_logging
+from app.core.middleware import (
+    CompressionMiddleware,
+    MetricsMiddleware,
+    ReadYourWritesMiddleware,
+)
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    # Nothing but the app definition happens at import time, so importing the app (tests, tools,
+    # a server preloading it) stays cheap and side effect free
+    setup_logging()
+    logging.info("Starting FastAPI application...")
+    settings = get_settings()
+    password_hasher = get_password_hasher()
+    password_hasher.start()
+
+    await db.warm_up_pool(
+        db.init_engine(), min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+    )
+    if db.read_engine is not db.engine:
+        await db.warm_up_pool(
+            db.read_engine, min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+        )
+
+    catalog_refresher = None
+    if settings.CATALOG_CACHE_ENABLED:
+        async with db.SessionLocal() as session:
+            await catalog_cache.load(session)
+        catalog_refresher = asyncio.create_task(
+            catalog_cache.run_refresher(
+                db.SessionLocal, settings.CATALOG_CACHE_REFRESH_SECONDS
+            )
+        )
+
+    # Built once here instead of by the first /docs or /openapi.json request
+    application.openapi()
+
+    yield
+
+    if catalog_refresher is not None:
+        catalog_refresher.cancel()
+        with suppress(asyncio.CancelledError):
+            await catalog_refresher
+        catalog_cache.clear()
+    await db.dispose_engine()
+    password_hasher.shutdown()
+
 
-setup_logging()
+def compression_middleware(application: ASGIApp) -> CompressionMiddleware:
+    """Built with the middleware stack on the first request or lifespan event, so not at import time."""
+    settings = get_settings()
+    return CompressionMiddleware(
+        application,
+        min_size=settings.COMPRESSION_MIN_SIZE,
+        levels=settings.COMPRESSION_LEVELS,
+        route_levels=settings.COMPRESSION_ROUTE_LEVELS,
+    )
 
-logging.info("Starting FastAPI application...")
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]  # TODO add origins to .env
 
@@ -22,12 +84,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(compression_middleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(pokemons.router)
 app.include_router(user_pokemons.router)
+app.include_router(admin.router)
+app.include_router(metrics.router)
 
 # Pagination
 add_pagination(app)
@@ -1,3 +1,5 @@
 from .base import Base  # noqa
 from .user import User  # noqa
-from .pokemon import Pokemon, UserPokemon  # noqa
+from .pokemon import CatalogVersion, Pokemon, PokemonPopularity, UserPokemon  # noqa
+from .rate_limit import RateLimitBucket  # noqa
+from .refresh_token import RefreshToken  # noqa
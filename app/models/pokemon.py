@@ -1,15 +1,40 @@
 import uuid
 
-from sqlalchemy import String, Uuid, Enum, ForeignKey, UniqueConstraint
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    Computed,
+    Enum,
+    ForeignKey,
+    Index,
+    SmallInteger,
+    String,
+    Uuid,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models import User
 from app.models.base import Base
-from app.utils import PokemonType, PokemonRarity
+from app.utils import PokemonRarity, PokemonType
 
 
 class Pokemon(Base):
     __tablename__ = "pokemons"
+    __table_args__ = (
+        # Keyset pagination of the catalog
+        Index("ix_pokemons_created_at_pokemon_id", "created_at", "pokemon_id"),
+        # Catalog listing filters and sort keys
+        Index("ix_pokemons_type_created_at_pokemon_id", "type", "created_at", "pokemon_id"),
+        Index("ix_pokemons_rarity_created_at_pokemon_id", "rarity", "created_at", "pokemon_id"),
+        Index("ix_pokemons_hp_pokemon_id", "hp", "pokemon_id"),
+        Index("ix_pokemons_attack_pokemon_id", "attack", "pokemon_id"),
+        Index("ix_pokemons_defense_pokemon_id", "defense", "pokemon_id"),
+        Index("ix_pokemons_speed_pokemon_id", "speed", "pokemon_id"),
+        # Search: fuzzy / substring name matching and full-text description matching
+        Index("ix_pokemons_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_pokemons_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     pokemon_id: Mapped[str] = mapped_column(
         Uuid(as_uuid=False), primary_key=True, default=lambda _: str(uuid.uuid4())
@@ -25,24 +50,57 @@ class Pokemon(Base):
     type: Mapped[PokemonType] = mapped_column(Enum(PokemonType), nullable=False)
     rarity: Mapped[PokemonRarity] = mapped_column(Enum(PokemonRarity), nullable=False, default=PokemonRarity.COMMON)
 
+    # Maintained by PostgreSQL, only loaded when accessed
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, Computed("to_tsvector('english', coalesce(description, ''))", persisted=True), deferred=True
+    )
+
     user_pokemons: Mapped[list["UserPokemon"]] = relationship("UserPokemon", back_populates="pokemon")
 
 
 class UserPokemon(Base):
     __tablename__ = "users_pokemons"
     __table_args__ = (
-        UniqueConstraint('user_id', 'pokemon_id', name='uix_user_pokemon_unique'),
+        # Favourites of a user in insertion order, index-only (the primary key columns are all in it)
+        Index("ix_users_pokemons_user_id_created_at_pokemon_id", "user_id", "created_at", "pokemon_id"),
     )
 
-    id: Mapped[str] = mapped_column(
-        Uuid(as_uuid=False), primary_key=True,default=lambda _: str(uuid.uuid4())
-    )
     user_id: Mapped[str] = mapped_column(
-        Uuid(as_uuid=False), ForeignKey("users.user_id"), nullable=False
+        Uuid(as_uuid=False), ForeignKey("users.user_id"), primary_key=True
     )
     pokemon_id: Mapped[str] = mapped_column(
-        Uuid(as_uuid=False), ForeignKey("pokemons.pokemon_id"), nullable=False
+        Uuid(as_uuid=False), ForeignKey("pokemons.pokemon_id"), primary_key=True
     )
 
     user: Mapped["User"] = relationship("User", back_populates="user_pokemons")
     pokemon: Mapped["Pokemon"] = relationship("Pokemon", back_populates="user_pokemons")
+
+
+class PokemonPopularity(Base):
+    """
+    Number of users having each Pokemon as a favourite. Maintained by statement-level triggers on
+    `users_pokemons` (migration ca7a7bec47d7), repaired by `app.reconcile_popularity`.
+    Pokemon nobody added yet may have no row.
+    """
+    __tablename__ = "pokemon_popularity"
+    __table_args__ = (
+        # Most favourited first, read backwards
+        Index("ix_pokemon_popularity_favourite_count_pokemon_id", "favourite_count", "pokemon_id"),
+    )
+
+    pokemon_id: Mapped[str] = mapped_column(
+        Uuid(as_uuid=False), ForeignKey("pokemons.pokemon_id", ondelete="CASCADE"), primary_key=True
+    )
+    favourite_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class CatalogVersion(Base):
+    """
+    Single row counting the statements that changed `pokemons`, bumped by a statement-level trigger
+    (migration 4e1c9b7d2f60). The version signal of the catalog ETags and of the catalog cache.
+    """
+    __tablename__ = "catalog_version"
+    __table_args__ = (CheckConstraint("id = 1", name="ck_catalog_version_single_row"),)
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,17 @@
+from sqlalchemy import Float, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class RateLimitBucket(Base):
+    """
+    Token buckets of the shared rate limiter backend (`RATE_LIMIT_BACKEND=postgres`).
+    UNLOGGED, losing them in a crash only resets the limits.
+    """
+
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key: Mapped[str] = mapped_column(String(300), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
@@ -0,0 +1,33 @@
+"""
+Repairs the favourite counters of `pokemon_popularity` that drifted from `users_pokemons`, meant to run
+periodically (e.g. nightly from cron). Safe to run while favourites are being added and removed.
+
+    python -m app.reconcile_popularity
+"""
+
+import argparse
+import asyncio
+
+from app.core import db
+from app.core.logging_config import setup_logging
+from app.core.popularity import reconcile_popularity
+
+
+async def main() -> None:
+    argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    ).parse_args()
+    setup_logging()
+
+    db.init_engine()
+    try:
+        async with db.SessionLocal() as session:
+            repaired = await reconcile_popularity(session)
+            await session.commit()
+    finally:
+        await db.dispose_engine()
+    print(f"{repaired} favourite counters repaired")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
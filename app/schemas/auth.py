@@ -1,13 +1,21 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class AccessTokenResponse(BaseModel):
     token_type: str = "Bearer"
     access_token: str
     expires_at: int
+    refresh_token: str  # Single use, exchange it at /auth/refresh for new tokens
+    refresh_expires_at: int
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class JWTTokenPayload(BaseModel):
+    model_config = ConfigDict(frozen=True)  # Shared through the verification cache
+
     iss: str
     sub: str
     exp: int
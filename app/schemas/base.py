@@ -1,8 +1,9 @@
-from typing import TypeVar
+from typing import Generic, TypeVar
 
 from fastapi import Query
 from fastapi_pagination import Page
 from fastapi_pagination.customization import CustomizedPage, UseParamsFields
+from pydantic import BaseModel, Field
 
 T = TypeVar("T")
 
@@ -10,3 +11,18 @@ CustomPage = CustomizedPage[
     Page[T],
     UseParamsFields(size=Query(10, ge=1, le=1000)),
 ]
+
+
+class CursorParams(BaseModel):
+    cursor: str | None = None
+    size: int = Field(10, ge=1, le=1000)
+    include_estimate: bool = False
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    size: int
+    next_cursor: str | None = None
+    estimated_total: int | None = (
+        None  # Planner estimate, only if include_estimate was requested
+    )
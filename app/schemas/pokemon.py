@@ -1,8 +1,8 @@
-from typing import Optional
+from enum import Enum
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from app.utils import PokemonType, PokemonRarity
+from app.utils import PokemonRarity, PokemonType
 
 
 class PokemonResponse(BaseModel):
@@ -17,4 +17,64 @@ class PokemonResponse(BaseModel):
 
 
 class PokemonDetailsResponse(PokemonResponse):
-    description: Optional[str] = None
+    description: str | None = None
+
+
+class PokemonBatchGetResponse(BaseModel):
+    items: list[PokemonDetailsResponse]  # In request order
+    missing: list[str]
+
+
+class PokemonSearchResult(PokemonResponse):
+    rank: float  # Name similarity + description full-text rank, higher is more relevant
+
+
+class PopularPokemonResponse(PokemonResponse):
+    favourite_count: int
+
+
+class FavoritePokemonsBulkResponse(BaseModel):
+    added: list[PokemonResponse]
+    already_favorite: list[str]
+    missing: list[str]
+
+
+class PokemonSort(str, Enum):
+    """Sort keys of the catalog listing, "-" prefix for descending. Each one is backed by an index."""
+
+    NAME = "name"
+    NAME_DESC = "-name"
+    HP = "hp"
+    HP_DESC = "-hp"
+    ATTACK = "attack"
+    ATTACK_DESC = "-attack"
+    DEFENSE = "defense"
+    DEFENSE_DESC = "-defense"
+    SPEED = "speed"
+    SPEED_DESC = "-speed"
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+
+
+class PokemonFilters(BaseModel):
+    type: PokemonType | None = None
+    rarity: PokemonRarity | None = None
+    min_hp: int | None = Field(None, ge=0)
+    max_hp: int | None = Field(None, ge=0)
+    min_attack: int | None = Field(None, ge=0)
+    max_attack: int | None = Field(None, ge=0)
+    min_defense: int | None = Field(None, ge=0)
+    max_defense: int | None = Field(None, ge=0)
+    min_speed: int | None = Field(None, ge=0)
+    max_speed: int | None = Field(None, ge=0)
+    sort: list[PokemonSort] = []  # Applied in order, e.g. ?sort=-attack&sort=name
+
+
+class PokemonImportReport(BaseModel):
+    received: int
+    staged: int
+    rejected: int
+    inserted: int
+    updated: int
+    errors: list[str]  # The first ones only
+    seconds: float
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 
 class UserCreateRequest(BaseModel):
@@ -13,3 +13,12 @@ class UserResponse(BaseModel):
 
 class UserUpdateRequest(BaseModel):
     password: str | None
+
+
+class UserSnapshot(BaseModel):
+    """Authenticated user, detached from the DB session and immutable."""
+
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
+    user_id: str
+    email: str
@@ -0,0 +1,186 @@
+"""
+Production server: a master process preloading the app and forking uvicorn workers that share its
+listening socket. Configured by the SERVER_* settings.
+
+    python -m app.serve
+
+The master imports the app once, then forks SERVER_WORKERS workers (one per available CPU by default).
+Each worker runs the app lifespan, so it creates its own DB engine and pool after the fork. Workers that
+exit (e.g. after SERVER_MAX_REQUESTS requests) are replaced, while the socket keeps queueing connections.
+A connection a worker accepted just before stopping, but hadn't read a request from, is closed; clients
+retry such idempotent requests.
+On SIGTERM or SIGINT every worker stops accepting connections, finishes its in-flight requests
+(SERVER_GRACEFUL_TIMEOUT_SECONDS at most), runs the lifespan shutdown, which disposes its pool, and exits.
+uvloop and httptools are used when installed (the `server` extra).
+"""
+
+import importlib.util
+import logging
+import math
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from app.core import db
+from app.core.config import Settings, get_settings
+from app.core.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+STARTUP_FAILURE = 3  # Exit code of a worker whose lifespan startup failed
+
+
+def cpu_quota(cpu_max: str) -> int | None:
+    """CPUs allowed by a cgroup v2 `cpu.max` value ("<quota> <period>" or "max <period>"), rounded up."""
+    quota, _, period = cpu_max.strip().partition(" ")
+    if quota == "max" or not period:
+        return None
+    return max(1, math.ceil(int(quota) / int(period)))
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, within the container CPU limit if there is one."""
+    cpus = (
+        len(os.sched_getaffinity(0))
+        if hasattr(os, "sched_getaffinity")
+        else os.cpu_count() or 1
+    )
+    try:
+        with open(CGROUP_CPU_MAX) as file:
+            quota = cpu_quota(file.read())
+    except (OSError, ValueError):
+        quota = None
+    return min(cpus, quota) if quota is not None else cpus
+
+
+def worker_count(settings: Settings) -> int:
+    return settings.SERVER_WORKERS or available_cpus()
+
+
+def uvicorn_config(app, settings: Settings) -> uvicorn.Config:
+    """Config of one worker. Each draws its own jitter, so workers aren't all recycled at the same time."""
+    max_requests = None
+    if settings.SERVER_MAX_REQUESTS:
+        max_requests = settings.SERVER_MAX_REQUESTS + random.randint(
+            0, settings.SERVER_MAX_REQUESTS_JITTER
+        )
+    return uvicorn.Config(
+        app,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        lifespan="on",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_SECONDS,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        log_config=None,  # Keep the logging set up by the master
+        access_log=False,
+    )
+
+
+def bind_socket(settings: Settings) -> socket.socket:
+    sock = socket.socket(
+        socket.AF_INET6 if ":" in settings.SERVER_HOST else socket.AF_INET
+    )
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.SERVER_HOST, settings.SERVER_PORT))
+    sock.listen(settings.SERVER_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket) -> None:
+    """Body of a forked worker, never returns."""
+    exit_code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        db.reset_after_fork()
+        server = uvicorn.Server(uvicorn_config(app, get_settings()))
+        server.run(
+            sockets=[sock]
+        )  # Handles SIGTERM / SIGINT itself, draining then shutting the lifespan down
+        exit_code = 0 if server.started else STARTUP_FAILURE
+    except BaseException:
+        logger.exception("Worker %s failed", os.getpid())
+    finally:
+        logging.shutdown()
+        os._exit(exit_code)
+
+
+def spawn_worker(app, sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        run_worker(app, sock)
+    logger.info("Started worker %s", pid)
+    return pid
+
+
+def serve() -> int:
+    """Runs the master process until SIGTERM / SIGINT, returns its exit code."""
+    setup_logging()
+    settings = get_settings()
+
+    # Preloaded once, the workers share these pages until they write to them
+    from app.main import app
+
+    sock = bind_socket(settings)
+    workers = worker_count(settings)
+    logger.info(
+        "Serving on %s:%s with %s workers (%s, %s)",
+        settings.SERVER_HOST,
+        settings.SERVER_PORT,
+        workers,
+        "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "httptools" if importlib.util.find_spec("httptools") else "h11",
+    )
+
+    stopping = False
+
+    def stop(signum, _) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    pids = {spawn_worker(app, sock) for _ in range(workers)}
+    exit_code = 0
+    while not stopping:
+        time.sleep(0.1)
+        while pids and (exited := os.waitpid(-1, os.WNOHANG))[0]:
+            pid, status = exited
+            pids.discard(pid)
+            if os.waitstatus_to_exitcode(status) == STARTUP_FAILURE:
+                logger.error("Worker %s failed to start, shutting down", pid)
+                stopping, exit_code = True, STARTUP_FAILURE
+            elif not stopping:
+                logger.info("Worker %s exited, replacing it", pid)
+                pids.add(spawn_worker(app, sock))
+
+    logger.info("Shutting down %s workers", len(pids))
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT_SECONDS + 5
+    while pids and time.monotonic() < deadline:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if pid:
+            pids.discard(pid)
+        else:
+            time.sleep(0.1)
+    for pid in pids:
+        logger.warning("Worker %s didn't stop in time, killing it", pid)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    sock.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(serve())
@@ -1,12 +1,17 @@
 import asyncio
+import hashlib
+import os
 import uuid
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable
+from pathlib import Path
 
 import pytest
 import pytest_asyncio
 import sqlalchemy
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import Connection, delete
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
@@ -16,35 +21,101 @@ from alembic import command
 from alembic.config import Config
 from app.core import db
 from app.core.config import get_settings
+from app.core.hashing import get_password_hasher
+from app.core.rate_limit import get_rate_limiter
 from app.core.security import create_jwt_token
 from app.main import app
-from app.models import User
+from app.models import User, UserPokemon
 from app.tests.factories import BaseFactory
 
+MIGRATIONS_DIR = Path(__file__).parents[2] / "alembic" / "versions"
+TEMPLATE_LOCK_ID = (
+    8_217_493_010  # pg_advisory_lock key serializing the template builds and clones
+)
+
+
+def template_db_name() -> str:
+    """Name of the template database for the current migrations, so a changed migration gets a new one."""
+    digest = hashlib.sha256()
+    for path in sorted(MIGRATIONS_DIR.glob("*.py")):
+        digest.update(path.read_bytes())
+    return f"test_template_{digest.hexdigest()[:16]}"
+
 
 async def run_async_migrations(db_uri: str, db_name: str):
     """Runs Alembic migrations asynchronously by executing them in a subprocess."""
     alembic_cfg = Config("alembic.ini")
     alembic_cfg.set_main_option("sqlalchemy.url", f"{db_uri}/{db_name}")
 
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, command.upgrade, alembic_cfg, "head")
+    # Alembic env reads the database from the settings
+    with pytest.MonkeyPatch.context() as env_patch:
+        env_patch.setenv("DB_DB", db_name)
+        get_settings.cache_clear()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, command.upgrade, alembic_cfg, "head")
+    get_settings.cache_clear()
+
+
+async def clone_template_db(admin_engine: AsyncEngine, db_name: str) -> None:
+    """
+    Creates `db_name` as a copy of the migrated template database, building the template first if needed.
+    The migrations run once for all pytest-xdist workers (and runs) instead of once per database.
+    """
+    template_name = template_db_name()
+    async with admin_engine.connect() as conn:
+        # Concurrent workers wait for the one building the template, a template is cloned only while unused
+        await conn.execute(
+            sqlalchemy.text(f"SELECT pg_advisory_lock({TEMPLATE_LOCK_ID})")
+        )
+        try:
+            templates = dict(
+                (
+                    await conn.execute(
+                        sqlalchemy.text(
+                            "SELECT datname, datistemplate FROM pg_database WHERE datname LIKE 'test\\_template\\_%'"
+                        )
+                    )
+                ).all()
+            )
+            # Marked as a template only once migrated, anything else is stale or left by an interrupted build
+            for name, is_template in templates.items():
+                if name != template_name or not is_template:
+                    await conn.execute(
+                        sqlalchemy.text(f"ALTER DATABASE {name} IS_TEMPLATE false")
+                    )
+                    await conn.execute(
+                        sqlalchemy.text(f"DROP DATABASE {name} WITH (FORCE)")
+                    )
+            if not templates.get(template_name):
+                await conn.execute(sqlalchemy.text(f"CREATE DATABASE {template_name}"))
+                await run_async_migrations(get_settings().DB_URI, template_name)
+                await conn.execute(
+                    sqlalchemy.text(f"ALTER DATABASE {template_name} IS_TEMPLATE true")
+                )
+
+            await conn.execute(sqlalchemy.text(f"DROP DATABASE IF EXISTS {db_name}"))
+            await conn.execute(
+                sqlalchemy.text(f"CREATE DATABASE {db_name} TEMPLATE {template_name}")
+            )
+        finally:
+            await conn.execute(
+                sqlalchemy.text(f"SELECT pg_advisory_unlock({TEMPLATE_LOCK_ID})")
+            )
 
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
 async def setup_test_db():
-    """Setup test database"""
+    """Setup test database, one per pytest-xdist worker"""
     # Create test_db_name
-    test_db_name = f"test_db_{str(uuid.uuid4()).replace('-', '_')}"
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    test_db_name = f"test_db_{worker}_{uuid.uuid4().hex}"
 
     # Create admin connection to the DB with isolation_level autocommit. It's important
     settings = get_settings()
     admin_engine = create_async_engine(settings.DB_URI, isolation_level="AUTOCOMMIT")
 
-    # Create test database
-    async with admin_engine.connect() as conn:
-        await conn.execute(sqlalchemy.text(f"DROP DATABASE IF EXISTS {test_db_name}"))
-        await conn.execute(sqlalchemy.text(f"CREATE DATABASE {test_db_name}"))
+    # Create test database, with the app tables
+    await clone_template_db(admin_engine, test_db_name)
 
     # Patch envs
     session_patch = pytest.MonkeyPatch()
@@ -52,50 +123,119 @@ async def setup_test_db():
     get_settings.cache_clear()
 
     new_settings = get_settings()
-    new_engine = create_async_engine(new_settings.DB_URI)
+    new_engine = db.instrument_engine(create_async_engine(new_settings.DB_URI))
     new_sessionmaker = async_sessionmaker(new_engine, expire_on_commit=False)
 
     # Patch the db module with the new engine and sessionmaker
     session_patch.setattr(db, "engine", new_engine)
     session_patch.setattr(db, "SessionLocal", new_sessionmaker)
-
-    # create app tables in test database
-    await run_async_migrations(settings.DB_URI, test_db_name)
+    session_patch.setattr(db, "read_engine", new_engine)
+    session_patch.setattr(db, "ReadSessionLocal", new_sessionmaker)
 
     # Let the tests run
     yield
 
     # Clean up after all tests have run
+    await new_engine.dispose()
     async with admin_engine.connect() as conn:
-        # Terminate all active connections to the test database
         await conn.execute(
-            sqlalchemy.text(
-                f"""
-                SELECT pg_terminate_backend(pg_stat_activity.pid)
-                FROM pg_stat_activity
-                WHERE pg_stat_activity.datname = '{test_db_name}'
-                AND pid <> pg_backend_pid()
-                """
-            )
+            sqlalchemy.text(f"DROP DATABASE IF EXISTS {test_db_name} WITH (FORCE)")
         )
-        # Drop the test database
-        await conn.execute(sqlalchemy.text(f"DROP DATABASE IF EXISTS {test_db_name}"))
 
     # Properly dispose engines
     await admin_engine.dispose()
+    get_password_hasher().shutdown()
 
 
 @pytest_asyncio.fixture(scope="function")
-async def session(monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[AsyncSession]:
-    """Create session for tests"""
+async def replica_db() -> AsyncGenerator[async_sessionmaker[AsyncSession]]:
+    """
+    Second database standing in for a read replica, with the same schema as the test database.
+    Nothing is replicated to it, so it behaves like a replica lagging behind forever.
+    The app reads go to it while the fixture is active.
+    """
+    settings = get_settings()
+    replica_db_name = f"{settings.DB_DB}_replica"
+    admin_engine = create_async_engine(settings.DB_URI, isolation_level="AUTOCOMMIT")
+    await clone_template_db(admin_engine, replica_db_name)
+
+    replica_engine = create_async_engine(settings.DB_URI.set(database=replica_db_name))
+    replica_sessionmaker = async_sessionmaker(replica_engine, expire_on_commit=False)
+    with pytest.MonkeyPatch.context() as replica_patch:
+        replica_patch.setattr(db, "read_engine", replica_engine)
+        replica_patch.setattr(db, "ReadSessionLocal", replica_sessionmaker)
+        yield replica_sessionmaker
+
+    await replica_engine.dispose()
+    async with admin_engine.connect() as conn:
+        await conn.execute(
+            sqlalchemy.text(f"DROP DATABASE IF EXISTS {replica_db_name} WITH (FORCE)")
+        )
+    await admin_engine.dispose()
+
+
+def uncounted_savepoint(
+    do_savepoint: Callable[[Connection, str], None],
+) -> Callable[[Connection, str], None]:
+    """
+    Runs a SAVEPOINT statement of the test transaction outside of the request's query stats: the app's
+    transactions are real ones outside the tests, their BEGIN / COMMIT aren't run through a cursor.
+    """
+
+    def execute(connection: Connection, name: str) -> None:
+        token = db.current_query_stats.set(None)
+        try:
+            do_savepoint(connection, name)
+        finally:
+            db.current_query_stats.reset(token)
+
+    return execute
+
+
+@pytest_asyncio.fixture(scope="function")
+async def session(
+    request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch
+) -> AsyncGenerator[AsyncSession]:
+    """
+    Create session for tests.
+    Each test runs in a transaction rolled back at its end: the session and the app's sessions join it
+    with SAVEPOINTs, so their commits only release these. Tests marked `committed` commit for real instead.
+    """
     connection = await db.engine.connect()
-    session = AsyncSession(bind=connection, expire_on_commit=False)
+    if request.node.get_closest_marker("committed"):
+        session = AsyncSession(bind=connection, expire_on_commit=False)
+        yield session
+        await session.close()
+        await connection.close()
+        return
 
-    monkeypatch.setattr(db, "get_db", lambda: session)
+    transaction = await connection.begin()
+    for method in ("do_savepoint", "do_release_savepoint", "do_rollback_to_savepoint"):
+        monkeypatch.setattr(
+            connection.dialect,
+            method,
+            uncounted_savepoint(getattr(connection.dialect, method)),
+        )
+    session = AsyncSession(
+        bind=connection,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+    # A single session for the app: a request holds a read and a write session at once, their SAVEPOINTs
+    # would interleave on the shared connection
+    app_session = AsyncSession(
+        bind=connection,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+    monkeypatch.setattr(db, "SessionLocal", lambda: app_session)
+    monkeypatch.setattr(db, "ReadSessionLocal", lambda: app_session)
 
     yield session
 
     await session.close()
+    await app_session.close()
+    await transaction.rollback()
     await connection.close()
 
 
@@ -110,6 +250,12 @@ async def setup_factories(session: AsyncSession) -> AsyncGenerator:
     yield
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limiter() -> None:
+    """Every test starts with full rate limit buckets."""
+    get_rate_limiter.cache_clear()
+
+
 @pytest_asyncio.fixture(scope="function")
 async def default_user(session: AsyncSession) -> AsyncGenerator[User]:
     """Creates a default user in the test database."""
@@ -119,7 +265,10 @@ async def default_user(session: AsyncSession) -> AsyncGenerator[User]:
     await session.refresh(user)
     yield user
 
-    # Cleanup: Delete the user after the test
+    # Cleanup: Delete the user and its favourites after the test
+    await session.execute(
+        delete(UserPokemon).where(UserPokemon.user_id == user.user_id)
+    )
     await session.delete(user)
     await session.commit()
 
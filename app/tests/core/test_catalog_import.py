@@ -0,0 +1,71 @@
+import pytest
+
+from app.core.catalog_import import ImportFormat, iter_records, validate_record
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+async def test_iter_records_csv_across_chunks(chunk_size: int) -> None:
+    data = b'name,description,type\r\nPikachu,"Mouse, ""electric""\r\nand yellow",Electric\r\nBulbasaur,,Grass'
+
+    records = [
+        record
+        async for record in iter_records(chunked(data, chunk_size), ImportFormat.CSV)
+    ]
+
+    assert records == [
+        {
+            "name": "Pikachu",
+            "description": 'Mouse, "electric"\nand yellow',
+            "type": "Electric",
+        },
+        {"name": "Bulbasaur", "description": "", "type": "Grass"},
+    ]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_iter_records_rejects_invalid_utf8() -> None:
+    csv_data = b'name,type\nPikachu,Electric\n"Bad\xff\nname",Fire\nBulbasaur,Grass\n'
+    ndjson_data = b'{"name": "Pikachu"}\n{"name": "Bad\xff"}\n'
+
+    records = [
+        record async for record in iter_records(chunked(csv_data, 4), ImportFormat.CSV)
+    ]
+    assert records[0] == {"name": "Pikachu", "type": "Electric"}
+    assert isinstance(records[1], ValueError)
+    assert records[2:] == [{"name": "Bulbasaur", "type": "Grass"}]
+
+    records = [
+        record
+        async for record in iter_records(chunked(ndjson_data, 4), ImportFormat.NDJSON)
+    ]
+    assert records[0] == {"name": "Pikachu"}
+    assert isinstance(records[1], ValueError)
+
+
+def test_validate_record() -> None:
+    assert validate_record({"name": " Pikachu ", "type": "electric", "hp": "35"}) == (
+        "Pikachu",
+        None,
+        35,
+        100,
+        100,
+        100,
+        "ELECTRIC",
+        "COMMON",
+    )
+    with pytest.raises(ValueError, match="attack is not an integer"):
+        validate_record({"name": "Pikachu", "type": "Electric", "attack": "strong"})
+    with pytest.raises(ValueError, match="unknown rarity"):
+        validate_record({"name": "Pikachu", "type": "Electric", "rarity": "Shiny"})
+    with pytest.raises(ValueError, match="name is required"):
+        validate_record({"type": "Electric"})
+    with pytest.raises(ValueError, match="description is not a string"):
+        validate_record({"name": "Pikachu", "type": "Electric", "description": 5})
+    with pytest.raises(ValueError, match="speed is larger than"):
+        validate_record({"name": "Pikachu", "type": "Electric", "speed": 99999999999})
@@ -0,0 +1,27 @@
+import pytest
+
+from app.core import db
+from app.core.config import get_settings
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_engine_uses_pool_settings_and_warm_up(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    settings = get_settings()
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "DB_POOL_MAX_OVERFLOW", 1)
+    engine = db.create_engine(settings)
+    monkeypatch.setattr(db, "engine", engine)
+    acquired = db.pool_acquire_seconds.count()
+
+    await db.warm_up_pool(engine, 2)
+
+    assert isinstance(engine.pool, db.InstrumentedQueuePool)
+    assert (
+        db.pool_size.value(),
+        db.pool_idle.value(),
+        db.pool_checked_out.value(),
+    ) == (3, 2, 0)
+    assert db.pool_acquire_seconds.count() == acquired + 2
+    await engine.dispose()
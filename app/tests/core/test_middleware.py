@@ -0,0 +1,131 @@
+import asyncio
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.core.middleware import COMPRESSORS, CompressionMiddleware, negotiate_encoding
+
+BODY = "Pikachu " * 1000
+
+
+def create_app(**options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(BODY, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("Pikachu")
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for number in range(100):
+                yield f"line {number}\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, min_size=100, **options)
+    return app
+
+
+async def get(app: FastAPI, path: str, accept_encoding: str = "gzip"):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+
+def test_negotiate_encoding() -> None:
+    assert negotiate_encoding("gzip", COMPRESSORS) == "gzip"
+    assert (
+        negotiate_encoding("gzip;q=0.5, br;q=0.8, zstd;q=0.1", ["zstd", "br", "gzip"])
+        == "br"
+    )
+    assert negotiate_encoding("gzip, zstd", ["zstd", "br", "gzip"]) == "zstd"
+    assert negotiate_encoding("*", ["zstd", "gzip"]) == "zstd"
+    assert negotiate_encoding("gzip;q=0, identity", ["gzip"]) is None
+    assert negotiate_encoding("", ["gzip"]) is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_compresses_large_responses() -> None:
+    response = await get(create_app(), "/large")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(BODY) / 10
+    assert response.text == BODY
+
+
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize("encoding", list(COMPRESSORS))
+async def test_supported_encodings(encoding: str) -> None:
+    response = await get(create_app(), "/large", accept_encoding=encoding)
+
+    assert response.headers["content-encoding"] == encoding
+    assert response.text == BODY
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_skips_small_responses_and_disabled_routes() -> None:
+    response = await get(create_app(), "/small")
+    assert "content-encoding" not in response.headers
+    assert response.text == "Pikachu"
+
+    response = await get(create_app(route_levels={"/large": {"gzip": 0}}), "/large")
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_route_level() -> None:
+    fast = await get(create_app(route_levels={"/large": {"gzip": 1}}), "/large")
+    best = await get(create_app(levels={"gzip": 9}), "/large")
+
+    assert int(fast.headers["content-length"]) > int(best.headers["content-length"])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_compresses_streaming_responses_chunk_by_chunk() -> None:
+    # Talk ASGI directly, the httpx transport buffers the whole body
+    messages = []
+    finished = asyncio.Event()
+
+    async def receive():
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if not message.get("more_body", True):
+            finished.set()
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/stream",
+        "raw_path": b"/stream",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "scheme": "http",
+        "server": ("test", 80),
+    }
+    await create_app()(scope, receive, send)
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    chunks = [message["body"] for message in messages[1:]]
+    assert len(chunks) > 1
+    # Every chunk is flushed, so the client can decode each line as soon as its chunk arrives
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for number, chunk in enumerate(chunks[:100]):
+        assert decompressor.decompress(chunk) == f"line {number}\n".encode()
+    assert messages[-1]["more_body"] is False
@@ -0,0 +1,144 @@
+import asyncio
+import random
+from collections.abc import AsyncGenerator
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.popularity import reconcile_popularity
+from app.core.security import create_jwt_token
+from app.models import Pokemon, PokemonPopularity, User, UserPokemon
+from app.tests.factories import PokemonFactory
+
+
+@pytest_asyncio.fixture(scope="function")
+async def users(session: AsyncSession) -> AsyncGenerator[list[User]]:
+    users = [
+        User(email=f"fan{number}@example.com", hashed_password="hashedpassword")
+        for number in range(8)
+    ]
+    session.add_all(users)
+    await session.commit()
+    yield users
+
+    user_ids = [user.user_id for user in users]
+    await session.execute(delete(UserPokemon).where(UserPokemon.user_id.in_(user_ids)))
+    await session.execute(delete(User).where(User.user_id.in_(user_ids)))
+    await session.commit()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def pokemons(session: AsyncSession) -> AsyncGenerator[list[Pokemon]]:
+    pokemons = [await PokemonFactory() for _ in range(30)]
+    await session.commit()
+    yield pokemons
+
+    # The catalog is left as the other tests expect it
+    pokemon_ids = [pokemon.pokemon_id for pokemon in pokemons]
+    await session.execute(
+        delete(UserPokemon).where(UserPokemon.pokemon_id.in_(pokemon_ids))
+    )
+    await session.execute(delete(Pokemon).where(Pokemon.pokemon_id.in_(pokemon_ids)))
+    await session.commit()
+
+
+async def counters(session: AsyncSession, pokemons: list[Pokemon]) -> tuple[dict, dict]:
+    """Favourite counters of `pokemons` and their actual favourite counts."""
+    pokemon_ids = [pokemon.pokemon_id for pokemon in pokemons]
+    stored = await session.execute(
+        select(PokemonPopularity.pokemon_id, PokemonPopularity.favourite_count).where(
+            PokemonPopularity.pokemon_id.in_(pokemon_ids)
+        )
+    )
+    actual = await session.execute(
+        select(UserPokemon.pokemon_id, func.count())
+        .where(UserPokemon.pokemon_id.in_(pokemon_ids))
+        .group_by(UserPokemon.pokemon_id)
+    )
+    return dict(stored.all()), dict(actual.all())
+
+
+@pytest.mark.committed  # Concurrent requests, each in its own transaction
+@pytest.mark.asyncio(loop_scope="session")
+async def test_favourite_counts_stay_exact_under_parallel_bulk_adds(
+    client: AsyncClient,
+    session: AsyncSession,
+    users: list[User],
+    pokemons: list[Pokemon],
+) -> None:
+    pokemon_ids = [pokemon.pokemon_id for pokemon in pokemons]
+    headers = [
+        {"Authorization": f"Bearer {create_jwt_token(user.user_id).access_token}"}
+        for user in users
+    ]
+
+    async def add(user_headers: dict) -> int:
+        # Overlapping sets in different orders, the worst case for lock ordering
+        ids = random.sample(pokemon_ids, 20)
+        response = await client.post(
+            "/user/pokemons/bulk", json=ids, headers=user_headers
+        )
+        return response.status_code
+
+    async def remove(user_headers: dict) -> None:
+        for pokemon_id in random.sample(pokemon_ids, 5):
+            await client.delete(f"/user/pokemons/{pokemon_id}", headers=user_headers)
+
+    # Authenticated once first, so the parallel requests don't also need a connection to load their user
+    for user_headers in headers:
+        await client.get("/user/pokemons/", headers=user_headers)
+
+    statuses = await asyncio.gather(
+        *(add(user_headers) for user_headers in headers * 3)
+    )
+    assert set(statuses) == {HTTPStatus.OK}
+    # Removals racing with more additions
+    await asyncio.gather(
+        *(remove(user_headers) for user_headers in headers),
+        *(add(user_headers) for user_headers in headers),
+    )
+
+    stored, actual = await counters(session, pokemons)
+    assert {
+        pokemon_id: count for pokemon_id, count in stored.items() if count
+    } == actual
+    assert sum(actual.values()) > 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_reconcile_popularity_repairs_drift(
+    session: AsyncSession, users: list[User], pokemons: list[Pokemon]
+) -> None:
+    drifted, missing, exact = pokemons[:3]
+    session.add_all(
+        UserPokemon(user_id=user.user_id, pokemon_id=pokemon.pokemon_id)
+        for user in users[:3]
+        for pokemon in (drifted, missing, exact)
+    )
+    await session.commit()
+    await session.execute(
+        update(PokemonPopularity)
+        .where(PokemonPopularity.pokemon_id == drifted.pokemon_id)
+        .values(favourite_count=42)
+    )
+    await session.execute(
+        delete(PokemonPopularity).where(
+            PokemonPopularity.pokemon_id == missing.pokemon_id
+        )
+    )
+    await session.commit()
+
+    assert await reconcile_popularity(session) == len([drifted, missing])
+    await session.commit()
+
+    stored, actual = await counters(session, [drifted, missing, exact])
+    assert (
+        stored
+        == actual
+        == {drifted.pokemon_id: 3, missing.pokemon_id: 3, exact.pokemon_id: 3}
+    )
+    assert await reconcile_popularity(session) == 0
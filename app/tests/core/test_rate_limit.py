@@ -0,0 +1,61 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.rate_limit import InMemoryBackend, PostgresBackend, RateLimit, RateLimiter
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_in_memory_backend_refills() -> None:
+    now = 1000.0
+    backend = InMemoryBackend(max_keys=10, clock=lambda: now)
+
+    assert [await backend.consume("ash", capacity=2, rate=0.5) for _ in range(3)] == [
+        0,
+        0,
+        2,
+    ]
+    now += 1
+    assert await backend.consume("ash", capacity=2, rate=0.5) == 1
+    now += 1
+    assert await backend.consume("ash", capacity=2, rate=0.5) == 0
+    # Other keys have their own bucket
+    assert await backend.consume("misty", capacity=2, rate=0.5) == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_in_memory_backend_is_bounded() -> None:
+    backend = InMemoryBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        await backend.consume(key, capacity=1, rate=1)
+
+    assert list(backend._buckets) == ["b", "c"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_postgres_backend() -> None:
+    backend = PostgresBackend()
+    key, rate = "test:postgres-backend", 0.1
+
+    assert await backend.consume(key, capacity=2, rate=rate) == 0
+    assert await backend.consume(key, capacity=2, rate=rate) == 0
+    retry_after = await backend.consume(key, capacity=2, rate=rate)
+
+    # A token every 10 s
+    assert 1 / rate - 1 < retry_after <= 1 / rate
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_limiter_enforce() -> None:
+    limiter = RateLimiter(InMemoryBackend(max_keys=10))
+    limit = RateLimit("test", burst=1, per_minute=60)
+
+    await limiter.enforce(
+        (limit, "ash"), (RateLimit("disabled", burst=0, per_minute=1), "ash")
+    )
+    with pytest.raises(HTTPException) as error:
+        await limiter.enforce((limit, "ash"))
+
+    assert error.value.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert error.value.headers == {"Retry-After": "1"}
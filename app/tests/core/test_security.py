@@ -0,0 +1,50 @@
+import pytest
+from fastapi import HTTPException
+from pydantic import SecretStr
+
+from app.core.cache import cache_lookups
+from app.core.config import get_settings
+from app.core.security import create_jwt_token, get_jwt_cache, verify_jwt_token
+
+
+def test_verify_jwt_token_is_cached() -> None:
+    token = create_jwt_token("00000000-0000-0000-0000-000000000001").access_token
+
+    payload = verify_jwt_token(token)
+    hits = cache_lookups.value(cache="jwt", result="hit")
+
+    assert verify_jwt_token(token) is payload
+    assert cache_lookups.value(cache="jwt", result="hit") == hits + 1
+
+
+def test_verify_jwt_token_respects_issuer_change(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    token = create_jwt_token("00000000-0000-0000-0000-000000000002").access_token
+    verify_jwt_token(token)
+
+    monkeypatch.setattr(get_settings(), "JWT_ISSUER", "someone-else")
+
+    with pytest.raises(HTTPException):
+        verify_jwt_token(token)
+
+
+def test_expired_token_not_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "JWT_EXPIRES_SECONDS", -10)
+    token = create_jwt_token("00000000-0000-0000-0000-000000000003").access_token
+    size = len(get_jwt_cache())
+
+    with pytest.raises(HTTPException):
+        verify_jwt_token(token)
+
+    assert len(get_jwt_cache()) == size
+
+
+def test_jwt_cache_keys_hold_no_signing_key(monkeypatch: pytest.MonkeyPatch) -> None:
+    secret = "only-in-the-settings"
+    monkeypatch.setattr(get_settings(), "JWT_KEY", SecretStr(secret))
+    verify_jwt_token(
+        create_jwt_token("00000000-0000-0000-0000-000000000004").access_token
+    )
+
+    assert all(secret not in key for key in get_jwt_cache()._entries)
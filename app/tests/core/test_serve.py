@@ -0,0 +1,107 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from app import serve
+from app.core.config import get_settings
+
+
+def test_cpu_quota() -> None:
+    cpu_max = ["max 100000\n", "200000 100000\n", "150000 100000", "10000 100000"]
+
+    assert [serve.cpu_quota(value) for value in cpu_max] == [None, 2, 2, 1]
+
+
+def test_worker_count(monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = get_settings()
+    monkeypatch.setattr(serve, "available_cpus", lambda: 6)
+
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 0)
+    assert serve.worker_count(settings) == serve.available_cpus()
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 2)
+    assert serve.worker_count(settings) == settings.SERVER_WORKERS
+
+
+def test_uvicorn_config(monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SERVER_BACKLOG", 128)
+    monkeypatch.setattr(settings, "SERVER_KEEP_ALIVE_SECONDS", 15)
+    monkeypatch.setattr(settings, "SERVER_GRACEFUL_TIMEOUT_SECONDS", 10)
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS", 1000)
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS_JITTER", 50)
+
+    configs = [serve.uvicorn_config(object(), settings) for _ in range(20)]
+
+    assert (
+        configs[0].backlog,
+        configs[0].timeout_keep_alive,
+        configs[0].timeout_graceful_shutdown,
+    ) == (128, 15, 10)
+    assert all(config.limit_max_requests in range(1000, 1051) for config in configs)
+    assert len({config.limit_max_requests for config in configs}) > 1
+
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS", 0)
+    assert serve.uvicorn_config(object(), settings).limit_max_requests is None
+
+
+def get_metrics(port: int) -> httpx.Response:
+    # uvicorn checks the request limit every 0.1 s, waiting longer lets a worker that reached it stop accepting
+    time.sleep(0.3)
+    try:
+        return httpx.get(f"http://127.0.0.1:{port}/metrics")
+    except httpx.RemoteProtocolError:
+        # A worker stopping closes the connections it accepted but hasn't read a request from yet
+        return httpx.get(f"http://127.0.0.1:{port}/metrics")
+
+
+def test_serve_recycles_workers_and_drains_on_sigterm() -> None:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {
+        **os.environ,
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "SERVER_WORKERS": "2",
+        "SERVER_MAX_REQUESTS": "2",
+        "PASSWORD_HASHER_WORKERS": "0",
+        "DB_POOL_WARMUP": "1",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve"],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/metrics").raise_for_status()
+                break
+            except httpx.TransportError:
+                assert server.poll() is None and time.monotonic() < deadline, (
+                    "app.serve did not start"
+                )
+                time.sleep(0.1)
+
+        # Workers are replaced every 2 requests, the shared socket queues connections meanwhile
+        statuses = [get_metrics(port).status_code for _ in range(8)]
+        assert statuses == [200] * 8
+    finally:
+        server.send_signal(signal.SIGTERM)
+        output, _ = server.communicate(timeout=60)
+
+    assert server.returncode == 0, output
+    assert output.count("exited, replacing it") > 1
+    # Every worker ran the lifespan shutdown, which disposes its pool
+    assert output.count("Started worker") == output.count(
+        "Application shutdown complete"
+    ), output
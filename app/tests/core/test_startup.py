@@ -0,0 +1,96 @@
+import subprocess
+import sys
+
+import pytest
+
+from app.core import db
+from app.core.config import get_settings
+from app.main import app, lifespan
+
+# Budgets relative to importing the third-party stack alone (FastAPI, SQLAlchemy, pydantic...), measured
+# in the same conditions, so a loaded machine (e.g. parallel test workers) slows both down alike.
+# A regression here means something heavy became an import time dependency or import time work crept back in
+BASELINE_MODULES = (
+    "fastapi",
+    "fastapi_pagination",
+    "sqlalchemy.ext.asyncio",
+    "pydantic_settings",
+    "asyncpg",
+    "orjson",
+)
+IMPORT_TIME_BUDGET_RATIO = 2.0  # Cumulative import time of app.main
+APP_MODULES_BUDGET_RATIO = 0.5  # Self time of the app.* modules
+
+
+def import_times(modules: str) -> list[tuple[str, int, int]]:
+    """(module, self, cumulative) import times in microseconds, as reported by `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modules}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+            times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def test_import_time_budget() -> None:
+    # Median of three runs, each against a baseline measured right before it, so load that comes and
+    # goes (e.g. other test workers) hits both sides of a ratio. The first run also pays for the disk
+    ratios, app_ratios = [], []
+    for _ in range(3):
+        baseline_times = import_times(", ".join(BASELINE_MODULES))
+        times = import_times("app.main")
+        # Top level imports only, their cumulative times don't overlap
+        baseline = sum(
+            cumulative
+            for name, _, cumulative in baseline_times
+            if name in BASELINE_MODULES
+        )
+        total = next(cumulative for name, _, cumulative in times if name == "app.main")
+        app_total = sum(
+            self_us for name, self_us, _ in times if name.startswith("app.")
+        )
+        ratios.append(total / baseline)
+        app_ratios.append(app_total / baseline)
+
+    slowest = sorted(times, key=lambda entry: entry[1], reverse=True)[:15]
+    report = "\n".join(
+        f"{self_us / 1000:8.1f}ms {cumulative_us / 1000:8.1f}ms  {name}"
+        for name, self_us, cumulative_us in slowest
+    )
+    report = f"Baseline {baseline / 1000:.1f}ms, slowest imports (self, cumulative):\n{report}"
+    assert sorted(ratios)[1] < IMPORT_TIME_BUDGET_RATIO, report
+    assert sorted(app_ratios)[1] < APP_MODULES_BUDGET_RATIO, report
+
+
+def test_import_has_no_side_effects() -> None:
+    check = (
+        "import logging, app.main\n"
+        "from app.core import db\n"
+        "from app.core.config import get_settings\n"
+        "assert db.engine is None, 'engine created at import'\n"
+        "assert get_settings.cache_info().currsize == 0, 'settings read at import'\n"
+        "assert not logging.getLogger().handlers, 'logging configured at import'\n"
+        "assert app.main.app.openapi_schema is None, 'OpenAPI schema built at import'\n"
+    )
+    subprocess.run([sys.executable, "-c", check], check=True)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_lifespan_builds_openapi_schema(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def keep_engine() -> None:
+        """The test database engine outlives the lifespan."""
+
+    monkeypatch.setattr(db, "dispose_engine", keep_engine)
+    monkeypatch.setattr(get_settings(), "CATALOG_CACHE_ENABLED", False)
+    monkeypatch.setattr(get_settings(), "DB_POOL_WARMUP", 0)
+    monkeypatch.setattr(app, "openapi_schema", None)
+
+    async with lifespan(app):
+        assert app.openapi_schema is not None
+        assert "/pokemons/batch-get" in app.openapi_schema["paths"]
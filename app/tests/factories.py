@@ -1,4 +1,5 @@
 import uuid
+from datetime import UTC, datetime
 from typing import Any
 
 import factory
@@ -9,7 +10,7 @@ from factory.errors import UnknownStrategy
 from faker import Faker
 from sqlalchemy.util import await_only, greenlet_spawn
 
-from app.models import Pokemon, User
+from app.models import Pokemon, User, UserPokemon
 from app.utils import PokemonRarity, PokemonType
 
 fake = Faker()
@@ -78,7 +79,7 @@ class AsyncSQLAlchemyModelFactory(Factory, metaclass=AsyncFactoryMetaClass):
 class BaseFactory(AsyncSQLAlchemyModelFactory):
     class Meta:
         abstract = True
-        sqlalchemy_session_persistence = alchemy.SESSION_PERSISTENCE_COMMIT
+        sqlalchemy_session_persistence = alchemy.SESSION_PERSISTENCE_FLUSH
 
     @classmethod
     def set_session(cls, session):
@@ -119,3 +120,13 @@ class UserFactory(BaseFactory):
 
     email = f"{fake.first_name()}.{fake.last_name()}@test.com"
     hashed_password = fake.password()
+
+
+class UserPokemonFactory(BaseFactory):
+    class Meta:
+        model = UserPokemon
+
+    user_id = None
+    pokemon_id = None
+    # now() is the same for a whole test, which runs in a single transaction
+    created_at = factory.LazyFunction(lambda: datetime.now(UTC))
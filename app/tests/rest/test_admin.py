@@ -0,0 +1,175 @@
+from http import HTTPStatus
+
+import orjson
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Pokemon
+from app.utils import PokemonRarity, PokemonType
+
+CSV_BODY = b"""name,description,hp,attack,defense,speed,type,rarity
+Import-Sparky,"A small
+electric mouse",35,55,40,90,Electric,Rare
+Import-Blaze,,39,52,43,65,FIRE,
+Import-Unknown,,10,10,10,10,Cosmic,Common
+Import-Weak,,-1,10,10,10,Water,Common
+"""
+
+
+@pytest_asyncio.fixture(scope="function")
+async def admin(monkeypatch: pytest.MonkeyPatch, session: AsyncSession):
+    monkeypatch.setattr(get_settings(), "ADMIN_EMAILS", ["test@example.com"])
+    yield
+    await session.execute(delete(Pokemon).where(Pokemon.name.like("Import-%")))
+    await session.commit()
+
+
+async def imported(session: AsyncSession) -> dict[str, Pokemon]:
+    pokemons = await session.scalars(
+        select(Pokemon)
+        .where(Pokemon.name.like("Import-%"))
+        .execution_options(populate_existing=True)
+    )
+    return {pokemon.name: pokemon for pokemon in pokemons}
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_import_csv(client: AsyncClient, session: AsyncSession, admin) -> None:
+    response = await client.post(
+        "/admin/pokemons/import", content=CSV_BODY, headers={"Content-Type": "text/csv"}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    report = response.json()
+    assert (
+        report["received"],
+        report["staged"],
+        report["rejected"],
+        report["inserted"],
+        report["updated"],
+    ) == (4, 2, 2, 2, 0)
+    assert report["errors"] == [
+        "record 3: unknown type 'Cosmic'",
+        "record 4: hp is negative",
+    ]
+
+    pokemons = await imported(session)
+    assert set(pokemons) == {"Import-Sparky", "Import-Blaze"}
+    assert pokemons["Import-Sparky"].description == "A small\nelectric mouse"
+    assert pokemons["Import-Sparky"].type == PokemonType.ELECTRIC
+    assert pokemons["Import-Sparky"].rarity == PokemonRarity.RARE
+    assert pokemons["Import-Blaze"].type == PokemonType.FIRE
+    assert pokemons["Import-Blaze"].rarity == PokemonRarity.COMMON
+
+
+@pytest.mark.committed  # Imports twice, each staging table is dropped on commit
+@pytest.mark.asyncio(loop_scope="session")
+async def test_import_ndjson_upserts_by_name(
+    client: AsyncClient, session: AsyncSession, admin
+) -> None:
+    records = [
+        {"name": "Import-Sparky", "hp": 35, "type": "Electric"},
+        {"name": "Import-Blaze", "hp": 39, "type": "Fire"},
+    ]
+    body = b"".join(orjson.dumps(record) + b"\n" for record in records)
+    await client.post(
+        "/admin/pokemons/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    pokemon_id = (await imported(session))["Import-Sparky"].pokemon_id
+
+    records = [
+        {"name": "Import-Sparky", "hp": 50, "type": "Electric"},
+        {"name": "Import-Blaze", "hp": 39, "type": "Fire"},  # Unchanged
+        {
+            "name": "Import-Sparky",
+            "hp": 60,
+            "type": "Electric",
+        },  # The last record of a name wins
+        {"name": "Import-Drop", "type": "Water"},
+    ]
+    body = b"".join(orjson.dumps(record) + b"\n" for record in records) + b"{not json\n"
+    response = await client.post(
+        "/admin/pokemons/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    report = response.json()
+    assert (
+        report["received"],
+        report["rejected"],
+        report["inserted"],
+        report["updated"],
+    ) == (5, 1, 1, 1)
+    pokemons = await imported(session)
+    assert pokemons["Import-Sparky"].pokemon_id == pokemon_id
+    assert (pokemons["Import-Sparky"].hp, pokemons["Import-Drop"].hp) == (60, 100)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_import_rejects_malformed_records(
+    client: AsyncClient, session: AsyncSession, admin
+) -> None:
+    body = b"\n".join(
+        [
+            orjson.dumps({"name": "Import-Sparky", "type": "Electric"}),
+            orjson.dumps({"name": "Import-Number", "type": "Water", "description": 5}),
+            orjson.dumps({"name": "Import-Huge", "type": "Water", "hp": 99999999999}),
+            b'{"name": "Import-\xff", "type": "Water"}',
+        ]
+    )
+    response = await client.post(
+        "/admin/pokemons/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    report = response.json()
+    assert (report["received"], report["rejected"], report["inserted"]) == (4, 3, 1)
+    assert set(await imported(session)) == {"Import-Sparky"}
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_import_rebuilding_indexes(
+    client: AsyncClient, session: AsyncSession, admin
+) -> None:
+    indexes_query = text(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = 'pokemons' ORDER BY indexname"
+    )
+    indexes = (await session.scalars(indexes_query)).all()
+    await session.commit()
+
+    response = await client.post(
+        "/admin/pokemons/import",
+        params={"rebuild_indexes": True},
+        content=CSV_BODY,
+        headers={"Content-Type": "text/csv"},
+    )
+
+    assert response.json()["inserted"] == len({"Import-Sparky", "Import-Blaze"})
+    assert (await session.scalars(indexes_query)).all() == indexes
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_import_requires_admin_and_known_format(
+    client: AsyncClient, admin, monkeypatch
+) -> None:
+    response = await client.post(
+        "/admin/pokemons/import",
+        content=b"{}",
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+
+    monkeypatch.setattr(get_settings(), "ADMIN_EMAILS", [])
+    response = await client.post(
+        "/admin/pokemons/import", content=CSV_BODY, headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == HTTPStatus.FORBIDDEN
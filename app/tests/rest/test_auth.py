@@ -1 +1,222 @@
-# TODO
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import get_settings
+from app.core.hashing import get_password_hasher, job_duration
+from app.core.middleware import request_db_queries
+from app.core.rate_limit import get_rate_limiter
+from app.core.security import verify_jwt_token
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_register_and_login(client: AsyncClient) -> None:
+    credentials = {"email": "ash@example.com", "password": "pikachu"}
+
+    response = await client.post("/auth/register", json=credentials)
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()["email"] == credentials["email"]
+
+    response = await client.post(
+        "/auth/login",
+        data={"username": credentials["email"], "password": credentials["password"]},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["access_token"]
+
+    response = await client.post(
+        "/auth/login",
+        data={"username": credentials["email"], "password": "wrong"},
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_login_rejected_when_hasher_queue_full(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(get_password_hasher(), "max_queue", 0)
+
+    response = await client.post(
+        "/auth/register", json={"email": "misty@example.com", "password": "staryu"}
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_metrics_expose_password_hasher(client: AsyncClient) -> None:
+    # Created by the lifespan, which the test client doesn't run
+    get_password_hasher()
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == HTTPStatus.OK
+    assert "password_hasher_queue_depth 0" in response.text
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_login_unknown_email_checks_dummy_hash(client: AsyncClient) -> None:
+    verifications = job_duration.count(operation="verify")
+
+    response = await client.post(
+        "/auth/login", data={"username": "nobody@example.com", "password": "x"}
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()["detail"] == "Invalid username or password"
+    # Same bcrypt work as for a known email
+    assert job_duration.count(operation="verify") == verifications + 1
+
+
+@pytest.fixture
+def frozen_rate_limit_clock(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The buckets don't refill while the requests wait on bcrypt (e.g. on the hasher pool starting)."""
+    monkeypatch.setattr(get_rate_limiter().backend, "clock", lambda: 1000.0)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_login_rate_limited_per_email(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch, frozen_rate_limit_clock
+) -> None:
+    monkeypatch.setattr(get_settings(), "LOGIN_EMAIL_RATE_BURST", 2)
+    monkeypatch.setattr(get_settings(), "LOGIN_EMAIL_RATE_PER_MINUTE", 6)
+    verifications = job_duration.count(operation="verify")
+
+    responses = [
+        await client.post("/auth/login", data={"username": email, "password": "onix"})
+        for email in (
+            "Brock@example.com",
+            "brock@example.com",
+            "brock@example.com",
+            "gary@example.com",
+        )
+    ]
+
+    assert [response.status_code for response in responses] == [
+        HTTPStatus.BAD_REQUEST,
+        HTTPStatus.BAD_REQUEST,
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.BAD_REQUEST,
+    ]
+    assert int(responses[2].headers["Retry-After"]) in (9, 10)  # 6 per minute
+    # The throttled attempt never reached bcrypt
+    assert job_duration.count(operation="verify") == verifications + 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_login_and_register_rate_limited_per_ip(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch, frozen_rate_limit_clock
+) -> None:
+    monkeypatch.setattr(get_settings(), "LOGIN_IP_RATE_BURST", 2)
+    monkeypatch.setattr(get_settings(), "REGISTER_IP_RATE_BURST", 1)
+
+    for number in range(2):
+        response = await client.post(
+            "/auth/login",
+            data={"username": f"trainer{number}@example.com", "password": "x"},
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+    response = await client.post(
+        "/auth/login", data={"username": "trainer9@example.com", "password": "x"}
+    )
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) in (1, 2)  # 30 per minute
+
+    response = await client.post(
+        "/auth/register", json={"email": "test@example.com", "password": "x"}
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+    response = await client.post(
+        "/auth/register", json={"email": "brock@example.com", "password": "x"}
+    )
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) in (11, 12)  # 5 per minute
+
+
+async def register_and_login(client: AsyncClient, email: str) -> dict:
+    await client.post("/auth/register", json={"email": email, "password": "pidgey"})
+    response = await client.post(
+        "/auth/login", data={"username": email, "password": "pidgey"}
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_refresh_rotates_token(client: AsyncClient) -> None:
+    tokens = await register_and_login(client, "refresh-rotate@example.com")
+    assert tokens["refresh_expires_at"] > tokens["expires_at"]
+    verifications = job_duration.count(operation="verify")
+    queries = request_db_queries.sum(method="POST", route="/auth/refresh")
+
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    refreshed = response.json()
+    assert refreshed["refresh_token"] != tokens["refresh_token"]
+    assert (
+        verify_jwt_token(refreshed["access_token"]).sub
+        == verify_jwt_token(tokens["access_token"]).sub
+    )
+    # No bcrypt, a single statement
+    assert job_duration.count(operation="verify") == verifications
+    assert request_db_queries.sum(method="POST", route="/auth/refresh") == queries + 1
+
+    # Single use
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": refreshed["refresh_token"]}
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_refresh_token_expires(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Compared with now(), the start of the test transaction
+    monkeypatch.setattr(get_settings(), "REFRESH_TOKEN_EXPIRES_SECONDS", -3600)
+    tokens = await register_and_login(client, "refresh-expired@example.com")
+
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_refresh_tokens_revoked_on_password_change_and_account_deletion(
+    client: AsyncClient,
+) -> None:
+    tokens = await register_and_login(client, "refresh-revoke@example.com")
+    other_tokens = await register_and_login(client, "refresh-revoke@example.com")
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = await client.put(
+        "/user/account", json={"password": "pidgeotto"}, headers=headers
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    for revoked in (tokens, other_tokens):
+        response = await client.post(
+            "/auth/refresh", json={"refresh_token": revoked["refresh_token"]}
+        )
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    response = await client.post(
+        "/auth/login",
+        data={"username": "refresh-revoke@example.com", "password": "pidgeotto"},
+    )
+    refresh_token = response.json()["refresh_token"]
+    response = await client.delete("/user/account", headers=headers)
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    response = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
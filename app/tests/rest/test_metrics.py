@@ -0,0 +1,37 @@
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.middleware import (
+    request_db_queries,
+    request_duration_seconds,
+    requests_total,
+)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_request_metrics_per_route(client: AsyncClient) -> None:
+    labels = {"method": "GET", "route": "/pokemons/{pokemon_id}"}
+    requests_before = requests_total.value(status="404", **labels)
+    queries_before = request_db_queries.sum(**labels)
+
+    response = await client.get("/pokemons/00000000-0000-0000-0000-000000000000")
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert requests_total.value(status="404", **labels) == requests_before + 1
+    assert request_db_queries.sum(**labels) > queries_before
+    assert request_duration_seconds.count(**labels) > 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_request_metrics_unmatched_route(client: AsyncClient) -> None:
+    await client.get("/does-not-exist")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == HTTPStatus.OK
+    assert (
+        'http_requests_total{method="GET",route="<unmatched>",status="404"}'
+        in response.text
+    )
@@ -1,14 +1,38 @@
+import base64
+import json
+import uuid
 from http import HTTPStatus
 
 import pytest
+import pytest_asyncio
 from httpx import AsyncClient
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import db
+from app.core.catalog_cache import catalog_cache, lookups
+from app.core.config import get_settings
+from app.core.etag import conditional_requests
+from app.core.middleware import request_db_queries
+from app.core.pagination import estimate_count
+from app.core.responses import POKEMON_RESPONSE_COLUMNS, ndjson_response
+from app.models import Pokemon, User, UserPokemon
+from app.schemas.base import CustomPage
+from app.schemas.pokemon import PokemonBatchGetResponse, PokemonResponse
 from app.tests.factories import PokemonFactory
+from app.utils import PokemonType
+
+
+@pytest_asyncio.fixture(scope="function")
+async def loaded_catalog_cache(session: AsyncSession):
+    await catalog_cache.load(session)
+    yield catalog_cache
+    catalog_cache.clear()
 
 
 @pytest.mark.asyncio(loop_scope="session")
 async def test_get_all_pokemons_default_pagination(
-    client: AsyncClient,
+    client: AsyncClient, session: AsyncSession
 ) -> None:
     size = 10
     total = 19
@@ -45,8 +69,12 @@ async def test_get_all_pokemons_default_pagination(
         "speed",
         "rarity",
     }
-    assert first_pokemon["name"] == "Pikachu"
-    assert first_pokemon["type"] == "Electric"
+    # The seeded Pokemon share their created_at, the id breaks the tie
+    oldest = await session.scalar(
+        select(Pokemon).order_by(Pokemon.created_at, Pokemon.pokemon_id).limit(1)
+    )
+    assert first_pokemon["name"] == oldest.name
+    assert first_pokemon["type"] == oldest.type.value
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -65,6 +93,105 @@ async def test_get_all_pokemons_page_size(client: AsyncClient, size: int) -> Non
     assert data["pages"] == expected_pages
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_all_pokemons_matches_response_model(client: AsyncClient) -> None:
+    response = await client.get("/pokemons/?page=2&size=15")
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"] == "application/json"
+
+    # The fast path skips response_model validation, so the body must still be a valid page
+    page = CustomPage[PokemonResponse].model_validate(response.json())
+    assert page.model_dump(mode="json") == response.json()
+    assert (page.page, len(page.items)) == (2, page.total - 15)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_list_endpoints_keep_openapi_schema(client: AsyncClient) -> None:
+    paths = (await client.get("/openapi.json")).json()["paths"]
+
+    for path, method, model in (
+        ("/pokemons/", "get", "Page__T_Customized_PokemonResponse_"),
+        ("/user/pokemons/", "get", "Page__T_Customized_PokemonResponse_"),
+        ("/user/pokemons/bulk", "post", "FavoritePokemonsBulkResponse"),
+    ):
+        schema = paths[path][method]["responses"]["200"]["content"]["application/json"][
+            "schema"
+        ]
+        assert schema == {"$ref": f"#/components/schemas/{model}"}
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_all_pokemons_filters_and_sort(client: AsyncClient) -> None:
+    weak, strong, fast = [
+        await PokemonFactory(
+            type="Dragon", rarity="Mythical", hp=hp, attack=attack, speed=speed
+        )
+        for hp, attack, speed in ((901, 10, 50), (903, 90, 50), (902, 90, 99))
+    ]
+    await PokemonFactory(type="Fire", rarity="Mythical", hp=950)
+
+    response = await client.get(
+        "/pokemons/", params={"type": "Dragon", "min_hp": 900, "sort": "-hp"}
+    )
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data["total"] == len(data["items"])
+    assert [item["pokemon_id"] for item in data["items"]] == [
+        strong.pokemon_id,
+        fast.pokemon_id,
+        weak.pokemon_id,
+    ]
+
+    response = await client.get(
+        "/pokemons/",
+        params={
+            "rarity": "Mythical",
+            "min_hp": 900,
+            "max_hp": 910,
+            "min_attack": 50,
+            "sort": ["-attack", "speed"],
+        },
+    )
+    assert [item["pokemon_id"] for item in response.json()["items"]] == [
+        strong.pokemon_id,
+        fast.pokemon_id,
+    ]
+
+    response = await client.get(
+        "/pokemons/", params={"min_hp": 900, "size": 2, "page": 2, "sort": "hp"}
+    )
+    assert (
+        response.json()["total"],
+        [item["hp"] for item in response.json()["items"]],
+    ) == (4, [903, 950])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_all_pokemons_default_order_breaks_ties(client: AsyncClient) -> None:
+    # Created in the test transaction, so with the same created_at, like the Pokemon of one import
+    pokemon_ids = {(await PokemonFactory()).pokemon_id for _ in range(4)}
+
+    response = await client.get("/pokemons/", params={"size": 100})
+
+    listed = [
+        item["pokemon_id"]
+        for item in response.json()["items"]
+        if item["pokemon_id"] in pokemon_ids
+    ]
+    assert listed == sorted(pokemon_ids)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize(
+    "params", [{"sort": "description"}, {"type": "Unknown"}, {"min_hp": -1}]
+)
+async def test_get_all_pokemons_invalid_filters(
+    client: AsyncClient, params: dict
+) -> None:
+    response = await client.get("/pokemons/", params=params)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
 @pytest.mark.asyncio(loop_scope="session")
 async def test_get_by_id(client):
     pokemon = await PokemonFactory(name="TEST")
@@ -75,3 +202,410 @@ async def test_get_by_id(client):
     assert data["name"] == pokemon.name
     assert data["description"] == pokemon.description
     assert data["type"] == pokemon.type
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_all_pokemons_cursor_walks_whole_catalog(client: AsyncClient) -> None:
+    total = (await client.get("/pokemons/")).json()["total"]
+
+    seen, cursor = [], None
+    while True:
+        params = {"size": 5} if cursor is None else {"size": 5, "cursor": cursor}
+        response = await client.get("/pokemons/cursor", params=params)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert data["size"] == params["size"]
+        assert data["estimated_total"] is None
+        seen.extend(item["pokemon_id"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == total
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_all_pokemons_cursor_estimated_total(client: AsyncClient) -> None:
+    response = await client.get("/pokemons/cursor", params={"include_estimate": True})
+
+    assert response.status_code == HTTPStatus.OK
+    assert isinstance(response.json()["estimated_total"], int)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_all_pokemons_invalid_cursor(client: AsyncClient) -> None:
+    response = await client.get("/pokemons/cursor", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+BAD_CURSOR_VALUES = [
+    ["2024-01-01T00:00:00+00:00", "not-a-uuid"],
+    ["2024-01-01T00:00:00", "00000000-0000-0000-0000-000000000001"],
+    ["2024-01-01T00:00:00+00:00", 1],
+]
+
+
+@pytest.mark.parametrize("values", BAD_CURSOR_VALUES)
+@pytest.mark.parametrize("path", ["/pokemons/cursor", "/user/pokemons/cursor"])
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cursor_with_bad_values(
+    client: AsyncClient, path: str, values: list
+) -> None:
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    response = await client.get(path, params={"cursor": cursor})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize("values", BAD_CURSOR_VALUES)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cached_catalog_cursor_with_bad_values(
+    client: AsyncClient, loaded_catalog_cache, values: list
+) -> None:
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    hits = lookups.value(result="hit")
+
+    response = await client.get("/pokemons/cursor", params={"cursor": cursor})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert lookups.value(result="hit") == hits + 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_catalog_cache_serves_same_pages(
+    client: AsyncClient, loaded_catalog_cache
+) -> None:
+    hits = lookups.value(result="hit")
+
+    cached = (await client.get("/pokemons/?size=100")).json()
+    catalog_cache.clear()
+    uncached = (await client.get("/pokemons/?size=100")).json()
+
+    assert lookups.value(result="hit") == hits + 1
+    assert cached["total"] == uncached["total"]
+    assert {item["pokemon_id"] for item in cached["items"]} == {
+        item["pokemon_id"] for item in uncached["items"]
+    }
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_catalog_cache_cursor_pages(
+    client: AsyncClient, loaded_catalog_cache
+) -> None:
+    first = (await client.get("/pokemons/cursor", params={"size": 4})).json()
+    second = (
+        await client.get(
+            "/pokemons/cursor", params={"size": 4, "cursor": first["next_cursor"]}
+        )
+    ).json()
+    catalog_cache.clear()
+    second_uncached = (
+        await client.get(
+            "/pokemons/cursor", params={"size": 4, "cursor": first["next_cursor"]}
+        )
+    ).json()
+
+    assert second == second_uncached
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_catalog_cache_revalidation(
+    client: AsyncClient, session: AsyncSession, loaded_catalog_cache
+) -> None:
+    assert not await catalog_cache.revalidate(session)
+
+    pokemon = await PokemonFactory(name="CACHED")
+    # Not in the cache yet, falls back to the database
+    response = await client.get(f"/pokemons/{pokemon.pokemon_id}")
+    assert response.status_code == HTTPStatus.OK
+
+    assert await catalog_cache.revalidate(session)
+    hits = lookups.value(result="hit")
+    response = await client.get(f"/pokemons/{pokemon.pokemon_id}")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["name"] == "CACHED"
+    assert lookups.value(result="hit") == hits + 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_catalog_page_etag(client: AsyncClient) -> None:
+    response = await client.get("/pokemons/", params={"size": 5})
+    etag = response.headers["etag"]
+
+    response = await client.get(
+        "/pokemons/", params={"size": 5}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    # Another page, or a changed catalog, has another ETag
+    other_page = await client.get(
+        "/pokemons/", params={"size": 5, "page": 2}, headers={"If-None-Match": etag}
+    )
+    assert other_page.status_code == HTTPStatus.OK
+    await PokemonFactory(name="NEW")
+    response = await client.get(
+        "/pokemons/", params={"size": 5}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_catalog_page_not_modified_without_db_query(
+    client: AsyncClient, loaded_catalog_cache
+) -> None:
+    labels = {"method": "GET", "route": "/pokemons/"}
+    etag = (await client.get("/pokemons/")).headers["etag"]
+    queries = request_db_queries.sum(**labels)
+    hits = conditional_requests.value(resource="catalog", result="hit")
+
+    response = await client.get(
+        "/pokemons/", headers={"If-None-Match": f'W/"other", {etag}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert request_db_queries.sum(**labels) == queries
+    assert conditional_requests.value(resource="catalog", result="hit") == hits + 1
+    assert 'etag_hit_ratio{resource="catalog"}' in (await client.get("/metrics")).text
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_catalog_page_not_modified_with_one_version_query(
+    client: AsyncClient,
+) -> None:
+    labels = {"method": "GET", "route": "/pokemons/"}
+    etag = (await client.get("/pokemons/")).headers["etag"]
+    queries = request_db_queries.sum(**labels)
+
+    response = await client.get("/pokemons/", headers={"If-None-Match": etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert request_db_queries.sum(**labels) == queries + 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_filtered_catalog_page_etag_follows_database(
+    client: AsyncClient, loaded_catalog_cache
+) -> None:
+    params = {"type": "Water"}
+    etag = (await client.get("/pokemons/", params=params)).headers["etag"]
+
+    # Served from the database, before the cache sees the change
+    await PokemonFactory(name="Splashy", type=PokemonType.WATER)
+    response = await client.get(
+        "/pokemons/", params=params, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert "Splashy" in [item["name"] for item in response.json()["items"]]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_pokemon_details_etag(client: AsyncClient) -> None:
+    pokemon = await PokemonFactory()
+    etag = (await client.get(f"/pokemons/{pokemon.pokemon_id}")).headers["etag"]
+
+    response = await client.get(
+        f"/pokemons/{pokemon.pokemon_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_batch_get_pokemons(client: AsyncClient) -> None:
+    first, second = await PokemonFactory(), await PokemonFactory()
+    missing_id = str(uuid.uuid4())
+
+    response = await client.post(
+        "/pokemons/batch-get",
+        json=[second.pokemon_id, missing_id, first.pokemon_id, second.pokemon_id],
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = PokemonBatchGetResponse.model_validate(response.json())
+    assert [item.pokemon_id for item in data.items] == [
+        second.pokemon_id,
+        first.pokemon_id,
+    ]
+    assert data.items[1].description == first.description
+    assert data.missing == [missing_id]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_batch_get_pokemons_from_catalog_cache(
+    client: AsyncClient, loaded_catalog_cache
+) -> None:
+    labels = {"method": "POST", "route": "/pokemons/batch-get"}
+    cached = loaded_catalog_cache.items()[:3]
+    added_since = await PokemonFactory()  # Not in the cache yet
+    pokemon_ids = [
+        cached[2]["pokemon_id"],
+        added_since.pokemon_id,
+        cached[0]["pokemon_id"],
+    ]
+    await client.post(
+        "/pokemons/batch-get", json=pokemon_ids
+    )  # The user is cached after this one
+    queries = request_db_queries.sum(**labels)
+
+    response = await client.post("/pokemons/batch-get", json=pokemon_ids)
+    assert [item["pokemon_id"] for item in response.json()["items"]] == pokemon_ids
+    # Only the Pokemon missing from the cache are queried, all in one query
+    assert request_db_queries.sum(**labels) == queries + 1
+
+    response = await client.post("/pokemons/batch-get", json=pokemon_ids[::2])
+    assert [item["pokemon_id"] for item in response.json()["items"]] == pokemon_ids[::2]
+    assert request_db_queries.sum(**labels) == queries + 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_batch_get_pokemons_too_many_ids(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(get_settings(), "POKEMON_BATCH_GET_MAX_IDS", 2)
+
+    response = await client.post(
+        "/pokemons/batch-get", json=[str(uuid.uuid4()) for _ in range(3)]
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_popular_pokemons(
+    client: AsyncClient, session: AsyncSession, default_user
+) -> None:
+    first, second, unpopular = [await PokemonFactory() for _ in range(3)]
+    users = [
+        User(email=f"popular{number}@example.com", hashed_password="hashedpassword")
+        for number in range(2)
+    ]
+    session.add_all(users)
+    await session.commit()
+    session.add_all(
+        [
+            UserPokemon(user_id=default_user.user_id, pokemon_id=first.pokemon_id),
+            UserPokemon(user_id=default_user.user_id, pokemon_id=second.pokemon_id),
+            *(
+                UserPokemon(user_id=user.user_id, pokemon_id=first.pokemon_id)
+                for user in users
+            ),
+        ]
+    )
+    await session.commit()
+
+    response = await client.get("/pokemons/popular", params={"limit": 100})
+    assert response.status_code == HTTPStatus.OK
+    counts = {item["pokemon_id"]: item["favourite_count"] for item in response.json()}
+    assert (counts[first.pokemon_id], counts[second.pokemon_id]) == (3, 1)
+    assert unpopular.pokemon_id not in counts
+    # Most favourited first
+    assert list(counts).index(first.pokemon_id) < list(counts).index(second.pokemon_id)
+
+    user_ids = [user.user_id for user in users]
+    await session.execute(delete(UserPokemon).where(UserPokemon.user_id.in_(user_ids)))
+    await session.execute(delete(User).where(User.user_id.in_(user_ids)))
+    await session.commit()
+    response = await client.get("/pokemons/popular", params={"limit": 100})
+    assert {item["pokemon_id"]: item["favourite_count"] for item in response.json()}[
+        first.pokemon_id
+    ] == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_search_pokemons(client: AsyncClient) -> None:
+    zapdragon = await PokemonFactory(
+        name="Zapdragonite", description="A thunderous sky serpent"
+    )
+    await PokemonFactory(name="Zapmolt", description="Blazing wings")
+    serpent = await PokemonFactory(
+        name="Coilfang", description="Hides in swamps, a venomous serpent"
+    )
+
+    # Fuzzy name match, best match first
+    response = await client.get("/pokemons/search", params={"q": "zapdragnite"})
+    assert response.status_code == HTTPStatus.OK
+    results = response.json()
+    assert results[0]["pokemon_id"] == zapdragon.pokemon_id
+    assert results[0]["rank"] > 0
+
+    # Full-text description match (stemmed), ranked
+    response = await client.get("/pokemons/search", params={"q": "serpents"})
+    assert {item["pokemon_id"] for item in response.json()} == {
+        zapdragon.pokemon_id,
+        serpent.pokemon_id,
+    }
+
+    # Substring of a name, LIKE wildcards in the query are literal
+    response = await client.get("/pokemons/search", params={"q": "pmol"})
+    assert [item["name"] for item in response.json()] == ["Zapmolt"]
+    response = await client.get("/pokemons/search", params={"q": "%%%"})
+    assert response.json() == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_search_pokemons_ranks_best_matches_of_broad_queries(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    max_candidates = 3
+    monkeypatch.setattr(get_settings(), "SEARCH_MAX_CANDIDATES", max_candidates)
+    for number in range(max_candidates * 2):
+        await PokemonFactory(
+            name=f"Cavern{number}",
+            description="It evolved from Gloomwing in a dark cave",
+        )
+    # Inserted last, so the first description matches found would crowd it out
+    gloomwing = await PokemonFactory(name="Gloomwing", description="Flies at night")
+
+    response = await client.get("/pokemons/search", params={"q": "gloomwing"})
+    assert response.status_code == HTTPStatus.OK
+    results = response.json()
+    assert results[0]["pokemon_id"] == gloomwing.pokemon_id
+    assert len(results) == max_candidates + 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_search_pokemons_requires_three_characters(client: AsyncClient) -> None:
+    response = await client.get("/pokemons/search", params={"q": "ab"})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_pokemons(client: AsyncClient) -> None:
+    total = (await client.get("/pokemons/")).json()["total"]
+
+    response = await client.get("/pokemons/export")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) == total
+    assert all(PokemonResponse.model_validate_json(line) for line in lines)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_streams_in_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "EXPORT_YIELD_PER", 4)
+    query = (
+        select(*POKEMON_RESPONSE_COLUMNS)
+        .order_by(Pokemon.created_at, Pokemon.pokemon_id)
+        .limit(10)
+    )
+
+    response = ndjson_response(db.read_session_factory(None), query)
+    chunks = [chunk async for chunk in response.body_iterator]
+
+    # One chunk per server-side cursor batch
+    assert [chunk.count(b"\n") for chunk in chunks] == [4, 4, 2]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_estimate_count_of_literals_with_colons(session: AsyncSession) -> None:
+    query = select(Pokemon).where(
+        Pokemon.name == "mr:mime 100%", Pokemon.description != ":description"
+    )
+
+    assert isinstance(await estimate_count(session, query), int)
@@ -0,0 +1,86 @@
+from http import HTTPStatus
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core.config import get_settings
+from app.core.db import LAST_WRITE_COOKIE
+from app.main import app
+from app.models import User
+from app.tests.factories import PokemonFactory, UserPokemonFactory
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_reads_go_to_replica_except_after_own_write(
+    client: AsyncClient, default_user, replica_db, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async with replica_db() as replica_session:
+        replica_session.add(
+            User(
+                user_id=default_user.user_id,
+                email=default_user.email,
+                hashed_password="hashedpassword",
+            )
+        )
+        await replica_session.commit()
+
+    # Only on the primary, the replica doesn't have it
+    unreplicated, added = await PokemonFactory(), await PokemonFactory()
+    await UserPokemonFactory(
+        user_id=default_user.user_id, pokemon_id=unreplicated.pokemon_id
+    )
+
+    response = await client.get("/user/pokemons/")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["total"] == 0
+
+    response = await client.post("/user/pokemons/bulk", json=[added.pokemon_id])
+    assert response.status_code == HTTPStatus.OK
+
+    # Read your writes: the primary serves the user right after its write
+    response = await client.get("/user/pokemons/")
+    assert {item["pokemon_id"] for item in response.json()["items"]} == {
+        unreplicated.pokemon_id,
+        added.pokemon_id,
+    }
+
+    # The client carries its last write, a worker that didn't serve the write routes it too
+    assert client.cookies[LAST_WRITE_COOKIE].startswith(f"{default_user.user_id}:")
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url=client.base_url,
+        headers=client.headers,
+        cookies={LAST_WRITE_COOKIE: client.cookies[LAST_WRITE_COOKIE]},
+    ) as other_client:
+        response = await other_client.get("/user/pokemons/")
+    assert {item["pokemon_id"] for item in response.json()["items"]} == {
+        unreplicated.pokemon_id,
+        added.pokemon_id,
+    }
+
+    # Once the window has passed, reads go back to the replica
+    monkeypatch.setattr(get_settings(), "DB_READ_YOUR_WRITES_SECONDS", 0)
+    response = await client.get("/user/pokemons/")
+    assert response.json()["total"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_new_user_reads_own_account_before_replica_catches_up(
+    client: AsyncClient, replica_db
+) -> None:
+    email = "replica-lag@example.com"
+    response = await client.post(
+        "/auth/register", json={"email": email, "password": "zubat"}
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    response = await client.post(
+        "/auth/login", data={"username": email, "password": "zubat"}
+    )
+    access_token = response.json()["access_token"]
+
+    response = await client.get(
+        "/user/account", headers={"Authorization": f"Bearer {access_token}"}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["email"] == email
@@ -1 +1,129 @@
-# TODO
+import json
+import uuid
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import get_settings
+from app.tests.factories import PokemonFactory, UserPokemonFactory
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_user_pokemons_cursor_in_insertion_order(
+    client: AsyncClient, default_user
+) -> None:
+    pokemons = [await PokemonFactory() for _ in range(5)]
+    for pokemon in reversed(pokemons):
+        await UserPokemonFactory(
+            user_id=default_user.user_id, pokemon_id=pokemon.pokemon_id
+        )
+
+    response = await client.get("/user/pokemons/cursor", params={"size": 3})
+    assert response.status_code == HTTPStatus.OK
+    first_page = response.json()
+    assert first_page["next_cursor"] is not None
+
+    response = await client.get(
+        "/user/pokemons/cursor", params={"size": 3, "cursor": first_page["next_cursor"]}
+    )
+    assert response.status_code == HTTPStatus.OK
+    second_page = response.json()
+    assert second_page["next_cursor"] is None
+
+    names = [item["name"] for item in first_page["items"] + second_page["items"]]
+    assert names == [pokemon.name for pokemon in reversed(pokemons)]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_add_favorite_pokemons_bulk(client: AsyncClient, default_user) -> None:
+    favorite, new, other_new = [await PokemonFactory() for _ in range(3)]
+    await UserPokemonFactory(
+        user_id=default_user.user_id, pokemon_id=favorite.pokemon_id
+    )
+    missing_id = str(uuid.uuid4())
+
+    response = await client.post(
+        "/user/pokemons/bulk",
+        json=[
+            new.pokemon_id,
+            favorite.pokemon_id,
+            missing_id,
+            other_new.pokemon_id,
+            new.pokemon_id,
+        ],
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert [item["pokemon_id"] for item in data["added"]] == [
+        new.pokemon_id,
+        other_new.pokemon_id,
+    ]
+    assert data["already_favorite"] == [favorite.pokemon_id]
+    assert data["missing"] == [missing_id]
+
+    response = await client.get("/user/pokemons/", params={"size": 100})
+    assert {item["pokemon_id"] for item in response.json()["items"]} == {
+        favorite.pokemon_id,
+        new.pokemon_id,
+        other_new.pokemon_id,
+    }
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_add_favorite_pokemons_bulk_too_many_ids(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(get_settings(), "FAVORITES_BULK_MAX_IDS", 2)
+
+    response = await client.post(
+        "/user/pokemons/bulk", json=[str(uuid.uuid4()) for _ in range(3)]
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_user_pokemons_etag(client: AsyncClient, default_user) -> None:
+    favorite, new = [await PokemonFactory() for _ in range(2)]
+    await UserPokemonFactory(
+        user_id=default_user.user_id, pokemon_id=favorite.pokemon_id
+    )
+    etag = (await client.get("/user/pokemons/")).headers["etag"]
+
+    response = await client.get("/user/pokemons/", headers={"If-None-Match": etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    await client.post("/user/pokemons/bulk", json=[new.pokemon_id])
+    response = await client.get("/user/pokemons/", headers={"If-None-Match": etag})
+    assert response.status_code == HTTPStatus.OK
+    assert {item["pokemon_id"] for item in response.json()["items"]} == {
+        favorite.pokemon_id,
+        new.pokemon_id,
+    }
+
+    await client.delete(f"/user/pokemons/{new.pokemon_id}")
+    response = await client.get(
+        "/user/pokemons/", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()["items"]) == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_user_pokemons_in_insertion_order(
+    client: AsyncClient, default_user
+) -> None:
+    pokemons = [await PokemonFactory() for _ in range(3)]
+    for pokemon in reversed(pokemons):
+        await UserPokemonFactory(
+            user_id=default_user.user_id, pokemon_id=pokemon.pokemon_id
+        )
+
+    response = await client.get("/user/pokemons/export")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported = [json.loads(line)["pokemon_id"] for line in response.text.splitlines()]
+    assert exported == [pokemon.pokemon_id for pokemon in reversed(pokemons)]
@@ -1 +1,60 @@
-# TODO
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+from pydantic import ValidationError
+
+from app.core.cache import cache_lookups
+from app.core.dependencies import get_user_cache
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_account_uses_user_cache(client: AsyncClient, default_user) -> None:
+    response = await client.get("/user/account")
+    assert response.status_code == HTTPStatus.OK
+    hits = cache_lookups.value(cache="users", result="hit")
+
+    response = await client.get("/user/account")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        "user_id": default_user.user_id,
+        "email": default_user.email,
+    }
+    assert cache_lookups.value(cache="users", result="hit") == hits + 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cached_user_is_read_only(client: AsyncClient, default_user) -> None:
+    await client.get("/user/account")
+    cached_user = get_user_cache().get(default_user.user_id)
+
+    with pytest.raises(ValidationError):
+        cached_user.email = "changed@example.com"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_update_account_invalidates_cached_user(
+    client: AsyncClient, default_user
+) -> None:
+    await client.get("/user/account")
+    assert get_user_cache().get(default_user.user_id) is not None
+
+    response = await client.put("/user/account", json={"password": "new-password"})
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()["user_id"] == default_user.user_id
+    assert get_user_cache().get(default_user.user_id) is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_delete_account_invalidates_cached_user(
+    client: AsyncClient, default_user
+) -> None:
+    await client.get("/user/account")
+
+    response = await client.delete("/user/account")
+    assert response.status_code == HTTPStatus.NO_CONTENT
+
+    response = await client.get("/user/account")
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
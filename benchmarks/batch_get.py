@@ -0,0 +1,105 @@
+"""
+Pokemon details for a list of ids: one `GET /pokemons/{pokemon_id}` per id vs. one `POST /pokemons/batch-get`,
+with the catalog cache disabled and enabled.
+
+    python -m benchmarks.batch_get --sizes 10 100 1000
+
+Talks to the app in-process, so the per-id numbers leave out the network round trips a real client pays on
+top. Seeds synthetic Pokemon and a user, committed so the app sees them, and deletes them at the end.
+"""
+
+import argparse
+import asyncio
+import os
+import uuid
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import get_settings
+from app.core.security import create_jwt_token
+from app.models import Pokemon, User
+from benchmarks.utils import (
+    SEED_POKEMONS_SQL,
+    Timer,
+    app_client,
+    summarize,
+    unique_email,
+)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_async_engine(get_settings().DB_URI)
+    prefix = uuid.uuid4().hex[:8]
+    async with engine.begin() as connection:
+        await connection.execute(
+            text(SEED_POKEMONS_SQL), {"count": max(args.sizes), "prefix": prefix}
+        )
+        pokemon_ids = [
+            str(pokemon_id)
+            for pokemon_id in (
+                await connection.scalars(
+                    text("SELECT pokemon_id FROM pokemons WHERE name LIKE :pattern"),
+                    {"pattern": f"Bench-{prefix}-%"},
+                )
+            )
+        ]
+        user_id = (
+            await connection.execute(
+                User.__table__.insert()
+                .values(email=unique_email("batch"), hashed_password="x")
+                .returning(User.user_id)
+            )
+        ).scalar_one()
+    headers = {"Authorization": f"Bearer {create_jwt_token(str(user_id)).access_token}"}
+
+    from app.main import app
+
+    try:
+        for cache_enabled in (False, True):
+            os.environ["CATALOG_CACHE_ENABLED"] = str(cache_enabled)
+            get_settings.cache_clear()
+            # The lifespan loads the catalog cache when it's enabled
+            async with app.router.lifespan_context(app), app_client() as client:
+                for size in args.sizes:
+                    ids = pokemon_ids[:size]
+                    single_samples, batch_samples = [], []
+                    for _ in range(args.repeat):
+                        with Timer() as timer:
+                            for pokemon_id in ids:
+                                (
+                                    await client.get(
+                                        f"/pokemons/{pokemon_id}", headers=headers
+                                    )
+                                ).raise_for_status()
+                        single_samples.append(timer.elapsed)
+                        with Timer() as timer:
+                            (
+                                await client.post(
+                                    "/pokemons/batch-get", json=ids, headers=headers
+                                )
+                            ).raise_for_status()
+                        batch_samples.append(timer.elapsed)
+                    single, batch = summarize(single_samples), summarize(batch_samples)
+                    print(
+                        f"cache={'on ' if cache_enabled else 'off'} ids={size:<5} per id p50={single['p50_ms']:9.1f}ms  "
+                        f"batch-get p50={batch['p50_ms']:7.1f}ms  ({single['p50_ms'] / batch['p50_ms']:.0f}x)"
+                    )
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(delete(User).where(User.user_id == user_id))
+            await connection.execute(
+                delete(Pokemon).where(Pokemon.name.like(f"Bench-{prefix}-%"))
+            )
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Bulk favourite insert: the previous three round trip ORM implementation vs. the single
+INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING statement.
+
+    python -m benchmarks.bulk_favorites --sizes 100 1000 10000
+
+Seeds synthetic Pokemon and users inside a transaction that is rolled back at the end.
+"""
+
+import argparse
+import asyncio
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.user_pokemons import add_favorite_pokemons_statement
+from app.core.config import get_settings
+from app.models import Pokemon, User, UserPokemon
+from benchmarks.utils import Timer, seed_pokemons, summarize
+
+
+async def legacy_add(
+    session: AsyncSession, user_id: str, pokemon_ids: list[str]
+) -> None:
+    """The implementation before the single statement one."""
+    pokemons = (
+        (
+            await session.execute(
+                select(Pokemon).filter(Pokemon.pokemon_id.in_(pokemon_ids))
+            )
+        )
+        .scalars()
+        .all()
+    )
+    existing = set(
+        (
+            await session.execute(
+                select(UserPokemon.pokemon_id).filter(
+                    UserPokemon.user_id == user_id,
+                    UserPokemon.pokemon_id.in_(pokemon_ids),
+                )
+            )
+        ).scalars()
+    )
+    session.add_all(
+        [
+            UserPokemon(user_id=user_id, pokemon_id=pokemon_id)
+            for pokemon_id in pokemon_ids
+            if pokemon_id not in existing
+        ]
+    )
+    await session.flush()
+    assert pokemons
+
+
+async def single_statement_add(
+    session: AsyncSession, user_id: str, pokemon_ids: list[str]
+) -> None:
+    (await session.execute(add_favorite_pokemons_statement(user_id, pokemon_ids))).all()
+
+
+async def new_user(session: AsyncSession) -> str:
+    user = User(email=f"bench-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    session.add(user)
+    await session.flush()
+    return user.user_id
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_async_engine(get_settings().DB_URI)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await seed_pokemons(connection, max(args.sizes))
+        session = AsyncSession(bind=connection, expire_on_commit=False)
+        all_ids = list(
+            (
+                await session.scalars(select(Pokemon.pokemon_id).limit(max(args.sizes)))
+            ).all()
+        )
+
+        for size in args.sizes:
+            pokemon_ids = all_ids[:size]
+            results = {}
+            for name, implementation in (
+                ("legacy", legacy_add),
+                ("single", single_statement_add),
+            ):
+                samples = []
+                for _ in range(args.repeat):
+                    user_id = await new_user(session)
+                    with Timer() as timer:
+                        await implementation(session, user_id, pokemon_ids)
+                    samples.append(timer.elapsed)
+                    session.expunge_all()
+                results[name] = summarize(samples)
+            print(
+                f"ids={size:<6} legacy p50={results['legacy']['p50_ms']:9.1f}ms  "
+                f"single statement p50={results['single']['p50_ms']:9.1f}ms"
+            )
+
+        await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
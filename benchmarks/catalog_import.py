@@ -0,0 +1,110 @@
+"""
+Bulk catalog import (COPY into a staging table + upsert on name) of a large generated file,
+first as new Pokemon, then again as updates of the same names.
+
+    python -m benchmarks.catalog_import --rows 1000000 --format csv
+    python -m benchmarks.catalog_import --rows 1000000 --format csv --rebuild-indexes
+
+The generated rows are deleted at the end.
+"""
+
+import argparse
+import asyncio
+import csv
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.catalog_import import IMPORT_COLUMNS, ImportFormat, import_catalog
+from app.core.config import get_settings
+from app.import_catalog import read_chunks
+from app.utils import PokemonRarity, PokemonType
+
+
+def generate_records(rows: int, revision: int) -> Iterator[dict]:
+    types, rarities = list(PokemonType), list(PokemonRarity)
+    for number in range(rows):
+        yield {
+            "name": f"Import-bench-{number}",
+            "description": f"Generated Pokemon number {number}, revision {revision}",
+            "hp": 1 + (number + revision) * 7 % 250,
+            "attack": 1 + number * 11 % 190,
+            "defense": 1 + number * 13 % 230,
+            "speed": 1 + number * 17 % 180,
+            "type": types[number % len(types)].value,
+            "rarity": rarities[number % len(rarities)].value,
+        }
+
+
+def write_file(
+    path: Path, import_format: ImportFormat, rows: int, revision: int
+) -> None:
+    with path.open("w", newline="") as file:
+        if import_format == ImportFormat.CSV:
+            writer = csv.DictWriter(file, IMPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(generate_records(rows, revision))
+        else:
+            for record in generate_records(rows, revision):
+                file.write(orjson.dumps(record).decode() + "\n")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--format",
+        type=ImportFormat,
+        choices=list(ImportFormat),
+        default=ImportFormat.CSV,
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=get_settings().IMPORT_BATCH_SIZE
+    )
+    parser.add_argument("--rebuild-indexes", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_async_engine(get_settings().DB_URI)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / f"pokemons.{args.format.value}"
+            for revision, label in enumerate(["insert", "update"]):
+                write_file(path, args.format, args.rows, revision)
+                staged_seconds = 0.0
+
+                def on_progress(progress) -> None:
+                    nonlocal staged_seconds
+                    staged_seconds = progress.seconds
+
+                async with AsyncSession(engine) as session:
+                    report = await import_catalog(
+                        session,
+                        read_chunks(path),
+                        args.format,
+                        args.batch_size,
+                        on_progress=on_progress,
+                        rebuild_indexes=args.rebuild_indexes,
+                    )
+                    await session.commit()
+                print(
+                    f"{label:<6} {args.rows} rows ({path.stat().st_size / 2**20:.0f} MiB {args.format.value}): "
+                    f"parse+validate+COPY {staged_seconds:.1f}s, merge {report.seconds - staged_seconds:.1f}s, "
+                    f"{report.seconds:.1f}s total, {args.rows / report.seconds:,.0f} rows/s, "
+                    f"inserted={report.inserted} updated={report.updated} rejected={report.rejected}"
+                )
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(
+                text("DELETE FROM pokemons WHERE name LIKE 'Import-bench-%'")
+            )
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
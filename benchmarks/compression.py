@@ -0,0 +1,110 @@
+"""
+Response compression: bytes on the wire and CPU time per request for a Pokemon list page,
+uncompressed vs. each encoding supported by `CompressionMiddleware` at a few levels.
+
+    python -m benchmarks.compression --sizes 10 100 1000
+
+Pages are built from synthetic rows and served by a bare app wrapped in the middleware, no database needed.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi import FastAPI
+from fastapi_pagination import Params
+
+from app.core.middleware import COMPRESSORS, CompressionMiddleware
+from app.core.responses import page_response
+from app.utils import PokemonRarity, PokemonType
+from benchmarks.utils import percentile
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 11], "zstd": [1, 3, 19]}
+
+
+def synthetic_items(count: int) -> list[dict]:
+    types, rarities = list(PokemonType), list(PokemonRarity)
+    return [
+        {
+            "pokemon_id": str(uuid.uuid4()),
+            "name": f"Bench-{number}",
+            "hp": 1 + number * 7 % 250,
+            "attack": 1 + number * 11 % 190,
+            "defense": 1 + number * 13 % 230,
+            "speed": 1 + number * 17 % 180,
+            "type": types[number % len(types)],
+            "rarity": rarities[number % len(rarities)],
+        }
+        for number in range(count)
+    ]
+
+
+def create_app(size: int, encoding: str, level: int) -> CompressionMiddleware:
+    app = FastAPI()
+    items = synthetic_items(size)
+
+    @app.get("/pokemons/")
+    async def page():
+        return page_response(items, size, Params.model_construct(page=1, size=size))
+
+    return CompressionMiddleware(
+        app, min_size=0, levels={encoding: level} if encoding else None
+    )
+
+
+async def request(
+    app: CompressionMiddleware, accept_encoding: str
+) -> tuple[int, float]:
+    """Bytes of the response body and CPU seconds spent serving it."""
+    sent = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal sent
+        sent += len(message.get("body", b""))
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/pokemons/",
+        "raw_path": b"/pokemons/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+        "scheme": "http",
+        "server": ("bench", 80),
+    }
+    start = time.process_time()
+    await app(scope, receive, send)
+    return sent, time.process_time() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        variants = [("identity", 0)] + [
+            (encoding, level) for encoding in COMPRESSORS for level in LEVELS[encoding]
+        ]
+        for encoding, level in variants:
+            app = create_app(size, encoding if level else "", level)
+            samples = []
+            for _ in range(args.repeat):
+                sent, cpu = await request(app, encoding)
+                samples.append(cpu)
+            label = encoding if not level else f"{encoding}:{level}"
+            print(
+                f"size={size:<5} {label:<9} {sent:>8} bytes  cpu p50={percentile(samples, 50) * 1000:7.3f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""
+Favourites storage: the previous `users_pokemons` layout (surrogate UUID primary key, unique
+(user_id, pokemon_id) constraint, (user_id, created_at, id) index) vs. the (user_id, pokemon_id) primary key
+with the (user_id, created_at, pokemon_id) index. Table and index sizes, then favourites page and count
+latency per user, with the plan node and heap fetches of each query.
+
+    python -m benchmarks.favorites_storage --rows 100000000 --users 1000000
+
+Both layouts are built side by side in a scratch schema (no foreign keys, the same rows in each),
+vacuumed so the visibility map is set as autovacuum would leave it, and dropped at the end.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import get_settings
+from benchmarks.utils import Timer, summarize
+
+SCHEMA = "bench_favorites"
+
+LAYOUTS = {
+    "surrogate id": [
+        """CREATE TABLE {table} (
+            id uuid NOT NULL, user_id uuid NOT NULL, pokemon_id uuid NOT NULL,
+            created_at timestamptz NOT NULL, updated_at timestamptz NOT NULL)""",
+        "INSERT INTO {table} SELECT gen_random_uuid(), user_id, pokemon_id, created_at, updated_at FROM {source}",
+        "ALTER TABLE {table} ADD PRIMARY KEY (id)",
+        "ALTER TABLE {table} ADD UNIQUE (user_id, pokemon_id)",
+        "CREATE INDEX ON {table} (user_id, created_at, id)",
+    ],
+    "composite key": [
+        """CREATE TABLE {table} (
+            user_id uuid NOT NULL, pokemon_id uuid NOT NULL,
+            created_at timestamptz NOT NULL, updated_at timestamptz NOT NULL)""",
+        "INSERT INTO {table} SELECT user_id, pokemon_id, created_at, updated_at FROM {source}",
+        "ALTER TABLE {table} ADD PRIMARY KEY (user_id, pokemon_id)",
+        "CREATE INDEX ON {table} (user_id, created_at, pokemon_id)",
+    ],
+}
+
+# Favourites are spread evenly over the users, in a random physical order like concurrent inserts leave them
+SEED_SQL = """
+CREATE UNLOGGED TABLE {source} AS
+SELECT md5('user-' || i % :users)::uuid AS user_id, gen_random_uuid() AS pokemon_id,
+       now() - make_interval(secs => i) AS created_at, now() AS updated_at
+FROM generate_series(1, :rows) AS i
+ORDER BY random()
+"""
+
+# Only the columns the favourites listing needs from users_pokemons, the join to pokemons is the same for both
+QUERIES = {
+    "page": "SELECT pokemon_id FROM {table} WHERE user_id = $1 ORDER BY created_at, {tiebreak} LIMIT $2",
+    "count": "SELECT count(*) FROM {table} WHERE user_id = $1",
+}
+
+SIZES_SQL = """
+SELECT pg_relation_size(c.oid), coalesce(sum(pg_relation_size(i.indexrelid)), 0)
+FROM pg_class c LEFT JOIN pg_index i ON i.indrelid = c.oid
+WHERE c.oid = :table ::regclass
+GROUP BY c.oid
+"""
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:9.1f}MB"
+
+
+def _plan_summary(plan: dict) -> tuple[str, int]:
+    """Scan node type of a plan and its heap fetches (for index-only scans)."""
+    if "Index Name" in plan or plan["Node Type"].endswith("Scan"):
+        return plan["Node Type"], plan.get("Heap Fetches", 0)
+    return _plan_summary(plan["Plans"][0])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=100_000_000)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_async_engine(get_settings().DB_URI, isolation_level="AUTOCOMMIT")
+    async with engine.connect() as connection:
+        await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        source = f"{SCHEMA}.seed"
+        try:
+            with Timer() as timer:
+                await connection.execute(
+                    text(SEED_SQL.format(source=source)),
+                    {"rows": args.rows, "users": args.users},
+                )
+            print(
+                f"Generated {args.rows} favourites of {args.users} users in {timer.elapsed:.1f}s"
+            )
+
+            tables = {}
+            for number, (layout, statements) in enumerate(LAYOUTS.items()):
+                table = tables[layout] = f"{SCHEMA}.layout_{number}"
+                with Timer() as timer:
+                    for statement in statements:
+                        await connection.execute(
+                            text(statement.format(table=table, source=source))
+                        )
+                    await connection.execute(text(f"VACUUM ANALYZE {table}"))
+                table_size, index_size = (
+                    await connection.execute(text(SIZES_SQL), {"table": table})
+                ).one()
+                print(
+                    f"{layout:<14} table={_mb(table_size)} indexes={_mb(index_size)} "
+                    f"total={_mb(table_size + index_size)}  built in {timer.elapsed:.1f}s"
+                )
+            await connection.execute(text(f"DROP TABLE {source}"))
+
+            users = [
+                uuid.UUID(hashlib.md5(f"user-{i}".encode()).hexdigest())
+                for i in random.sample(range(args.users), min(args.repeat, args.users))
+            ]
+            for query_name, query in QUERIES.items():
+                for layout, table in tables.items():
+                    tiebreak = "id" if layout == "surrogate id" else "pokemon_id"
+                    sql = query.format(table=table, tiebreak=tiebreak)
+                    arity = sql.count("$")
+                    plan = (
+                        await connection.exec_driver_sql(
+                            f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}",
+                            (users[0], args.size)[:arity],
+                        )
+                    ).scalar_one()
+                    plan = json.loads(plan) if isinstance(plan, str) else plan
+                    node, heap_fetches = _plan_summary(plan[0]["Plan"])
+
+                    samples = []
+                    for user in users:
+                        with Timer() as timer:
+                            await connection.exec_driver_sql(
+                                sql, (user, args.size)[:arity]
+                            )
+                        samples.append(timer.elapsed)
+                    stats = summarize(samples)
+                    print(
+                        f"{query_name:<6} {layout:<14} p50={stats['p50_ms']:7.2f}ms p95={stats['p95_ms']:7.2f}ms  "
+                        f"{node} heap fetches={heap_fetches}"
+                    )
+        finally:
+            await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+"""
+Per-request cost of authenticating a bearer token, with and without the verification cache.
+
+    python -m benchmarks.jwt_verify --iterations 50000
+"""
+
+import argparse
+import timeit
+
+from app.core.security import create_jwt_token, get_jwt_cache, verify_jwt_token
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    token = create_jwt_token("00000000-0000-0000-0000-000000000000").access_token
+    jwt_cache = get_jwt_cache()
+
+    def uncached() -> None:
+        jwt_cache.clear()
+        verify_jwt_token(token)
+
+    def cached() -> None:
+        verify_jwt_token(token)
+
+    for name, func in (("uncached", uncached), ("cached", cached)):
+        elapsed = min(timeit.repeat(func, number=args.iterations, repeat=3))
+        print(f"{name:<9} {elapsed / args.iterations * 1e6:8.2f} µs/verification")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+OFFSET/LIMIT + COUNT pagination vs. keyset pagination at increasing page depth.
+
+    python -m benchmarks.keyset_pagination --rows 200000 --size 10
+
+Seeds synthetic Pokemon inside a transaction that is rolled back at the end.
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import get_settings
+from app.core.pagination import encode_cursor, paginate_keyset
+from app.models import Pokemon
+from app.schemas.base import CursorParams
+from benchmarks.utils import Timer, seed_pokemons, summarize
+
+KEYS = [Pokemon.created_at, Pokemon.pokemon_id]
+
+
+async def offset_page(session: AsyncSession, page: int, size: int) -> None:
+    query = select(Pokemon).order_by(*KEYS)
+    await session.scalar(select(func.count()).select_from(query.subquery()))
+    (await session.scalars(query.offset((page - 1) * size).limit(size))).all()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_async_engine(get_settings().DB_URI)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await seed_pokemons(connection, args.rows)
+        session = AsyncSession(bind=connection)
+
+        pages = [1, 10, 100, 1_000, 10_000]
+        for page in (p for p in pages if (p - 1) * args.size < args.rows):
+            # Cursor pointing at the first row of `page`
+            offset = (page - 1) * args.size
+            cursor = None
+            if offset:
+                previous = await session.execute(
+                    select(*KEYS).order_by(*KEYS).offset(offset - 1).limit(1)
+                )
+                cursor = encode_cursor(previous.one())
+
+            offset_samples, keyset_samples = [], []
+            for _ in range(args.repeat):
+                with Timer() as timer:
+                    await offset_page(session, page, args.size)
+                offset_samples.append(timer.elapsed)
+                with Timer() as timer:
+                    await paginate_keyset(
+                        session,
+                        select(Pokemon),
+                        KEYS,
+                        CursorParams(cursor=cursor, size=args.size),
+                    )
+                keyset_samples.append(timer.elapsed)
+
+            offset_stats, keyset_stats = (
+                summarize(offset_samples),
+                summarize(keyset_samples),
+            )
+            print(
+                f"page={page:<6} offset p50={offset_stats['p50_ms']:8.2f}ms  "
+                f"keyset p50={keyset_stats['p50_ms']:8.2f}ms"
+            )
+
+        await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
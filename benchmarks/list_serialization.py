@@ -0,0 +1,93 @@
+"""
+List page response building: ORM rows validated through the `CustomPage[PokemonResponse]`
+response model and encoded like FastAPI does by default, vs. column tuples encoded with orjson.
+
+    python -m benchmarks.list_serialization --sizes 10 100 1000
+
+Both paths run the same page query. Seeds synthetic Pokemon inside a transaction that is rolled back at the end.
+"""
+
+import argparse
+import asyncio
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi_pagination import Params
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import get_settings
+from app.core.responses import POKEMON_RESPONSE_COLUMNS, page_response, pokemon_items
+from app.models import Pokemon
+from app.schemas.base import CustomPage
+from app.schemas.pokemon import PokemonResponse
+from benchmarks.utils import Timer, seed_pokemons, summarize
+
+
+async def model_page(session: AsyncSession, params: Params, total: int) -> bytes:
+    """The previous path: ORM objects, response model validation, stdlib json."""
+    pokemons = (
+        await session.scalars(
+            select(Pokemon).order_by(Pokemon.created_at).limit(params.size)
+        )
+    ).all()
+    page = CustomPage[PokemonResponse].model_validate(
+        {
+            "items": pokemons,
+            "total": total,
+            "page": params.page,
+            "size": params.size,
+            "pages": 1,
+        },
+        from_attributes=True,
+    )
+    return JSONResponse(jsonable_encoder(page)).body
+
+
+async def fast_page(session: AsyncSession, params: Params, total: int) -> bytes:
+    rows = await session.execute(
+        select(*POKEMON_RESPONSE_COLUMNS)
+        .order_by(Pokemon.created_at)
+        .limit(params.size)
+    )
+    return page_response(pokemon_items(rows), total, params).body
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_async_engine(get_settings().DB_URI)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await seed_pokemons(connection, max(args.sizes))
+        session = AsyncSession(bind=connection)
+
+        for size in args.sizes:
+            params = Params.model_construct(
+                page=1, size=size
+            )  # CustomPage allows up to 1000
+            results = {}
+            for name, build_page in (("model", model_page), ("fast", fast_page)):
+                samples = []
+                for _ in range(args.repeat):
+                    with Timer() as timer:
+                        body = await build_page(session, params, max(args.sizes))
+                    samples.append(timer.elapsed)
+                    session.expunge_all()
+                results[name] = summarize(samples)
+            print(
+                f"size={size:<5} response model p50={results['model']['p50_ms']:8.2f}ms  "
+                f"orjson columns p50={results['fast']['p50_ms']:8.2f}ms  ({len(body)} bytes)"
+            )
+
+        await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
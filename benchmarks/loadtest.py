@@ -0,0 +1,480 @@
+"""
+End-to-end load test: seeds users, Pokemon and favourites, then drives a weighted mix of requests from
+many concurrent clients and reports throughput, p50/p95/p99 latency and DB queries per request, per route.
+
+In-process, through the ASGI transport (the app lifespan runs as in production):
+
+    python -m benchmarks.loadtest --users 200 --pokemons 10000 --clients 50 --duration 30
+
+Against uvicorn, launched by the harness or already running on the same database:
+
+    python -m benchmarks.loadtest --uvicorn --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 --baseline results/main.json
+
+`--mix` sets the operation weights, e.g. `list=40,detail=30,favorites=10,bulk=8,delete=8,login=4`.
+DB queries per request are read from the `http_request_db_queries` histogram on `/metrics`, which is
+per process: with several uvicorn workers they only cover the worker answering the scrapes.
+Login throttling is disabled in-process and in the launched uvicorn, all the clients share one IP.
+The seeded rows are deleted at the end.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from http import HTTPStatus
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient, Limits, Response, TransportError
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.core.config import get_settings
+from app.core.security import create_jwt_token, get_hashed_password
+from app.models import Pokemon, User, UserPokemon
+from benchmarks.utils import SEED_POKEMONS_SQL, summarize
+
+DEFAULT_MIX = "list=40,detail=30,favorites=10,bulk=8,delete=8,login=4"
+PASSWORD = "load-test-password"
+METRIC_SAMPLE = re.compile(
+    r'^http_request_db_(queries|seconds)_(sum|count)\{method="([^"]*)",route="([^"]*)"} (\S+)$'
+)
+
+
+@dataclass
+class Dataset:
+    run_id: str
+    pokemon_ids: list[str]
+    users: list[tuple[str, str]]  # (user_id, email)
+    favorites: dict[str, set[str]]  # By user_id, kept up to date by the clients
+
+
+@dataclass
+class RouteStats:
+    samples: list[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+
+
+class LoadTest:
+    def __init__(
+        self,
+        client: AsyncClient,
+        dataset: Dataset,
+        mix: dict[str, int],
+        page_size: int,
+        bulk_size: int,
+    ):
+        self.client = client
+        self.dataset = dataset
+        self.operations: dict[
+            str, Callable[[str, dict], Awaitable[tuple[str, Response]]]
+        ] = {
+            "login": self.login,
+            "list": self.list_catalog,
+            "detail": self.get_details,
+            "favorites": self.list_favorites,
+            "bulk": self.add_favorites,
+            "delete": self.delete_favorite,
+        }
+        unknown = set(mix) - set(self.operations)
+        if unknown:
+            raise ValueError(
+                f"Unknown operations in the mix: {', '.join(sorted(unknown))}"
+            )
+        self.names, self.weights = list(mix), list(mix.values())
+        self.emails = dict(dataset.users)
+        self.page_size = page_size
+        self.bulk_size = bulk_size
+        self.pages = max(1, len(dataset.pokemon_ids) // page_size)
+        self.routes: dict[str, RouteStats] = {}
+        self.recording = False
+
+    async def login(self, user_id: str, headers: dict) -> tuple[str, Response]:
+        data = {"username": self.emails[user_id], "password": PASSWORD}
+        return "POST /auth/login", await self.client.post("/auth/login", data=data)
+
+    async def list_catalog(self, user_id: str, headers: dict) -> tuple[str, Response]:
+        params = {"page": random.randint(1, self.pages), "size": self.page_size}
+        return "GET /pokemons/", await self.client.get(
+            "/pokemons/", params=params, headers=headers
+        )
+
+    async def get_details(self, user_id: str, headers: dict) -> tuple[str, Response]:
+        pokemon_id = random.choice(self.dataset.pokemon_ids)
+        return "GET /pokemons/{pokemon_id}", await self.client.get(
+            f"/pokemons/{pokemon_id}", headers=headers
+        )
+
+    async def list_favorites(self, user_id: str, headers: dict) -> tuple[str, Response]:
+        params = {"size": self.page_size}
+        return "GET /user/pokemons/", await self.client.get(
+            "/user/pokemons/", params=params, headers=headers
+        )
+
+    async def add_favorites(self, user_id: str, headers: dict) -> tuple[str, Response]:
+        pokemon_ids = random.sample(
+            self.dataset.pokemon_ids, min(self.bulk_size, len(self.dataset.pokemon_ids))
+        )
+        response = await self.client.post(
+            "/user/pokemons/bulk", json=pokemon_ids, headers=headers
+        )
+        if response.status_code == HTTPStatus.OK:
+            self.dataset.favorites[user_id].update(
+                item["pokemon_id"] for item in response.json()["added"]
+            )
+        return "POST /user/pokemons/bulk", response
+
+    async def delete_favorite(
+        self, user_id: str, headers: dict
+    ) -> tuple[str, Response]:
+        favorites = self.dataset.favorites[user_id]
+        # Without favourites left this is a 404, still a valid sample of the route
+        pokemon_id = (
+            favorites.pop() if favorites else random.choice(self.dataset.pokemon_ids)
+        )
+        return "DELETE /user/pokemons/{pokemon_id}", await self.client.delete(
+            f"/user/pokemons/{pokemon_id}", headers=headers
+        )
+
+    async def run_client(self, number: int, deadline: float) -> None:
+        user_id, _ = self.dataset.users[number % len(self.dataset.users)]
+        headers = {"Authorization": f"Bearer {create_jwt_token(user_id).access_token}"}
+        while time.perf_counter() < deadline:
+            operation = self.operations[random.choices(self.names, self.weights)[0]]
+            recording = self.recording
+            start = time.perf_counter()
+            try:
+                route, response = await operation(user_id, headers)
+                status = str(response.status_code)
+            except Exception as error:  # Connection errors, timeouts
+                route, status = operation.__name__, type(error).__name__
+            if recording:
+                stats = self.routes.setdefault(route, RouteStats())
+                stats.samples.append(time.perf_counter() - start)
+                stats.statuses[status] += 1
+
+
+async def seed(
+    connection: AsyncConnection, users: int, pokemons: int, favorites: int
+) -> Dataset:
+    """Commits the load test data, `delete_dataset` removes it."""
+    run_id = uuid.uuid4().hex[:8]
+    await connection.execute(
+        text(SEED_POKEMONS_SQL), {"count": pokemons, "prefix": run_id}
+    )
+    pokemon_ids = list(
+        (
+            await connection.scalars(
+                select(Pokemon.pokemon_id).where(Pokemon.name.like(f"Bench-{run_id}-%"))
+            )
+        ).all()
+    )
+
+    # One bcrypt hash shared by all users, hashing them one by one would take minutes
+    hashed_password = get_hashed_password(PASSWORD)
+    rows = [
+        {
+            "email": f"load-{run_id}-{number}@example.com",
+            "hashed_password": hashed_password,
+        }
+        for number in range(users)
+    ]
+    result = await connection.execute(
+        insert(User).returning(User.user_id, User.email), rows
+    )
+    seeded_users = [(user_id, email) for user_id, email in result.all()]
+
+    # Skewed popularity, a few Pokemon are favourites of many users
+    user_favorites = {}
+    for user_id, _ in seeded_users:
+        chosen: set[str] = set()
+        while len(chosen) < min(favorites, len(pokemon_ids)):
+            chosen.add(pokemon_ids[int(len(pokemon_ids) * random.random() ** 3)])
+        user_favorites[user_id] = chosen
+    favorite_rows = [
+        {"user_id": user_id, "pokemon_id": pokemon_id}
+        for user_id, chosen in user_favorites.items()
+        for pokemon_id in chosen
+    ]
+    if favorite_rows:
+        await connection.execute(insert(UserPokemon), favorite_rows)
+    await connection.execute(text("ANALYZE pokemons, users, users_pokemons"))
+    await connection.commit()
+    return Dataset(run_id, pokemon_ids, seeded_users, user_favorites)
+
+
+async def delete_dataset(connection: AsyncConnection, dataset: Dataset) -> None:
+    user_ids = select(User.user_id).where(User.email.like(f"load-{dataset.run_id}-%"))
+    pokemon_ids = select(Pokemon.pokemon_id).where(
+        Pokemon.name.like(f"Bench-{dataset.run_id}-%")
+    )
+    await connection.execute(
+        delete(UserPokemon).where(
+            UserPokemon.user_id.in_(user_ids) | UserPokemon.pokemon_id.in_(pokemon_ids)
+        )
+    )
+    await connection.execute(delete(User).where(User.user_id.in_(user_ids)))
+    await connection.execute(delete(Pokemon).where(Pokemon.pokemon_id.in_(pokemon_ids)))
+    await connection.commit()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def in_process_client() -> AsyncIterator[AsyncClient]:
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://loadtest"
+        ) as client:
+            yield client
+
+
+@asynccontextmanager
+async def http_client(base_url: str, clients: int) -> AsyncIterator[AsyncClient]:
+    limits = Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        yield client
+
+
+@asynccontextmanager
+async def uvicorn_client(workers: int, clients: int) -> AsyncIterator[AsyncClient]:
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ]
+    )
+    try:
+        async with http_client(f"http://127.0.0.1:{port}", clients) as client:
+            for _ in range(300):
+                try:
+                    if (await client.get("/metrics")).status_code == HTTPStatus.OK:
+                        break
+                except TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start in 30s")
+            yield client
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def scrape_db_stats(
+    client: AsyncClient,
+) -> dict[tuple[str, str], dict[str, float]]:
+    """Per "METHOD /route": totals of the DB query count and time histograms."""
+    stats: dict[tuple[str, str], dict[str, float]] = {}
+    for line in (await client.get("/metrics")).text.splitlines():
+        if match := METRIC_SAMPLE.match(line):
+            metric, kind, method, route, value = match.groups()
+            stats.setdefault(f"{method} {route}", {})[f"{metric}_{kind}"] = float(value)
+    return stats
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def build_report(
+    load_test: LoadTest, elapsed: float, db_before: dict, db_after: dict
+) -> dict:
+    routes = {}
+    for route, stats in sorted(load_test.routes.items()):
+        before, after = db_before.get(route, {}), db_after.get(route, {})
+        delta = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+        requests = delta.get("queries_count", 0)
+        routes[route] = {
+            "rps": len(stats.samples) / elapsed,
+            **summarize(stats.samples),
+            "statuses": dict(stats.statuses),
+            "db_queries_per_request": delta["queries_sum"] / requests
+            if requests
+            else None,
+            "db_ms_per_request": delta["seconds_sum"] / requests * 1000
+            if requests
+            else None,
+        }
+    total = sum(len(stats.samples) for stats in load_test.routes.values())
+    return {
+        "requests": total,
+        "rps": total / elapsed,
+        "duration_seconds": elapsed,
+        "routes": routes,
+    }
+
+
+def print_report(report: dict, baseline: dict | None) -> None:
+    print(
+        f"\n{report['requests']} requests in {report['duration_seconds']:.1f}s, {report['rps']:.1f} req/s"
+    )
+    print(
+        f"{'route':<34} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}  statuses"
+    )
+    for route, stats in report["routes"].items():
+        queries = stats["db_queries_per_request"]
+        print(
+            f"{route:<34} {stats['rps']:7.1f} {stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f} "
+            f"{queries if queries is None else round(queries, 2)!s:>8}  {stats['statuses']}"
+        )
+        previous = (baseline or {}).get("routes", {}).get(route)
+        if previous:
+            print(
+                f"{'  vs baseline':<34} {stats['rps'] - previous['rps']:+7.1f} "
+                f"{stats['p50_ms'] - previous['p50_ms']:+8.1f} {stats['p95_ms'] - previous['p95_ms']:+8.1f} "
+                f"{stats['p99_ms'] - previous['p99_ms']:+8.1f}"
+            )
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--pokemons", type=int, default=10_000)
+    parser.add_argument(
+        "--favorites", type=int, default=20, help="Seeded favourites per user"
+    )
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=50,
+        help="Concurrent clients, each one acting as a user",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Measured seconds, after the warm up"
+    )
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--bulk-size", type=int, default=10)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--base-url",
+        help="Running server using the same database, in-process by default",
+    )
+    target.add_argument(
+        "--uvicorn", action="store_true", help="Launch uvicorn on a free port"
+    )
+    parser.add_argument("--uvicorn-workers", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="JSON results of a previous run to compare with"
+    )
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    mix = parse_mix(args.mix)
+    os.environ["LOGIN_EMAIL_RATE_BURST"] = os.environ["LOGIN_IP_RATE_BURST"] = "0"
+    get_settings.cache_clear()
+
+    engine = create_async_engine(get_settings().DB_URI)
+    async with engine.connect() as connection:
+        started = time.perf_counter()
+        dataset = await seed(connection, args.users, args.pokemons, args.favorites)
+        print(
+            f"Seeded {args.users} users, {args.pokemons} Pokemon and {args.favorites} favourites per user "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        try:
+            if args.base_url:
+                target_name, client_context = (
+                    args.base_url,
+                    http_client(args.base_url, args.clients),
+                )
+            elif args.uvicorn:
+                target_name = f"uvicorn --workers {args.uvicorn_workers}"
+                client_context = uvicorn_client(args.uvicorn_workers, args.clients)
+            else:
+                target_name, client_context = "in-process", in_process_client()
+
+            async with client_context as client:
+                load_test = LoadTest(
+                    client, dataset, mix, args.page_size, args.bulk_size
+                )
+                deadline = time.perf_counter() + args.warmup + args.duration
+                tasks = [
+                    asyncio.create_task(load_test.run_client(number, deadline))
+                    for number in range(args.clients)
+                ]
+                await asyncio.sleep(args.warmup)
+                db_before = await scrape_db_stats(client)
+                load_test.recording = True
+                measure_start = time.perf_counter()
+                await asyncio.gather(*tasks)
+                elapsed = time.perf_counter() - measure_start
+                db_after = await scrape_db_stats(client)
+        finally:
+            await delete_dataset(connection, dataset)
+    await engine.dispose()
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now(UTC).isoformat(),
+        "target": target_name,
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        **build_report(load_test, elapsed, db_before, db_after),
+    }
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_report(report, baseline)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
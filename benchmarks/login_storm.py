@@ -0,0 +1,116 @@
+"""
+Catalog read latency while the same worker is handling a burst of logins.
+
+Runs against the database configured in `.env` (migrations applied), in-process:
+
+    python -m benchmarks.login_storm --logins 40 --concurrency 20
+
+Each scenario is run once with bcrypt inline on the event loop (`PASSWORD_HASHER_WORKERS=0`,
+the old behaviour) and once with the process pool. With the pool, p99 of `GET /pokemons/`
+during the storm should stay close to the idle p99.
+"""
+
+import argparse
+import asyncio
+import os
+
+from httpx import AsyncClient
+
+from app.core.config import get_settings
+from app.core.hashing import get_password_hasher
+from benchmarks.utils import Timer, app_client, summarize, unique_email
+
+
+async def read_catalog(
+    client: AsyncClient,
+    headers: dict[str, str],
+    stop: asyncio.Event,
+    samples: list[float],
+) -> None:
+    while not stop.is_set():
+        with Timer() as timer:
+            response = await client.get("/pokemons/", headers=headers)
+        response.raise_for_status()
+        samples.append(timer.elapsed)
+        await asyncio.sleep(0.005)
+
+
+async def login(
+    client: AsyncClient, semaphore: asyncio.Semaphore, email: str, password: str
+) -> None:
+    async with semaphore:
+        response = await client.post(
+            "/auth/login", data={"username": email, "password": password}
+        )
+        response.raise_for_status()
+
+
+async def run_scenario(
+    workers: int, logins: int, concurrency: int, readers: int
+) -> None:
+    os.environ["PASSWORD_HASHER_WORKERS"] = str(workers)
+    # The storm comes from one client on purpose, this measures the hasher, not the login throttling
+    os.environ["LOGIN_EMAIL_RATE_BURST"] = os.environ["LOGIN_IP_RATE_BURST"] = "0"
+    get_settings.cache_clear()
+    get_password_hasher.cache_clear()
+    hasher = get_password_hasher()
+    hasher.max_queue = max(hasher.max_queue, logins)
+    hasher.start()
+
+    email, password = unique_email("storm"), "storm-password"
+    async with app_client() as client:
+        response = await client.post(
+            "/auth/register", json={"email": email, "password": password}
+        )
+        response.raise_for_status()
+        response = await client.post(
+            "/auth/login", data={"username": email, "password": password}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for phase in ("idle", "storm"):
+            stop, samples = asyncio.Event(), []
+            reader_tasks = [
+                asyncio.create_task(read_catalog(client, headers, stop, samples))
+                for _ in range(readers)
+            ]
+            with Timer() as timer:
+                if phase == "idle":
+                    await asyncio.sleep(2)
+                else:
+                    semaphore = asyncio.Semaphore(concurrency)
+                    await asyncio.gather(
+                        *(
+                            login(client, semaphore, email, password)
+                            for _ in range(logins)
+                        )
+                    )
+            stop.set()
+            await asyncio.gather(*reader_tasks)
+
+            stats = summarize(samples)
+            print(
+                f"workers={workers:<2} {phase:<5} {timer.elapsed:6.2f}s  reads={stats['count']:<5} "
+                f"p50={stats['p50_ms']:8.1f}ms  p99={stats['p99_ms']:8.1f}ms"
+            )
+    hasher.shutdown()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument(
+        "--workers", type=int, default=get_settings().PASSWORD_HASHER_WORKERS or 2
+    )
+    args = parser.parse_args()
+
+    for workers in (0, args.workers):
+        await run_scenario(workers, args.logins, args.concurrency, args.readers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
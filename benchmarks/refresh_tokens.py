@@ -0,0 +1,69 @@
+"""
+Auth CPU cost per new access token: `/auth/login` (bcrypt verification) vs. `/auth/refresh`
+(refresh token rotation, one indexed statement).
+
+    python -m benchmarks.refresh_tokens --repeat 20
+
+bcrypt runs inline (`PASSWORD_HASHER_WORKERS=0`), so the CPU time of this process covers all of it.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from app.core.config import get_settings
+from benchmarks.utils import Timer, app_client, percentile, summarize, unique_email
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["PASSWORD_HASHER_WORKERS"] = "0"
+    os.environ["LOGIN_EMAIL_RATE_BURST"] = os.environ["LOGIN_IP_RATE_BURST"] = "0"
+    get_settings.cache_clear()
+
+    email, password = unique_email("refresh"), "refresh-password"
+    async with app_client() as client:
+        response = await client.post(
+            "/auth/register", json={"email": email, "password": password}
+        )
+        response.raise_for_status()
+        refresh_token = None
+
+        for operation in ("login", "refresh"):
+            samples, cpu = [], []
+            for _ in range(args.repeat):
+                start = time.process_time()
+                with Timer() as timer:
+                    if operation == "login":
+                        response = await client.post(
+                            "/auth/login",
+                            data={"username": email, "password": password},
+                        )
+                    else:
+                        response = await client.post(
+                            "/auth/refresh", json={"refresh_token": refresh_token}
+                        )
+                response.raise_for_status()
+                cpu.append(time.process_time() - start)
+                samples.append(timer.elapsed)
+                refresh_token = response.json()["refresh_token"]
+            stats = summarize(samples)
+            print(
+                f"{operation:<8} p50={stats['p50_ms']:7.1f}ms p99={stats['p99_ms']:7.1f}ms  "
+                f"cpu p50={percentile(cpu, 50) * 1000:7.2f}ms"
+            )
+
+        await client.delete(
+            "/user/account",
+            headers={"Authorization": f"Bearer {response.json()['access_token']}"},
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
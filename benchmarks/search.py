@@ -0,0 +1,113 @@
+"""
+Pokemon search latency (GET /pokemons/search query) on a large catalog: fuzzy name, name substring
+and full-text description queries, served by the trigram and tsvector GIN indexes.
+
+    python -m benchmarks.search --rows 1000000
+
+Seeds synthetic Pokemon with generated names and descriptions, commits and vacuums them, so the GIN
+indexes are in their steady state (no pending list), and deletes them at the end.
+"""
+
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.pokemons import search_pokemons_statement
+from app.core.config import get_settings
+from benchmarks.utils import Timer, summarize
+
+# Names from 4 of 24 syllables, descriptions from 3 of 40 words, so matches are selective
+SEED_SQL = """
+WITH syllables AS (
+    SELECT ARRAY['pi','ka','chu','bul','ba','saur','char','man','der','squir','tle','zap','dos','mew','gar',
+                 'eev','lap','ras','geo','dude','on','ix','ly','tro'] AS s
+), words AS (
+    SELECT ARRAY['electric','mouse','flame','tail','shell','water','seed','bulb','rock','snake','ghost','shadow',
+                 'psychic','dream','ice','bird','thunder','storm','dragon','sea','forest','cave','mountain','river',
+                 'poison','sting','steel','wing','fairy','dust','night','fang','moon','sun','leaf','blade','iron',
+                 'sand','spark','mist'] AS w
+)
+INSERT INTO pokemons (pokemon_id, name, description, hp, attack, defense, speed, type, rarity)
+SELECT gen_random_uuid(),
+       initcap(s[1 + i % 24] || s[1 + (i / 24) % 24] || s[1 + (i / 576) % 24] || s[1 + (i / 13824) % 24])
+           || '-bench-' || i,
+       'A ' || w[1 + i % 40] || ' ' || w[1 + (i / 40) % 40] || ' Pokemon living near the ' || w[1 + (i / 1600) % 40],
+       100, 100, 100, 100,
+       (enum_range(NULL::pokemontype))[1 + i % 18],
+       (enum_range(NULL::pokemonrarity))[1 + i % 5]
+FROM generate_series(1, :rows) AS i, syllables, words
+"""
+
+QUERIES = {
+    "fuzzy name": "Pikachuzap",
+    "name substring": "chudos",
+    "full text": "thunder dragon",
+    "full text phrase": '"storm fang"',
+}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument(
+        "--candidates", type=int, default=get_settings().SEARCH_MAX_CANDIDATES
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_async_engine(get_settings().DB_URI, isolation_level="AUTOCOMMIT")
+    async with engine.connect() as connection:
+        with Timer() as timer:
+            await connection.execute(text(SEED_SQL), {"rows": args.rows})
+            await connection.execute(text("VACUUM ANALYZE pokemons"))
+        print(f"Seeded {args.rows} Pokemon in {timer.elapsed:.1f}s")
+        session = AsyncSession(bind=connection)
+
+        try:
+            for name, phrase in QUERIES.items():
+                statement = search_pokemons_statement(
+                    phrase, args.limit, args.candidates
+                )
+                compiled = statement.compile(dialect=connection.dialect)
+                parameters = tuple(compiled.params[key] for key in compiled.positiontup)
+                plan = (
+                    await connection.exec_driver_sql(
+                        f"EXPLAIN (FORMAT JSON) {compiled}", parameters
+                    )
+                ).scalar_one()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                indexes = sorted(set(_index_names(plan[0]["Plan"])))
+
+                samples, found = [], 0
+                for _ in range(args.repeat):
+                    with Timer() as timer:
+                        found = len((await session.execute(statement)).all())
+                    samples.append(timer.elapsed)
+                stats = summarize(samples)
+                print(
+                    f"{name:<17} q={phrase!r:<18} results={found:<3} p50={stats['p50_ms']:7.2f}ms "
+                    f"p95={stats['p95_ms']:7.2f}ms  indexes={','.join(indexes) or 'none'}"
+                )
+        finally:
+            await connection.execute(
+                text("DELETE FROM pokemons WHERE name LIKE '%-bench-%'")
+            )
+            await connection.execute(text("VACUUM ANALYZE pokemons"))
+    await engine.dispose()
+
+
+def _index_names(plan: dict) -> list[str]:
+    names = [plan["Index Name"]] if "Index Name" in plan else []
+    return names + [
+        name for child in plan.get("Plans", []) for name in _index_names(child)
+    ]
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
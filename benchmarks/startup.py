@@ -0,0 +1,145 @@
+"""
+Cold start of a uvicorn worker: time from spawning the process until it answers (import + lifespan:
+engine, pool warm-up, catalog cache, OpenAPI schema), then the latency of its first requests vs. warm ones.
+
+    python -m benchmarks.startup --workers 4 --runs 3
+
+`--workers` processes are started at the same time, each on its own port, like replicas scaled out together
+on one host. The import time of `app.main` (`python -X importtime`) is reported first for reference.
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from httpx import AsyncClient, TransportError
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import get_settings
+from app.core.security import create_jwt_token
+from app.models import User
+from benchmarks.utils import Timer, unique_email
+
+WARM_REQUESTS = 20
+STARTUP_TIMEOUT_SECONDS = 60
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_seconds() -> float:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    last = result.stderr.strip().splitlines()[-1]  # app.main itself comes last
+    return int(last.split("|")[1]) / 1e6
+
+
+async def start_worker(headers: dict[str, str]) -> dict[str, float]:
+    """Seconds until the worker answers, then its first and warm request latencies."""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    )
+    try:
+        async with AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", headers=headers, timeout=30
+        ) as client:
+            while True:
+                try:
+                    # Only accepted once the lifespan startup is done
+                    (await client.get("/metrics")).raise_for_status()
+                    break
+                except TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError("uvicorn exited during startup") from None
+                    if time.perf_counter() - start > STARTUP_TIMEOUT_SECONDS:
+                        raise RuntimeError(
+                            f"uvicorn did not start in {STARTUP_TIMEOUT_SECONDS}s"
+                        ) from None
+                    await asyncio.sleep(0.01)
+            times = {"ready": time.perf_counter() - start}
+
+            for name, path in (
+                ("first_openapi", "/openapi.json"),
+                ("first_catalog", "/pokemons/"),
+            ):
+                with Timer() as timer:
+                    (await client.get(path)).raise_for_status()
+                times[name] = timer.elapsed
+            samples = []
+            for _ in range(WARM_REQUESTS):
+                with Timer() as timer:
+                    (await client.get("/pokemons/")).raise_for_status()
+                samples.append(timer.elapsed)
+            times["warm_catalog"] = statistics.median(samples)
+            return times
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"import app.main: {import_seconds() * 1000:.0f}ms")
+
+    engine = create_async_engine(get_settings().DB_URI)
+    async with engine.begin() as connection:
+        user_id = (
+            await connection.execute(
+                User.__table__.insert()
+                .values(email=unique_email("startup"), hashed_password="x")
+                .returning(User.user_id)
+            )
+        ).scalar_one()
+    headers = {"Authorization": f"Bearer {create_jwt_token(str(user_id)).access_token}"}
+
+    try:
+        for run in range(1, args.runs + 1):
+            results = await asyncio.gather(
+                *(start_worker(headers) for _ in range(args.workers))
+            )
+            for worker, times in enumerate(results, start=1):
+                print(
+                    f"run={run} worker={worker}  ready={times['ready'] * 1000:6.0f}ms  "
+                    f"first /openapi.json={times['first_openapi'] * 1000:6.1f}ms  "
+                    f"first /pokemons/={times['first_catalog'] * 1000:6.1f}ms  "
+                    f"warm /pokemons/={times['warm_catalog'] * 1000:6.1f}ms"
+                )
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(delete(User).where(User.user_id == user_id))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
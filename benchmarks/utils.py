@@ -0,0 +1,73 @@
+import statistics
+import time
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from httpx import ASGITransport, AsyncClient
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile, `pct` in 0-100."""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Latency summary in milliseconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else float("nan"),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def unique_email(prefix: str = "bench") -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:12]}@example.com"
+
+
+@asynccontextmanager
+async def app_client() -> AsyncIterator[AsyncClient]:
+    """In-process client for the FastAPI app, the same way the tests talk to it."""
+    from app.main import app
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        yield client
+
+
+class Timer:
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.elapsed = time.perf_counter() - self.start
+
+
+SEED_POKEMONS_SQL = """
+INSERT INTO pokemons (pokemon_id, name, description, hp, attack, defense, speed, type, rarity, created_at, updated_at)
+SELECT gen_random_uuid(),
+       'Bench-' || :prefix || '-' || i,
+       'Benchmark Pokémon number ' || i,
+       1 + (i * 7) % 250, 1 + (i * 11) % 190, 1 + (i * 13) % 230, 1 + (i * 17) % 180,
+       (enum_range(NULL::pokemontype))[1 + i % 18],
+       (enum_range(NULL::pokemonrarity))[1 + i % 5],
+       now() - make_interval(secs => :count - i), now()
+FROM generate_series(1, :count) AS i
+"""
+
+
+async def seed_pokemons(connection, count: int) -> None:
+    """Inserts `count` synthetic Pokemon, meant to run inside a transaction that is rolled back."""
+    from sqlalchemy import text
+
+    await connection.execute(
+        text(SEED_POKEMONS_SQL), {"count": count, "prefix": uuid.uuid4().hex[:8]}
+    )
+    await connection.execute(text("ANALYZE pokemons"))